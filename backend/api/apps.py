@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'backend.api'
+    label = 'api'
+
+    def ready(self):
+        # Keep the case search index, the file blob reference counts and the
+        # token cache in sync with saves and deletes, and account every
+        # connection's queries to the request that runs them; register the system checks
+        from . import authentication, blobs, checks, instrumentation, search  # noqa: F401
@@ -0,0 +1,155 @@
+"""
+Token authentication with the token -> user lookup cached.
+
+CachedTokenAuthentication is a drop-in replacement for DRF's
+TokenAuthentication. A hit skips the Token + User query that TokenAuthentication
+runs on every request. Settings:
+
+    TOKEN_AUTH_CACHE        'shared' (default): the default Django cache, shared by workers
+                            'local': a bounded LRU in each process
+    TOKEN_AUTH_CACHE_TTL    seconds an entry is trusted (default 300 shared, 5 local, and
+                            5 when the default cache is itself local to each process)
+    TOKEN_AUTH_CACHE_SIZE   entries kept by the local LRU (default 1024)
+
+Deleting a token, or saving or deleting its user (deactivation included), evicts
+the entries in the current process and in the shared cache. A local LRU cannot
+be evicted from another process: a token revoked elsewhere keeps working in
+the other workers for up to TOKEN_AUTH_CACHE_TTL seconds, which is why 'local'
+defaults to 5. Use it only with a single worker or when that window is acceptable.
+The same holds for 'shared' when the default cache is a LocMemCache (no REDIS_URL
+or MEMCACHED_LOCATION), so its entries are trusted for 5 seconds too.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from .checks import cache_is_shared
+
+
+def _copy_token(token):
+    # Each request gets its own instances, as it would from the database
+    user = copy.copy(token.user)
+    token = copy.copy(token)
+    token.user = user
+    return token
+
+
+class LocalTokenCache:
+    """Thread-safe LRU of token key -> (token, expiry)"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return _copy_token(token)
+
+    def set(self, key, token, ttl, max_entries):
+        with self._lock:
+            self._entries[key] = (_copy_token(token), time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in [key for key, (token, _) in self._entries.items() if token.user_id == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LocalTokenCache()
+
+
+def _shared_key(key):
+    return f'cjms:auth-token:{key}'
+
+
+def _uses_shared_cache():
+    return getattr(settings, 'TOKEN_AUTH_CACHE', 'shared') == 'shared'
+
+
+def _default_ttl():
+    # Another worker can only evict an entry it can see
+    return 300 if _uses_shared_cache() and cache_is_shared() else 5
+
+
+def get_cached_token(key):
+    """Token (with its user loaded) for a key, from the cache or the database; None when unknown"""
+    ttl = getattr(settings, 'TOKEN_AUTH_CACHE_TTL', _default_ttl())
+    if _uses_shared_cache():
+        token = cache.get(_shared_key(key))
+    else:
+        token = local_tokens.get(key)
+    if token is not None:
+        return token
+
+    try:
+        token = Token.objects.select_related('user').get(key=key)
+    except Token.DoesNotExist:
+        return None
+    if _uses_shared_cache():
+        cache.set(_shared_key(key), token, timeout=ttl)
+    else:
+        local_tokens.set(key, token, ttl, getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 1024))
+    return token
+
+
+def forget_token(key):
+    local_tokens.delete(key)
+    cache.delete(_shared_key(key))
+
+
+def forget_user_tokens(user_id):
+    local_tokens.delete_user(user_id)
+    if _uses_shared_cache():
+        cache.delete_many([_shared_key(key) for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True)])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that remembers which user a token belongs to"""
+
+    def authenticate_credentials(self, key):
+        token = get_cached_token(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return (token.user, token)
+
+
+@receiver(post_delete, sender=Token)
+def _forget_deleted_token(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _forget_changed_user(sender, instance, created=False, **kwargs):
+    # Covers deactivation as well as permission and profile changes; a new user has no tokens yet
+    if not created:
+        forget_user_tokens(instance.id)
@@ -0,0 +1,120 @@
+"""
+Reference counting of the content-addressed case file blobs.
+
+Signals keep FileBlob.ref_count equal to the number of CaseFiles whose file is
+that blob: saving a CaseFile with new content takes a reference on the new
+blob and drops the one on the old blob, deleting a CaseFile drops its
+reference. When the count reaches zero, delete_unreferenced_blob runs once
+the transaction commits and removes the stored file and the row.
+
+The storage claims the row (claim_blob) while it writes a file, and the delete
+holds the same row lock and re-checks it, so content uploaded again while a
+delete is pending is either written after the delete or never deleted. Bulk
+updates and deletes bypass the signals; the reconcile_file_blobs command
+recounts from the CaseFile rows.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import CaseFile, FileBlob
+from .storage import blob_digest
+
+
+def _loaded_file_name(instance):
+    # Read the raw attribute: touching instance.file on a deferred field would query
+    value = instance.__dict__.get('file')
+    return getattr(value, 'name', value)
+
+
+def acquire_blob(name, size=None):
+    """Count one more reference to the blob stored under name"""
+    digest = blob_digest(name)
+    if digest is None:
+        return
+    with transaction.atomic():
+        FileBlob.objects.select_for_update().get_or_create(
+            sha256=digest,
+            defaults={'name': name, 'size': size if size is not None else CaseFile.file.field.storage.size(name)},
+        )
+        FileBlob.objects.filter(sha256=digest).update(ref_count=F('ref_count') + 1)
+
+
+def claim_blob(digest, name, size):
+    """
+    Lock the row of content about to be stored under name, creating it without
+    references if needed. Returns True when the file must be written even if it
+    exists: the row is new, or it has no references left and a delete may be
+    pending (the row is restamped so that delete leaves the file alone). Call
+    inside a transaction and write the file before it commits.
+    """
+    blob, created = FileBlob.objects.select_for_update().get_or_create(
+        sha256=digest,
+        defaults={'name': name, 'size': size},
+    )
+    if created:
+        return True
+    if blob.ref_count == 0:
+        FileBlob.objects.filter(sha256=digest).update(created_at=timezone.now())
+        return True
+    return False
+
+
+def release_blob(name):
+    """Drop a reference to the blob stored under name, deleting it after the last one is committed"""
+    digest = blob_digest(name)
+    if digest is None:
+        return
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(sha256=digest).first()
+        if blob is None:
+            return
+        blob.ref_count -= 1
+        blob.save(update_fields=['ref_count'])
+        if blob.ref_count <= 0:
+            released_at = blob.created_at
+            transaction.on_commit(lambda: delete_unreferenced_blob(digest, name, released_at))
+
+
+def delete_unreferenced_blob(digest, name, released_at):
+    """
+    Delete the stored file and row of a blob whose last reference was dropped
+    while its row carried the released_at stamp
+    """
+    with transaction.atomic():
+        blob = FileBlob.objects.select_for_update().filter(sha256=digest).first()
+        # Referenced again, or claimed by an upload of the same content since
+        if blob is None or blob.ref_count > 0 or blob.created_at != released_at:
+            return
+        CaseFile.file.field.storage.delete(name)
+        blob.delete()
+
+
+@receiver(post_init, sender=CaseFile)
+def _remember_file_name(sender, instance, **kwargs):
+    instance._stored_file_name = _loaded_file_name(instance)
+
+
+@receiver(post_save, sender=CaseFile)
+def _count_saved_file(sender, instance, created, raw=False, **kwargs):
+    if raw or 'file' not in instance.__dict__:
+        return
+    old_name = None if created else instance._stored_file_name
+    new_name = instance.file.name
+    if old_name == new_name:
+        return
+    acquire_blob(new_name, instance.size)
+    release_blob(old_name)
+    instance._stored_file_name = new_name
+
+    # Files saved without a digest (the multipart upload paths) take the blob's
+    digest = blob_digest(new_name)
+    if digest and instance.sha256 != digest:
+        instance.sha256 = digest
+        CaseFile.objects.filter(pk=instance.pk).update(sha256=digest)
+
+
+@receiver(post_delete, sender=CaseFile)
+def _release_deleted_file(sender, instance, **kwargs):
+    release_blob(_loaded_file_name(instance))
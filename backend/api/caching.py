@@ -0,0 +1,256 @@
+"""
+Versioned caching of the judge login / sheet bootstrap payloads.
+
+Each sub-event and each judge has a version counter in the cache. Cached
+payloads are stored under keys that include the current versions, so bumping
+a counter invalidates everything built from the old data without having to
+find and delete the stale entries (they simply expire).
+
+Bump the sub-event version whenever its settings, the sub-event itself or its
+event change, and the judge version whenever that judge's scores change. The
+event version covers the event leaderboard and is bumped by all of these.
+The default local-memory cache is per process; configure a shared CACHES
+backend (Redis, Memcached) when running several workers.
+
+The same counters make up the ETags of the settings and judge score read
+endpoints, so conditional GETs are answered without touching the database.
+With a per-process cache a worker that missed a bump would answer 304 for
+changed data, so no ETags are sent unless the cache is shared.
+
+A bump also pins its scope to the primary database for a few seconds (see
+backend.api.routers), so a payload is never rebuilt from a lagging replica.
+"""
+import time
+from django.core.cache import cache
+from django.db import transaction
+from .checks import cache_is_shared
+from .models import Judge, SubEvent, Score
+from .routers import pin_primary
+from .scoring import build_event_leaderboard
+from .serializers import ContestantSerializer, JudgeSerializer, CriteriaSerializer
+
+# Upper bound on the lifetime of a cached payload, even if a version bump is missed
+PAYLOAD_TIMEOUT = 60 * 60
+
+
+def _version_key(scope, object_id):
+    return f'cjms:version:{scope}:{object_id}'
+
+
+def _initial_version():
+    # Counters start from the clock rather than 1 so a cache flush can never
+    # bring back a version (and ETag) that was already handed out
+    return time.time_ns() // 1000
+
+
+def get_versions(*scoped_ids):
+    """
+    Current version counters for (scope, id) pairs, in the same order.
+    Missing counters are initialised so later bumps are atomic increments.
+    """
+    keys = [_version_key(scope, object_id) for scope, object_id in scoped_ids]
+    found = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump_version(scope, object_id):
+    # Pin before bumping: a reader that sees the new version also sees the pin
+    pin_primary((scope, object_id))
+    key = _version_key(scope, object_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+
+def bump_sub_event_versions(sub_event_ids):
+    """Invalidate cached payloads of these sub-events once the transaction commits"""
+    sub_event_ids = list(sub_event_ids)
+    transaction.on_commit(lambda: [bump_version('subevent', sub_event_id) for sub_event_id in sub_event_ids])
+
+
+def bump_event_version(event_id):
+    """Invalidate an event's cached leaderboard once the transaction commits"""
+    transaction.on_commit(lambda: bump_version('event', event_id))
+
+
+def bump_judge_version(judge_id):
+    """Invalidate a judge's cached scores once the transaction commits"""
+    transaction.on_commit(lambda: bump_version('judge', judge_id))
+
+
+def judge_ref_for_code(code):
+    """(judge_id, sub_event_id) for a judge code, or None. Codes never change, so this is cached without a version"""
+    key = f'cjms:judge-code:{code}'
+    ref = cache.get(key)
+    if ref is None:
+        ref = Judge.objects.filter(code=code).values_list('id', 'sub_event_id').first()
+        if ref is None:
+            return None
+        cache.set(key, ref, timeout=PAYLOAD_TIMEOUT)
+    return tuple(ref)
+
+
+def forget_judge_code(code):
+    cache.delete(f'cjms:judge-code:{code}')
+
+
+def _build_sub_event_payload(sub_event_id):
+    try:
+        sub_event = SubEvent.objects.select_related('event').get(id=sub_event_id)
+    except SubEvent.DoesNotExist:
+        return None
+    judges = JudgeSerializer(sub_event.judges.all(), many=True).data
+    return {
+        'sub_event': {
+            'id': sub_event.id,
+            'title': sub_event.title,
+            'date': sub_event.date,
+            'time': sub_event.time,
+            'location': sub_event.location,
+            'event': {
+                'id': sub_event.event.id,
+                'title': sub_event.event.title,
+                'year': sub_event.event.year,
+            }
+        },
+        'contestants': ContestantSerializer(sub_event.contestants.all(), many=True).data,
+        'judges': judges,
+        'criteria': CriteriaSerializer(sub_event.criteria.all(), many=True).data,
+    }
+
+
+def sub_event_payload(sub_event_id, version=None):
+    """Sub-event, event, contestants, judges and criteria of a sub-event, cached per sub-event version"""
+    if version is None:
+        version, = get_versions(('subevent', sub_event_id))
+    key = f'cjms:subevent:{sub_event_id}:{version}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = _build_sub_event_payload(sub_event_id)
+        if payload is None:
+            return None
+        cache.set(key, payload, timeout=PAYLOAD_TIMEOUT)
+    return payload
+
+
+def _build_judge_scores(judge_id):
+    scores_by_contestant = {}
+    comments_by_contestant = {}
+    versions_by_contestant = {}
+    for contestant_id, criterion_id, score, comments, updated_at in (
+        Score.objects.filter(judge_id=judge_id).order_by('contestant_id', 'criterion_id')
+        .values_list('contestant_id', 'criterion_id', 'score', 'comments', 'updated_at')
+    ):
+        if contestant_id not in scores_by_contestant:
+            scores_by_contestant[contestant_id] = {}
+            comments_by_contestant[contestant_id] = comments or ''
+            versions_by_contestant[contestant_id] = {}
+        scores_by_contestant[contestant_id][criterion_id] = score
+        versions_by_contestant[contestant_id][criterion_id] = updated_at
+    return {
+        'scores': scores_by_contestant,
+        'comments': comments_by_contestant,
+        'versions': versions_by_contestant,
+    }
+
+
+def judge_scores_payload(judge_id, sub_event_version, judge_version):
+    """
+    A judge's scores grouped like judge_scores_view. Keyed on both versions
+    because removing contestants or criteria in the settings deletes scores.
+    """
+    key = f'cjms:judge-scores:{judge_id}:{sub_event_version}:{judge_version}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = _build_judge_scores(judge_id)
+        cache.set(key, payload, timeout=PAYLOAD_TIMEOUT)
+    return payload
+
+
+def judge_bootstrap_payload(code, include_scores=True, retry=True):
+    """
+    Everything a judge's sheet needs, looked up by login code.
+    Returns None when the code does not belong to a judge.
+    """
+    code = str(code)
+    if len(code) != 6 or not code.isdigit():
+        return None
+    ref = judge_ref_for_code(code)
+    if ref is None:
+        return None
+    judge_id, sub_event_id = ref
+
+    sub_event_version, judge_version = get_versions(('subevent', sub_event_id), ('judge', judge_id))
+    settings_payload = sub_event_payload(sub_event_id, sub_event_version)
+    judge = None
+    if settings_payload is not None:
+        judge = next((judge for judge in settings_payload['judges'] if judge['id'] == judge_id), None)
+    if judge is None:
+        # The judge was removed after its code was cached; the code may since
+        # have been handed to another judge, so look it up again once
+        forget_judge_code(code)
+        return judge_bootstrap_payload(code, include_scores, retry=False) if retry else None
+
+    payload = {
+        'judge': {
+            'id': judge['id'],
+            'name': judge['name'],
+            'code': judge['code'],
+            'type': judge['type'],
+            'sub_event': settings_payload['sub_event'],
+        },
+    }
+    if include_scores:
+        payload.update({
+            'contestants': settings_payload['contestants'],
+            'criteria': settings_payload['criteria'],
+            **judge_scores_payload(judge_id, sub_event_version, judge_version),
+        })
+    return payload
+
+
+def event_leaderboard_payload(event_id):
+    """build_event_leaderboard, cached per event version"""
+    version, = get_versions(('event', event_id))
+    key = f'cjms:leaderboard:{event_id}:{version}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_event_leaderboard(event_id)
+        cache.set(key, payload, timeout=PAYLOAD_TIMEOUT)
+    return payload
+
+
+def judge_sub_event_id(judge_id):
+    """Sub-event of a judge (never changes), cached; None for an unknown judge"""
+    key = f'cjms:judge-subevent:{judge_id}'
+    sub_event_id = cache.get(key)
+    if sub_event_id is None:
+        sub_event_id = Judge.objects.filter(id=judge_id).values_list('sub_event_id', flat=True).first()
+        if sub_event_id is None:
+            return None
+        cache.set(key, sub_event_id, timeout=PAYLOAD_TIMEOUT)
+    return sub_event_id
+
+
+def sub_event_settings_etag(request, subevent_id):
+    """ETag of subevent_settings_view, from the sub-event version counter; None without a shared cache"""
+    if not cache_is_shared():
+        return None
+    version, = get_versions(('subevent', subevent_id))
+    return f'settings-{subevent_id}-{version}'
+
+
+def judge_scores_etag(request, judge_id):
+    """ETag of judge_scores_view, from the sub-event and judge version counters; None without a shared cache"""
+    if not cache_is_shared():
+        return None
+    sub_event_id = judge_sub_event_id(judge_id)
+    if sub_event_id is None:
+        return None
+    sub_event_version, judge_version = get_versions(('subevent', sub_event_id), ('judge', judge_id))
+    return f'scores-{judge_id}-{sub_event_version}-{judge_version}'
@@ -0,0 +1,32 @@
+"""
+System checks for the deployment settings backend.api relies on
+"""
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.checks import Tags, Warning, register
+
+# Cache backends whose entries are private to one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """Whether every worker process sees the same entries in this cache"""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [Warning(
+        'The default cache is local to each process.',
+        hint=(
+            'The cached judge payloads and their version counters must be seen by every worker, '
+            'or workers keep serving data other workers changed. Set REDIS_URL or MEMCACHED_LOCATION, '
+            'or serve requests from a single process.'
+        ),
+        id='api.W001',
+    )]
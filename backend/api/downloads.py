@@ -0,0 +1,153 @@
+"""
+Authenticated, range-capable case file downloads.
+
+Files are streamed from storage through a fixed-size buffer, with ETag and
+Last-Modified validators, If-None-Match / If-Modified-Since revalidation and
+single-range Range / If-Range support for resumed downloads.
+
+With CASE_FILE_SENDFILE set, Django only checks access and the web server
+sends the bytes (including ranges) itself:
+    'x-sendfile'        X-Sendfile: <absolute path> (Apache mod_xsendfile, lighttpd)
+    'x-accel-redirect'  X-Accel-Redirect: <CASE_FILE_ACCEL_PREFIX><file name> (nginx internal location)
+"""
+import hashlib
+import mimetypes
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe
+
+BUFFER_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(case_file):
+    """Strong ETag; the storage never reuses a name, so name and size identify the content"""
+    digest = case_file.sha256 or hashlib.md5(f'{case_file.file.name}:{file_size(case_file)}'.encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def file_size(case_file):
+    if case_file.size is not None:
+        return case_file.size
+    return case_file.file.size
+
+
+def file_last_modified(case_file):
+    """Last-Modified as a timestamp, from the storage when it can tell"""
+    try:
+        return case_file.file.storage.get_modified_time(case_file.file.name).timestamp()
+    except (NotImplementedError, OSError):
+        return case_file.uploaded_at.timestamp()
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single byte range, None to send the whole file
+    (no header, multiple ranges or a malformed header), or False when unsatisfiable.
+    """
+    match = RANGE_RE.match((header or '').replace(' ', ''))
+    if not match or match.group(0) == 'bytes=-':
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or (last and int(last) < start):
+            return False
+    else:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return False
+        start, end = max(size - suffix, 0), size - 1
+    return start, end
+
+
+def _if_range_matches(header, etag, last_modified):
+    if header is None:
+        return True
+    if header.startswith('"'):
+        return header == etag  # Strong comparison
+    since = parse_http_date_safe(header)
+    return since is not None and since == int(last_modified)
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        tags = parse_etags(if_none_match)
+        return '*' in tags or etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in tags]
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return since is not None and int(last_modified) <= since
+
+
+def _stream(fileobj, start, length):
+    try:
+        fileobj.seek(start)
+        while length > 0:
+            block = fileobj.read(min(BUFFER_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        fileobj.close()
+
+
+def _sendfile_response(case_file, mode):
+    response = HttpResponse()
+    if mode == 'x-sendfile':
+        response['X-Sendfile'] = case_file.file.path
+    else:
+        prefix = getattr(settings, 'CASE_FILE_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + quote(case_file.file.name)
+    # The web server fills in the length and handles Range itself
+    return response
+
+
+def file_download_response(request, case_file):
+    """Response that sends case_file to the client, honouring conditional and Range headers"""
+    etag = file_etag(case_file)
+    last_modified = file_last_modified(case_file)
+    content_type = mimetypes.guess_type(case_file.filename)[0] or 'application/octet-stream'
+
+    mode = getattr(settings, 'CASE_FILE_SENDFILE', None)
+    if mode in ('x-sendfile', 'x-accel-redirect'):
+        response = _sendfile_response(case_file, mode)
+    else:
+        if _not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            return response
+
+        size = file_size(case_file)
+        byte_range = None
+        if _if_range_matches(request.headers.get('If-Range'), etag, last_modified):
+            byte_range = parse_range(request.headers.get('Range'), size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        status = 206 if byte_range else 200
+        if request.method == 'HEAD':
+            response = HttpResponse(status=status)
+        else:
+            fileobj = case_file.file.storage.open(case_file.file.name, 'rb')
+            response = StreamingHttpResponse(_stream(fileobj, start, length), status=status)
+        response['Content-Length'] = str(length)
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Content-Type'] = content_type
+    response['Content-Disposition'] = content_disposition_header(True, case_file.filename)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,271 @@
+"""
+Streaming CSV / XLSX exports of score sheets.
+
+An export is a list of sections (title, header, rows), where rows is a lazy
+iterator over the database. The writers turn the sections into a generator of
+bytes for StreamingHttpResponse: the first bytes go out as soon as the first
+rows are read and memory stays flat however many score cells there are.
+
+XLSX files are written without a third-party library: the workbook is a zip
+of a few fixed XML parts plus one worksheet per section, and the zip is
+produced incrementally with data descriptors, so it never has to be seeked.
+"""
+import csv
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.db.models import Count
+from .models import Contestant, Criteria, JudgeTally, Score
+from .scoring import rank_totals, round_score, scoreboard_totals
+
+# Rows read from the database per round trip
+CHUNK_SIZE = 2000
+# Rows written before the buffered output is handed to the response
+ROWS_PER_YIELD = 200
+
+SUB_EVENT_ORDER = ['date', 'time', 'id']
+
+
+def _sub_event_order(prefix):
+    return [f'{prefix}{field}' for field in SUB_EVENT_ORDER]
+
+
+def _score_rows(sub_event_ids, titles):
+    scores = (
+        Score.objects.filter(judge__sub_event_id__in=sub_event_ids)
+        .order_by(
+            *_sub_event_order('judge__sub_event__'), 'judge__order', 'judge_id',
+            'contestant__order', 'contestant_id', 'criterion__order', 'criterion_id',
+        )
+        .values_list(
+            'judge__sub_event_id', 'judge__name', 'judge__type', 'contestant__name',
+            'criterion__name', 'criterion__points', 'score', 'comments',
+        )
+    )
+    for sub_event_id, judge, judge_type, contestant, criterion, points, score, comments in scores.iterator(chunk_size=CHUNK_SIZE):
+        yield [titles[sub_event_id], judge, judge_type, contestant, criterion, points, score, comments]
+
+
+def _judge_total_rows(sub_event_ids, titles):
+    tallies = (
+        JudgeTally.objects.filter(judge__sub_event_id__in=sub_event_ids)
+        .order_by(*_sub_event_order('judge__sub_event__'), 'judge__order', 'judge_id', 'contestant__order', 'contestant_id')
+        .values_list('judge__sub_event_id', 'judge__name', 'contestant__name', 'score_count', 'score_sum', 'weighted_total')
+    )
+    for sub_event_id, judge, contestant, score_count, score_sum, weighted_total in tallies.iterator(chunk_size=CHUNK_SIZE):
+        yield [titles[sub_event_id], judge, contestant, score_count, score_sum, round_score(weighted_total)]
+
+
+def _ranking_rows(sub_event_ids, titles):
+    # The score sheet's totals and ranks (build_scoreboard); a contestant only
+    # has averages for its own sub-event's criteria, so one pass covers them all
+    contestants = list(
+        Contestant.objects.filter(sub_event_id__in=sub_event_ids)
+        .order_by(*_sub_event_order('sub_event__'), 'order', 'id')
+    )
+    criteria = list(Criteria.objects.filter(sub_event_id__in=sub_event_ids))
+    _, totals = scoreboard_totals(contestants, criteria)
+    judge_counts = dict(
+        Score.objects.filter(contestant__sub_event_id__in=sub_event_ids, score__isnull=False)
+        .order_by()
+        .values('contestant_id')
+        .annotate(judges=Count('judge_id', distinct=True))
+        .values_list('contestant_id', 'judges')
+    )
+
+    by_sub_event = {}
+    for contestant in contestants:
+        by_sub_event.setdefault(contestant.sub_event_id, []).append(contestant)
+    for sub_event_id, sub_event_contestants in by_sub_event.items():
+        rankings = rank_totals({contestant.id: totals[contestant.id] for contestant in sub_event_contestants})
+        # Equal ranks keep the sheet order
+        for contestant in sorted(sub_event_contestants, key=lambda contestant: rankings[contestant.id]):
+            yield [
+                titles[sub_event_id], rankings[contestant.id], contestant.name,
+                judge_counts.get(contestant.id, 0), totals[contestant.id],
+            ]
+
+
+def score_sheet_sections(sub_events):
+    """Score cells, per-judge totals and rankings of the given sub-events"""
+    titles = {sub_event.id: sub_event.title for sub_event in sub_events}
+    ids = list(titles)
+    return [
+        (
+            'Scores',
+            ['Sub-event', 'Judge', 'Judge type', 'Contestant', 'Criterion', 'Weight (%)', 'Score', 'Comments'],
+            _score_rows(ids, titles),
+        ),
+        (
+            'Judge totals',
+            ['Sub-event', 'Judge', 'Contestant', 'Scored criteria', 'Score sum', 'Weighted total'],
+            _judge_total_rows(ids, titles),
+        ),
+        (
+            'Rankings',
+            ['Sub-event', 'Rank', 'Contestant', 'Judges', 'Weighted total'],
+            _ranking_rows(ids, titles),
+        ),
+    ]
+
+
+class _Buffer:
+    """Write-only file object whose contents are taken out as they are produced"""
+
+    def __init__(self, empty=b''):
+        self._empty = empty
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = self._empty.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def stream_csv(sections):
+    """CSV bytes: each section is a title row, a header row and its rows, separated by a blank line"""
+    buffer = _Buffer('')
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM so spreadsheet programs read the file as UTF-8
+    for index, (title, header, rows) in enumerate(sections):
+        if index:
+            writer.writerow([])
+        writer.writerow([title])
+        writer.writerow(header)
+        for count, row in enumerate(rows, 1):
+            writer.writerow(['' if value is None else value for value in row])
+            if count % ROWS_PER_YIELD == 0:
+                yield buffer.take().encode('utf-8')
+        yield buffer.take().encode('utf-8')
+
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_INVALID_XML.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def _xlsx_sheet_name(title, used):
+    name = re.sub(r'[\[\]:*?/\\]', ' ', title)[:31] or 'Sheet'
+    candidate, suffix = name, 2
+    while candidate.lower() in used:
+        candidate = f'{name[:28]} {suffix}'
+        suffix += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}'
+    '</Types>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{index}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}'
+    '<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '</styleSheet>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def stream_xlsx(sections):
+    """XLSX bytes with one worksheet per section: a header row followed by its rows"""
+    buffer = _Buffer()
+    used_names = set()
+    names = [_xlsx_sheet_name(title, used_names) for title, _, _ in sections]
+    count = len(sections)
+
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', _CONTENT_TYPES.format(
+            sheets=''.join(_SHEET_CONTENT_TYPE.format(index=index) for index in range(1, count + 1))
+        ))
+        workbook.writestr('_rels/.rels', _ROOT_RELS)
+        workbook.writestr('xl/workbook.xml', _WORKBOOK.format(sheets=''.join(
+            f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{index}" r:id="rId{index}"/>'
+            for index, name in enumerate(names, 1)
+        )))
+        workbook.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS.format(sheets=''.join(
+            f'<Relationship Id="rId{index}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{index}.xml"/>'
+            for index in range(1, count + 1)
+        )))
+        workbook.writestr('xl/styles.xml', _STYLES)
+        yield buffer.take()
+
+        for index, (title, header, rows) in enumerate(sections, 1):
+            with workbook.open(f'xl/worksheets/sheet{index}.xml', 'w', force_zip64=True) as sheet:
+                sheet.write((_SHEET_START + _xlsx_row(header)).encode('utf-8'))
+                for row_count, row in enumerate(rows, 1):
+                    sheet.write(_xlsx_row(row).encode('utf-8'))
+                    if row_count % ROWS_PER_YIELD == 0:
+                        data = buffer.take()
+                        if data:
+                            yield data
+                sheet.write(_SHEET_END.encode('utf-8'))
+            yield buffer.take()
+    yield buffer.take()
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
@@ -0,0 +1,260 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware times each request. A database execute wrapper counts
+the request's queries, sums their time and keeps the slowest few. Every
+request then produces:
+
+  * a Server-Timing header (app;dur=..., db;dur=...;desc="N queries")
+  * one JSON log line on the "cjms.performance" logger
+  * an observation in the in-process metrics, served in the Prometheus text
+    format by metrics_view with a latency histogram per URL name
+
+The wrapper is installed on every database connection as it opens and finds
+the current request through a context variable, so queries issued from
+sync_to_async threads by async views are counted too. For streaming responses
+the time covers the view up to the first byte, not the whole stream.
+
+Settings:
+    PERFORMANCE_SLOW_QUERIES   slowest statements logged per request (default 5)
+    PERFORMANCE_METRICS_TOKEN  bearer token a scraper sends to read the metrics
+                               (Authorization: Bearer <token>); staff users
+                               signed in to the admin can read them without it
+"""
+import contextvars
+import heapq
+import hmac
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger('cjms.performance')
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Longest SQL text kept for a slow statement
+MAX_SQL_LENGTH = 500
+
+_current_recorder = contextvars.ContextVar('cjms_performance_recorder', default=None)
+
+
+class QueryRecorder:
+    """Query count, total SQL time and the slowest statements of one request"""
+
+    def __init__(self, keep_slowest, parent=None):
+        self.keep_slowest = keep_slowest
+        # An enclosing recorder (see record_queries) also sees these queries
+        self.parent = parent
+        self.count = 0
+        self.total_ms = 0.0
+        self._slowest = []  # Min-heap of (duration_ms, sequence, sql)
+        self._lock = threading.Lock()
+
+    def record(self, sql, duration_ms):
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            item = (duration_ms, self.count, sql)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, item)
+            elif self._slowest and duration_ms > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+        if self.parent is not None:
+            self.parent.record(sql, duration_ms)
+
+    def slowest(self):
+        with self._lock:
+            return [
+                {'ms': round(duration_ms, 3), 'sql': str(sql)[:MAX_SQL_LENGTH]}
+                for duration_ms, _, sql in sorted(self._slowest, reverse=True)
+            ]
+
+
+@contextmanager
+def record_queries(keep_slowest=0):
+    """Count the queries run inside the block, including those of the requests it makes"""
+    recorder = QueryRecorder(keep_slowest, parent=_current_recorder.get())
+    reset_token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(reset_token)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.record(sql, (time.perf_counter() - start) * 1000)
+
+
+def install_query_recorder(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@receiver(connection_created)
+def _install_on_new_connection(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+class LatencyMetrics:
+    """Thread-safe request counters and latency histograms keyed by (URL name, method, status)"""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, url_name, method, status_code, duration_ms, query_count, sql_ms):
+        key = (url_name, method, str(status_code))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'buckets': [0] * len(LATENCY_BUCKETS_MS),
+                    'count': 0,
+                    'sum_ms': 0.0,
+                    'queries': 0,
+                    'sql_ms': 0.0,
+                }
+            for index, bound in enumerate(LATENCY_BUCKETS_MS):
+                if duration_ms <= bound:
+                    series['buckets'][index] += 1
+            series['count'] += 1
+            series['sum_ms'] += duration_ms
+            series['queries'] += query_count
+            series['sql_ms'] += sql_ms
+
+    def snapshot(self):
+        with self._lock:
+            return {key: {**series, 'buckets': list(series['buckets'])} for key, series in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render_prometheus(self):
+        lines = [
+            '# HELP cjms_request_duration_seconds Time spent in the view and middleware per request.',
+            '# TYPE cjms_request_duration_seconds histogram',
+        ]
+        queries = [
+            '# HELP cjms_request_queries_total SQL statements executed by requests.',
+            '# TYPE cjms_request_queries_total counter',
+        ]
+        sql_time = [
+            '# HELP cjms_request_sql_seconds_total Time spent in SQL by requests.',
+            '# TYPE cjms_request_sql_seconds_total counter',
+        ]
+        for (url_name, method, status_code), series in sorted(self.snapshot().items()):
+            labels = f'url_name="{_label(url_name)}",method="{method}",status="{status_code}"'
+            for bound, count in zip(LATENCY_BUCKETS_MS, series['buckets']):
+                lines.append(f'cjms_request_duration_seconds_bucket{{{labels},le="{bound / 1000}"}} {count}')
+            lines.append(f'cjms_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f'cjms_request_duration_seconds_sum{{{labels}}} {series["sum_ms"] / 1000:.6f}')
+            lines.append(f'cjms_request_duration_seconds_count{{{labels}}} {series["count"]}')
+            queries.append(f'cjms_request_queries_total{{{labels}}} {series["queries"]}')
+            sql_time.append(f'cjms_request_sql_seconds_total{{{labels}}} {series["sql_ms"] / 1000:.6f}')
+        return '\n'.join(lines + queries + sql_time) + '\n'
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = LatencyMetrics()
+
+
+def _url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match.route or 'unnamed'
+
+
+class PerformanceMiddleware:
+    """Times requests and accounts their SQL; see the module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.keep_slowest = getattr(settings, 'PERFORMANCE_SLOW_QUERIES', 5)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder, reset_token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(reset_token)
+        return self._finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        recorder, reset_token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(reset_token)
+        return self._finish(request, response, recorder, start)
+
+    def _start(self):
+        recorder = QueryRecorder(self.keep_slowest, parent=_current_recorder.get())
+        return recorder, _current_recorder.set(recorder), time.perf_counter()
+
+    def _finish(self, request, response, recorder, start):
+        duration_ms = (time.perf_counter() - start) * 1000
+        url_name = _url_name(request)
+
+        response['Server-Timing'] = (
+            f'app;dur={duration_ms:.1f}, db;dur={recorder.total_ms:.1f};desc="{recorder.count} queries"'
+        )
+        metrics.observe(url_name, request.method, response.status_code, duration_ms, recorder.count, recorder.total_ms)
+        logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'url_name': url_name,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'queries': recorder.count,
+            'sql_ms': round(recorder.total_ms, 3),
+            'streaming': response.streaming,
+            'slowest_queries': recorder.slowest(),
+        }))
+        return response
+
+
+def _metrics_allowed(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    token = getattr(settings, 'PERFORMANCE_METRICS_TOKEN', '')
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode())
+
+
+def metrics_view(request):
+    """Request metrics in the Prometheus text format, for staff users and PERFORMANCE_METRICS_TOKEN"""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden('Metrics need a staff login or the metrics token\n', content_type='text/plain')
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,122 @@
+"""
+Live score change broadcasting for organizer dashboards.
+
+Score saves publish cell-level changes per sub-event; the server-sent events
+endpoint subscribes to a sub-event channel and streams them to the browser.
+The default broadcaster keeps subscribers in-process, which is enough for a
+single ASGI worker and for tests. A different broadcaster (e.g. Redis pub/sub)
+can be plugged in with the LIVE_SCORES_BROADCASTER setting.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Messages a subscriber may fall behind by before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+def sub_event_channel(sub_event_id):
+    return f'subevent:{sub_event_id}'
+
+
+class Subscription:
+    """A single listener on a channel; read messages with ``await subscription.get()``"""
+
+    def __init__(self, broadcaster, channel, loop):
+        self.broadcaster = broadcaster
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def deliver(self, message):
+        """Runs on the subscriber's event loop"""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client is too slow to keep up: drop the backlog and ask it to reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'resync'})
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class InProcessBroadcaster:
+    """
+    Fan out messages to subscribers living in this process.
+    publish() is safe to call from sync code running in any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                path = getattr(settings, 'LIVE_SCORES_BROADCASTER', 'backend.api.live.InProcessBroadcaster')
+                _broadcaster = import_string(path)()
+    return _broadcaster
+
+
+def publish_score_changes(sub_event_id, scores):
+    """
+    Publish serialized Score rows to the sub-event's live channel once the
+    current transaction commits
+    """
+    if not scores:
+        return
+    message = {'type': 'scores', 'scores': list(scores)}
+    transaction.on_commit(
+        lambda: get_broadcaster().publish(sub_event_channel(sub_event_id), message)
+    )
+
+
+def format_sse(message):
+    """Encode a message as a server-sent event"""
+    data = json.dumps(message, cls=DjangoJSONEncoder)
+    return f'event: {message.get("type", "message")}\ndata: {data}\n\n'
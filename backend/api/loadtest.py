@@ -0,0 +1,302 @@
+"""
+Load driver replaying the start of a scoring session against a running server.
+
+Virtual judges log in with their code (judge-login), load their sheet
+(judge-bootstrap and the sub-event settings) and then autosave a few changed
+cells every few seconds, as JudgePage does. Virtual organizers log in and
+refresh a sub-event's scoreboard, as ScoreSheet does. Every request's latency
+is recorded per endpoint; LoadReport summarises them as p50/p95/p99 and
+throughput.
+
+The targets come from the manifest written by the seed_load_test command.
+HTTP is spoken over asyncio streams (one keep-alive connection per virtual
+user), so the driver needs nothing beyond the standard library.
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+
+class HTTPError(Exception):
+    """The server closed the connection or answered with something that is not HTTP"""
+
+
+class Connection:
+    """Minimal HTTP/1.1 client connection, reopened when the server closes it"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        if parts.scheme != 'http':
+            raise ValueError('Only http:// servers are supported')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self._reader = self._writer = None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self._reader = self._writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send a request and return (status, headers, body bytes)"""
+        reused = self._writer is not None
+        try:
+            return await self._send(method, path, body, headers)
+        except (ConnectionError, HTTPError):
+            if not reused:
+                raise
+        # The server dropped the idle keep-alive connection; retry once on a new one
+        return await self._send(method, path, body, headers)
+
+    async def _send(self, method, path, body, headers):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        payload = b'' if body is None else json.dumps(body).encode('utf-8')
+        lines = [
+            f'{method} {self.prefix}{path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Accept: application/json',
+            f'Content-Length: {len(payload)}',
+        ]
+        if body is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        self._writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload)
+        try:
+            await self._writer.drain()
+            return await self._read_response()
+        except (ConnectionError, asyncio.IncompleteReadError, HTTPError):
+            await self.close()
+            raise
+
+    async def _read_response(self):
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise HTTPError('Connection closed by the server')
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise HTTPError(f'Malformed status line: {status_line!r}')
+
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked()
+        elif 'content-length' in headers:
+            body = await self._reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self._reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, headers, body
+
+    async def _read_chunked(self):
+        parts = []
+        while True:
+            size = int((await self._reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                # Trailers end with an empty line
+                while (await self._reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(parts)
+            parts.append(await self._reader.readexactly(size))
+            await self._reader.readline()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class LoadReport:
+    """Latencies and failures per endpoint label"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, label, duration_ms, status):
+        self.latencies[label].append(duration_ms)
+        self.statuses[label][status] += 1
+        if status is None or status >= 400:
+            self.errors[label] += 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self):
+        rows = []
+        for label in sorted(self.latencies):
+            values = sorted(self.latencies[label])
+            rows.append({
+                'endpoint': label,
+                'requests': len(values),
+                'errors': self.errors[label],
+                'throughput': round(len(values) / self.elapsed, 2) if self.elapsed else 0.0,
+                'p50_ms': round(percentile(values, 0.50), 2),
+                'p95_ms': round(percentile(values, 0.95), 2),
+                'p99_ms': round(percentile(values, 0.99), 2),
+                'max_ms': round(values[-1], 2),
+                'statuses': {str(status): count for status, count in sorted(
+                    self.statuses[label].items(), key=lambda item: (item[0] is None, item[0] or 0)
+                )},
+            })
+        return rows
+
+    def as_dict(self):
+        rows = self.summary()
+        return {
+            'duration_s': round(self.elapsed, 2),
+            'requests': sum(row['requests'] for row in rows),
+            'errors': sum(row['errors'] for row in rows),
+            'endpoints': rows,
+        }
+
+
+async def timed(report, connection, label, method, path, body=None, headers=None):
+    """Make a request and record its latency under label; returns (status, headers, body) or None on failure"""
+    start = time.perf_counter()
+    try:
+        response = await connection.request(method, path, body, headers)
+    except (OSError, HTTPError, asyncio.IncompleteReadError):
+        report.record(label, (time.perf_counter() - start) * 1000, None)
+        return None
+    report.record(label, (time.perf_counter() - start) * 1000, response[0])
+    return response
+
+
+def _json(response):
+    if response is None or response[0] >= 400:
+        return None
+    try:
+        return json.loads(response[2])
+    except ValueError:
+        return None
+
+
+async def judge_session(base_url, report, judge, stop_at, autosave_interval, cells_per_save, rng):
+    """Log in, load the sheet, then autosave a few cells until stop_at"""
+    connection = Connection(base_url)
+    try:
+        login = _json(await timed(report, connection, 'judge_login', 'POST', '/api/auth/judge-login/', {'code': judge['code']}))
+        if login is None:
+            return
+        sheet = _json(await timed(report, connection, 'judge_bootstrap', 'POST', '/api/auth/judge-bootstrap/', {'code': judge['code']}))
+        settings = await timed(report, connection, 'subevent_settings', 'GET', f'/api/subevents/{judge["sub_event"]}/settings/')
+        if sheet is None:
+            return
+        cells = [
+            (contestant['id'], criterion['id'])
+            for contestant in sheet.get('contestants', [])
+            for criterion in sheet.get('criteria', [])
+        ]
+        etag = settings[1].get('etag') if settings else None
+        # Per-cell stamps sent back with each change, as the sheet does
+        versions = {
+            (int(contestant_id), int(criterion_id)): stamp
+            for contestant_id, stamps in sheet.get('versions', {}).items()
+            for criterion_id, stamp in stamps.items()
+        }
+
+        while time.perf_counter() < stop_at and cells:
+            await asyncio.sleep(autosave_interval * rng.uniform(0.5, 1.5))
+            if time.perf_counter() >= stop_at:
+                break
+            changes = []
+            for contestant_id, criterion_id in rng.sample(cells, min(cells_per_save, len(cells))):
+                changes.append({
+                    'contestant': contestant_id,
+                    'criterion': criterion_id,
+                    'score': rng.randint(70, 100),
+                    'updated_at': versions.get((contestant_id, criterion_id)),
+                })
+            saved = _json(await timed(
+                report, connection, 'save_judge_scores', 'POST', f'/api/judges/{judge["id"]}/scores/save/', {'changes': changes}
+            ))
+            for row in (saved or {}).get('saved', []):
+                versions[(row.get('contestant'), row.get('criterion'))] = row.get('updated_at')
+
+            # The sheet revalidates its settings now and then
+            if rng.random() < 0.2:
+                response = await timed(
+                    report, connection, 'subevent_settings', 'GET', f'/api/subevents/{judge["sub_event"]}/settings/',
+                    headers={'If-None-Match': etag} if etag else None,
+                )
+                if response and response[0] == 200:
+                    etag = response[1].get('etag')
+    finally:
+        await connection.close()
+
+
+async def organizer_session(base_url, report, organizer, sub_event_ids, stop_at, refresh_interval, rng):
+    """Log in, then refresh the scoreboard of a sub-event until stop_at"""
+    connection = Connection(base_url)
+    try:
+        login = _json(await timed(report, connection, 'api_login', 'POST', '/api/auth/login/', {
+            'username': organizer['username'], 'password': organizer['password'],
+        }))
+        if login is None:
+            return
+        headers = {'Authorization': f'Token {login["token"]}'}
+        sub_event_id = rng.choice(sub_event_ids)
+        while time.perf_counter() < stop_at:
+            await timed(report, connection, 'subevent_scoreboard', 'GET', f'/api/subevents/{sub_event_id}/scoreboard/', headers=headers)
+            await asyncio.sleep(refresh_interval * rng.uniform(0.5, 1.5))
+    finally:
+        await connection.close()
+
+
+async def run_load(base_url, manifest, duration, judges=None, organizers=2, ramp_up=2.0,
+                   autosave_interval=3.0, refresh_interval=5.0, cells_per_save=3, seed=None):
+    """Run the traffic mix for duration seconds and return the LoadReport"""
+    rng = random.Random(seed)
+    report = LoadReport()
+    stop_at = time.perf_counter() + duration
+    roster = manifest['judges'][:judges] if judges else manifest['judges']
+
+    async def delayed(coroutine_factory):
+        # Spread the logins over the ramp-up like judges arriving at their seats
+        await asyncio.sleep(rng.uniform(0, ramp_up))
+        await coroutine_factory()
+
+    tasks = [
+        delayed(lambda judge=judge, user_rng=random.Random(rng.random()): judge_session(
+            base_url, report, judge, stop_at, autosave_interval, cells_per_save, user_rng
+        ))
+        for judge in roster
+    ]
+    tasks += [
+        delayed(lambda user_rng=random.Random(rng.random()): organizer_session(
+            base_url, report, manifest['organizer'], manifest['sub_events'], stop_at, refresh_interval, user_rng
+        ))
+        for _ in range(organizers)
+    ]
+    await asyncio.gather(*tasks)
+    report.finish()
+    return report
@@ -0,0 +1,91 @@
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from backend.api.models import Judge, Score
+from backend.api.scoring import save_score_changes
+from backend.api.seeding import seed_event, seed_user
+
+
+def _legacy_returning_strip(sql):
+    # What settings.py used to do to every statement before backend.mariadb replaced it
+    if isinstance(sql, str) and ' RETURNING ' in sql.upper():
+        sql = sql.split(' RETURNING ', 1)[0]
+    return sql
+
+
+def _unchanged(sql):
+    return sql
+
+
+class Command(BaseCommand):
+    help = (
+        'Record the SQL of a seeding, score-saving and reading workload, then time the per-statement '
+        'RETURNING rewrite that settings.py used to apply against passing the statements through '
+        'unchanged, as backend.mariadb does. Runs in a rolled-back transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help='Passes over the recorded statements')
+
+    def handle(self, *args, **options):
+        self._describe_backend()
+
+        statements = []
+
+        def collect(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with transaction.atomic(), connection.execute_wrapper(collect):
+            event = seed_event(seed_user(), sub_events=2, contestants=30, judges=8, criteria=5)
+            for judge in Judge.objects.filter(sub_event__event=event)[:8]:
+                cells = Score.objects.filter(judge=judge).values_list('contestant_id', 'criterion_id')[:10]
+                save_score_changes(judge, [
+                    {'contestant': contestant_id, 'criterion': criterion_id, 'score': 90}
+                    for contestant_id, criterion_id in cells
+                ])
+            list(Score.objects.filter(judge__sub_event__event=event).select_related('contestant', 'criterion'))
+            transaction.set_rollback(True)
+
+        characters = sum(len(sql) for sql in statements)
+        self.stdout.write(
+            f'Recorded {len(statements)} statements, {characters / len(statements):.0f} characters on average\n'
+        )
+
+        results = {}
+        for label, rewrite in (('unchanged (backend.mariadb)', _unchanged), ('RETURNING rewrite (old settings.py)', _legacy_returning_strip)):
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                for sql in statements:
+                    rewrite(sql)
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            for sql in statements:
+                rewrite(sql)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # Each uppercase copy is freed before the next one, so the peak is the largest copy
+            results[label] = elapsed * 1e9 / (options['repeat'] * len(statements))
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(f'  {results[label]:.0f} ns per statement, peak allocation {peak} bytes')
+
+        unchanged, legacy = results.values()
+        self.stdout.write(self.style.SUCCESS(
+            f'\nThe rewrite cost {legacy - unchanged:.0f} ns and a {characters / len(statements):.0f}-character '
+            'uppercase copy per statement; backend.mariadb spends neither'
+        ))
+
+    def _describe_backend(self):
+        self.stdout.write(f'Database engine: {connection.settings_dict["ENGINE"]} ({connection.vendor})')
+        if connection.vendor != 'mysql':
+            self.stdout.write('  Not MySQL/MariaDB: the backend.mariadb feature flags do not apply\n')
+            return
+        with connection.cursor():
+            pass
+        self.stdout.write(
+            f'  Server {connection.mysql_server_info}; '
+            f'minimum version {".".join(map(str, connection.features.minimum_database_version))}; '
+            f'INSERT ... RETURNING {"used" if connection.features.can_return_columns_from_insert else "not used"}\n'
+        )
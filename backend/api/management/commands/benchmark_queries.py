@@ -0,0 +1,84 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg
+from backend.api.models import Contestant, Judge, Criteria, Score
+from backend.api.seeding import seed_event, seed_user
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large sub-event inside a rolled-back transaction and print EXPLAIN plans and '
+        'timings for the score and settings query shapes. Run it before and after '
+        '"migrate api 0008" to compare the composite indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contestants', type=int, default=200)
+        parser.add_argument('--judges', type=int, default=15)
+        parser.add_argument('--criteria', type=int, default=8)
+        parser.add_argument('--sub-events', type=int, default=5, help='Sub-events seeded alongside the measured one')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--no-explain', action='store_true', help='Only print timings')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with transaction.atomic():
+            user = seed_user()
+            event = seed_event(
+                user,
+                sub_events=options['sub_events'],
+                contestants=options['contestants'],
+                judges=options['judges'],
+                criteria=options['criteria'],
+                rng=rng,
+            )
+            sub_event = event.sub_events.order_by('id').last()
+            judge = Judge.objects.filter(sub_event=sub_event).first()
+            criteria_ids = list(Criteria.objects.filter(sub_event=sub_event).values_list('id', flat=True))
+            self.stdout.write(
+                f'Seeded {Score.objects.filter(judge__sub_event__event=event).count()} scores '
+                f'across {options["sub_events"]} sub-events\n'
+            )
+
+            cases = [
+                (
+                    'judge scores, default ordering',
+                    Score.objects.filter(judge=judge).select_related('contestant', 'criterion'),
+                ),
+                (
+                    'judge scores, index ordering',
+                    Score.objects.filter(judge=judge).order_by('contestant_id', 'criterion_id').only(
+                        'contestant_id', 'criterion_id', 'score', 'comments', 'updated_at'
+                    ),
+                ),
+                ('contestants by sub-event', Contestant.objects.filter(sub_event=sub_event)),
+                ('judges by sub-event', Judge.objects.filter(sub_event=sub_event)),
+                ('criteria by sub-event', Criteria.objects.filter(sub_event=sub_event)),
+                (
+                    'scoreboard averages',
+                    Score.objects.filter(criterion_id__in=criteria_ids, score__isnull=False).order_by()
+                    .values('contestant_id', 'criterion_id').annotate(average=Avg('score')),
+                ),
+            ]
+
+            for label, queryset in cases:
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    list(queryset.all())
+                    timings.append((time.perf_counter() - start) * 1000)
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.stdout.write(
+                    f'  median {statistics.median(timings):.2f} ms, '
+                    f'min {min(timings):.2f} ms, max {max(timings):.2f} ms'
+                )
+                if not options['no_explain']:
+                    for line in queryset.explain().splitlines():
+                        self.stdout.write(f'  | {line}')
+                self.stdout.write('')
+
+            # Leave the database as it was
+            transaction.set_rollback(True)
@@ -0,0 +1,47 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from backend.api.authentication import CachedTokenAuthentication, forget_token
+from backend.api.seeding import seed_user
+
+
+class Command(BaseCommand):
+    help = (
+        'Authenticate the same token repeatedly with TokenAuthentication and CachedTokenAuthentication '
+        'and print the queries and time per request. Runs in a rolled-back transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        with transaction.atomic():
+            token = Token.objects.create(user=seed_user())
+            request = factory.get('/api/events/', HTTP_AUTHORIZATION=f'Token {token.key}')
+
+            for label, authentication in (
+                ('TokenAuthentication', TokenAuthentication()),
+                ('CachedTokenAuthentication', CachedTokenAuthentication()),
+            ):
+                timings = []
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(options['requests']):
+                        start = time.perf_counter()
+                        user, _ = authentication.authenticate(request)
+                        timings.append((time.perf_counter() - start) * 1_000_000)
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.stdout.write(
+                    f'  {len(queries) / options["requests"]:.3f} queries/request '
+                    f'({len(queries)} for {options["requests"]} requests), '
+                    f'median {statistics.median(timings):.1f} us, p99 {sorted(timings)[int(len(timings) * 0.99) - 1]:.1f} us'
+                )
+
+            # The token is rolled back; do not leave it in the caches
+            forget_token(token.key)
+            transaction.set_rollback(True)
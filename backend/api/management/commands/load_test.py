@@ -0,0 +1,69 @@
+import asyncio
+import json
+from django.core.management.base import BaseCommand, CommandError
+from backend.api.loadtest import run_load
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay the start of a scoring session against a running server: judges log in, load their '
+        'sheets and autosave every few seconds while organizers refresh the scoreboard. Prints '
+        'p50/p95/p99 latency and throughput per endpoint. Seed the targets with seed_load_test first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--manifest', default='loadtest.json', help='Manifest written by seed_load_test')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to run')
+        parser.add_argument('--judges', type=int, default=None, help='Virtual judges; defaults to every judge in the manifest')
+        parser.add_argument('--organizers', type=int, default=2, help='Virtual organizers refreshing the scoreboard')
+        parser.add_argument('--ramp-up', type=float, default=2, help='Seconds over which the logins are spread')
+        parser.add_argument('--autosave-interval', type=float, default=3, help='Average seconds between a judge\'s saves')
+        parser.add_argument('--refresh-interval', type=float, default=5, help='Average seconds between scoreboard refreshes')
+        parser.add_argument('--cells-per-save', type=int, default=3, help='Score cells changed by each save')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for a repeatable traffic mix')
+        parser.add_argument('--json', dest='json_path', default=None, help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['manifest'], encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+        except OSError as e:
+            raise CommandError(f'Cannot read the manifest ({e}); run seed_load_test first')
+
+        report = asyncio.run(run_load(
+            options['url'],
+            manifest,
+            options['duration'],
+            judges=options['judges'],
+            organizers=options['organizers'],
+            ramp_up=options['ramp_up'],
+            autosave_interval=options['autosave_interval'],
+            refresh_interval=options['refresh_interval'],
+            cells_per_save=options['cells_per_save'],
+            seed=options['seed'],
+        ))
+        results = report.as_dict()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{results["requests"]} requests in {results["duration_s"]} s, {results["errors"]} errors'
+        ))
+        self.stdout.write(
+            f'{"endpoint":22} {"requests":>8} {"errors":>6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8}'
+        )
+        for row in results['endpoints']:
+            self.stdout.write(
+                f'{row["endpoint"]:22} {row["requests"]:8} {row["errors"]:6} {row["throughput"]:8.2f} '
+                f'{row["p50_ms"]:8.1f} {row["p95_ms"]:8.1f} {row["p99_ms"]:8.1f} {row["max_ms"]:8.1f}'
+            )
+            if row['errors']:
+                self.stdout.write(self.style.WARNING(f'    statuses: {row["statuses"]}'))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as json_file:
+                json.dump({'options': {
+                    key: options[key] for key in (
+                        'url', 'duration', 'judges', 'organizers', 'ramp_up',
+                        'autosave_interval', 'refresh_interval', 'cells_per_save', 'seed',
+                    )
+                }, **results}, json_file, indent=2)
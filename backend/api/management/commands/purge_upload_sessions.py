@@ -0,0 +1,32 @@
+import os
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from backend.api.models import UploadSession
+from backend.api.uploads import abort_upload, staging_dir
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked upload sessions that have been idle too long, and staged files without a session'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Idle time after which a session is abandoned')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+        for session in stale:
+            abort_upload(session)
+
+        orphans = 0
+        directory = staging_dir()
+        if os.path.isdir(directory):
+            live = {f'{session_id.hex}.part' for session_id in UploadSession.objects.values_list('id', flat=True)}
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                # Sessions of deleted cases go away with the case and leave their staged file behind
+                if name.endswith('.part') and name not in live and os.path.getmtime(path) < cutoff.timestamp():
+                    os.remove(path)
+                    orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Removed {len(stale)} stale sessions and {orphans} orphaned files'))
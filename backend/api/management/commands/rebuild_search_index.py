@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from backend.api.search import rebuild_search_index, uses_fulltext
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the case search inverted index from the stored cases, notes and files'
+
+    def handle(self, *args, **options):
+        if uses_fulltext():
+            self.stdout.write('Case search uses the database FULLTEXT indexes; building the inverted index anyway')
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} search terms'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from backend.api.tallies import rebuild_tallies
+
+
+class Command(BaseCommand):
+    help = 'Recompute judge and contestant tallies from the stored scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sub-event', type=int, action='append', dest='sub_events',
+            help='Only rebuild this sub-event (may be repeated); defaults to all sub-events',
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_tallies(options['sub_events'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt tallies for {count} contestants'))
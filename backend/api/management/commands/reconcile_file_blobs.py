@@ -0,0 +1,79 @@
+import os
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from backend.api.blobs import delete_unreferenced_blob
+from backend.api.models import CaseFile, FileBlob
+from backend.api.storage import BLOB_PREFIX, blob_digest
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount case file blob references from the CaseFile rows, delete unreferenced blobs '
+        'and remove blob files that no row knows about'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='Leave unknown blob files and unreferenced blob rows younger than this alone; their upload may still be committing',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        storage = CaseFile.file.field.storage
+        counts = {}
+        for name, references in CaseFile.objects.order_by().values_list('file').annotate(references=Count('id')):
+            digest = blob_digest(name)
+            if digest:
+                counts[digest] = (name, references)
+
+        fixed = removed = 0
+        with transaction.atomic():
+            blobs = {blob.sha256: blob for blob in FileBlob.objects.select_for_update()}
+            for digest, (name, references) in counts.items():
+                blob = blobs.get(digest)
+                if blob is None:
+                    fixed += 1
+                    if not options['dry_run']:
+                        FileBlob.objects.create(sha256=digest, name=name, size=storage.size(name), ref_count=references)
+                elif blob.ref_count != references:
+                    fixed += 1
+                    if not options['dry_run']:
+                        blob.ref_count = references
+                        blob.save(update_fields=['ref_count'])
+            claimed_since = timezone.now() - timedelta(minutes=options['grace_minutes'])
+            for digest, blob in blobs.items():
+                # Rows without references that were claimed recently belong to uploads still committing
+                if digest in counts or (blob.ref_count == 0 and blob.created_at >= claimed_since):
+                    continue
+                removed += 1
+                if not options['dry_run']:
+                    if blob.ref_count != 0:
+                        blob.ref_count = 0
+                        blob.save(update_fields=['ref_count'])
+                    transaction.on_commit(lambda blob=blob: delete_unreferenced_blob(blob.sha256, blob.name, blob.created_at))
+
+        # Files written by uploads whose transaction never committed
+        strays = 0
+        cutoff = time.time() - options['grace_minutes'] * 60
+        root = storage.path(BLOB_PREFIX)
+        known = set(counts) | set(FileBlob.objects.values_list('sha256', flat=True))
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                digest = blob_digest(f'{BLOB_PREFIX}/{os.path.basename(directory)}/{filename}')
+                if digest in known or os.path.getmtime(path) >= cutoff:
+                    continue
+                if digest or filename.endswith('.tmp'):
+                    strays += 1
+                    if not options['dry_run']:
+                        os.remove(path)
+
+        prefix = 'Would fix' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {fixed} reference counts, {removed} unreferenced blobs and {strays} stray files'
+        ))
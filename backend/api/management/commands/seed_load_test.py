@@ -0,0 +1,58 @@
+import json
+import random
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from backend.api.models import Judge
+from backend.api.seeding import seed_event, seed_user
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed events, sub-events, judges, contestants and criteria with bulk_create for the load_test '
+        'command, and write the judge codes and organizer login it needs to a manifest file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=1)
+        parser.add_argument('--sub-events', type=int, default=3, help='Sub-events per event')
+        parser.add_argument('--judges', type=int, default=10, help='Judges per sub-event')
+        parser.add_argument('--contestants', type=int, default=20, help='Contestants per sub-event')
+        parser.add_argument('--criteria', type=int, default=5, help='Criteria per sub-event')
+        parser.add_argument('--with-scores', action='store_true', help='Fill every score sheet, as if scoring were under way')
+        parser.add_argument('--username', default=None, help='Organizer username; randomized by default')
+        parser.add_argument('--password', default='load-test-password')
+        parser.add_argument('--manifest', default='loadtest.json', help='Where to write the manifest')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for repeatable data')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            user = seed_user(options['username'], options['password'])
+            events = [
+                seed_event(
+                    user,
+                    sub_events=options['sub_events'],
+                    contestants=options['contestants'],
+                    judges=options['judges'],
+                    criteria=options['criteria'],
+                    fill_scores=options['with_scores'],
+                    title=f'Load test {index + 1}',
+                    rng=rng,
+                )
+                for index in range(options['events'])
+            ]
+
+        judges = Judge.objects.filter(sub_event__event__in=events).order_by('sub_event_id', 'order', 'id')
+        manifest = {
+            'organizer': {'username': user.username, 'password': options['password']},
+            'events': [event.id for event in events],
+            'sub_events': sorted({judge.sub_event_id for judge in judges}),
+            'judges': [{'id': judge.id, 'code': judge.code, 'sub_event': judge.sub_event_id} for judge in judges],
+        }
+        with open(options['manifest'], 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(events)} events, {len(manifest["sub_events"])} sub-events and {len(manifest["judges"])} judges '
+            f'for organizer "{user.username}"; manifest written to {options["manifest"]}'
+        ))
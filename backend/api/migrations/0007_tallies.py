@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from backend.api.tallies import rebuild_tallies
+
+
+def fill_tallies(apps, schema_editor):
+    # Deployments with scores already saved would otherwise rank nobody
+    # until rebuild_tallies is run by hand
+    rebuild_tallies(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContestantTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_sum', models.IntegerField(default=0)),
+                ('score_count', models.IntegerField(default=0)),
+                ('judge_count', models.IntegerField(default=0)),
+                ('weighted_total', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contestant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tally', to='api.contestant')),
+                ('sub_event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='api.subevent')),
+            ],
+            options={
+                'verbose_name_plural': 'Contestant tallies',
+                'ordering': ['-weighted_total', 'contestant_id'],
+                'indexes': [models.Index(fields=['sub_event', '-weighted_total'], name='api_tally_rank_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CriterionTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_sum', models.IntegerField(default=0)),
+                ('score_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contestant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='criterion_tallies', to='api.contestant')),
+                ('criterion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='api.criteria')),
+            ],
+            options={
+                'verbose_name_plural': 'Criterion tallies',
+                'unique_together': {('contestant', 'criterion')},
+            },
+        ),
+        migrations.CreateModel(
+            name='JudgeTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_sum', models.IntegerField(default=0)),
+                ('score_count', models.IntegerField(default=0)),
+                ('weighted_total', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contestant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='judge_tallies', to='api.contestant')),
+                ('judge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='api.judge')),
+            ],
+            options={
+                'ordering': ['-weighted_total', 'contestant_id'],
+                'indexes': [models.Index(fields=['judge', '-weighted_total'], name='api_judgetally_rank_idx')],
+                'unique_together': {('judge', 'contestant')},
+            },
+        ),
+        migrations.RunPython(fill_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_tallies'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contestant',
+            index=models.Index(fields=['sub_event', 'order', 'id'], name='api_contestant_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='criteria',
+            index=models.Index(fields=['sub_event', 'order', 'id'], name='api_criteria_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='judge',
+            index=models.Index(fields=['sub_event', 'type', 'order', 'id'], name='api_judge_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['criterion', 'contestant', 'score'], name='api_score_criterion_idx'),
+        ),
+    ]
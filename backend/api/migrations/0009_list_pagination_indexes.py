@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['-created_at', '-id'], name='api_case_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='casefile',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='api_casefile_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='casenote',
+            index=models.Index(fields=['-created_at', '-id'], name='api_casenote_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['created_by', '-year', '-start_date', '-id'], name='api_event_owner_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subevent',
+            index=models.Index(fields=['event', 'date', 'time', 'id'], name='api_subevent_event_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subevent',
+            index=models.Index(fields=['date', 'time', 'id'], name='api_subevent_order_idx'),
+        ),
+    ]
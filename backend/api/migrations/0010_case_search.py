@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FULLTEXT_INDEXES = [
+    ('api_case', 'api_case_fulltext', ['title', 'description']),
+    ('api_casenote', 'api_casenote_fulltext', ['content']),
+    ('api_casefile', 'api_casefile_fulltext', ['filename', 'description']),
+]
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    # Only MySQL/MariaDB; other databases search through api_searchposting
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    quote = schema_editor.quote_name
+    for table, name, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f'ALTER TABLE {quote(table)} ADD FULLTEXT INDEX {quote(name)} ({", ".join(quote(column) for column in columns)})'
+        )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    quote = schema_editor.quote_name
+    for table, name, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(f'ALTER TABLE {quote(table)} DROP INDEX {quote(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('source', models.CharField(choices=[('case', 'Case'), ('note', 'Note'), ('file', 'File')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('weight', models.IntegerField(default=1)),
+                ('case', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='api.case')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'case'], name='api_searchposting_term_idx'), models.Index(fields=['source', 'object_id'], name='api_searchposting_source_idx')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
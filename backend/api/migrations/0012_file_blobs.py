@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:42
+
+import backend.api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_chunked_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='casefile',
+            name='file',
+            field=models.FileField(storage=backend.api.models.case_file_storage, upload_to='case_files/'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:44
+
+from django.db import migrations, models
+
+
+def fill_contestant_keys(apps, schema_editor):
+    Contestant = apps.get_model('api', 'Contestant')
+    batch = []
+    for contestant in Contestant.objects.only('id', 'name').iterator(chunk_size=1000):
+        contestant.key = ' '.join(contestant.name.split()).casefold()[:200]
+        batch.append(contestant)
+        if len(batch) >= 1000:
+            Contestant.objects.bulk_update(batch, ['key'])
+            batch = []
+    Contestant.objects.bulk_update(batch, ['key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_file_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contestant',
+            name='key',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.RunPython(fill_contestant_keys, migrations.RunPython.noop),
+    ]
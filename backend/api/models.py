@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 import random
-import string
+import uuid
 
 class Case(models.Model):
     STATUS_CHOICES = [
@@ -31,6 +31,9 @@ class Case(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_case_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.case_number} - {self.title}"
@@ -43,24 +46,63 @@ class CaseNote(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_casenote_created_idx'),
+        ]
     
     def __str__(self):
         return f"Note for {self.case.case_number} by {self.author.username}"
 
+def case_file_storage():
+    """Storage of CaseFile.file; see backend.api.storage"""
+    from .storage import ContentAddressedStorage
+    return ContentAddressedStorage()
+
 class CaseFile(models.Model):
     case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name='files')
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
-    file = models.FileField(upload_to='case_files/')
+    file = models.FileField(upload_to='case_files/', storage=case_file_storage)
     filename = models.CharField(max_length=255)
     description = models.TextField(blank=True)
+    size = models.BigIntegerField(null=True, blank=True)  # Bytes; unknown for files uploaded before it was recorded
+    sha256 = models.CharField(max_length=64, blank=True, default='')  # Hex digest of the content, when known
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['-uploaded_at', '-id'], name='api_casefile_uploaded_idx'),
+        ]
     
     def __str__(self):
         return f"{self.filename} for {self.case.case_number}"
 
+class FileBlob(models.Model):
+    """One stored copy of case file content, shared by every CaseFile with the same SHA-256"""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255)  # Storage name of the blob
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)  # CaseFiles pointing at the blob
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} references)"
+
+class UploadSession(models.Model):
+    """A chunked case file upload in progress; the bytes are staged on disk until it is finalized"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name='upload_sessions')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    size = models.BigIntegerField()  # Total bytes announced when the upload started
+    received = models.BigIntegerField(default=0)  # Bytes staged so far; the offset of the next chunk
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Upload of {self.filename} ({self.received}/{self.size} bytes)"
+
 class Event(models.Model):
     STATUS_CHOICES = [
         ('deactivated', 'Deactivated'),
@@ -80,6 +122,10 @@ class Event(models.Model):
     
     class Meta:
         ordering = ['-year', '-start_date']
+        indexes = [
+            # Organizers only list their own events
+            models.Index(fields=['created_by', '-year', '-start_date', '-id'], name='api_event_owner_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.year})"
@@ -102,29 +148,68 @@ class SubEvent(models.Model):
     
     class Meta:
         ordering = ['date', 'time']
+        indexes = [
+            models.Index(fields=['event', 'date', 'time', 'id'], name='api_subevent_event_order_idx'),
+            models.Index(fields=['date', 'time', 'id'], name='api_subevent_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.date}"
 
+def contestant_key(name):
+    """Key that identifies the same contestant across the sub-events of an event: the name, case- and space-folded"""
+    return ' '.join(str(name).split()).casefold()[:200]
+
 class Contestant(models.Model):
     sub_event = models.ForeignKey(SubEvent, on_delete=models.CASCADE, related_name='contestants')
     name = models.CharField(max_length=200)
+    key = models.CharField(max_length=200, blank=True, default='')  # contestant_key(name), kept in sync on save
     order = models.IntegerField(default=0)  # To maintain order of contestants
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['sub_event', 'order', 'id'], name='api_contestant_order_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.key = contestant_key(self.name)
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.name} - {self.sub_event.title}"
 
+def allocate_judge_codes(count, exclude=()):
+    """
+    Generate count unique 6-digit numeric codes for judge login.
+    Candidates are drawn in batches and checked against existing judges with one
+    query per batch; codes in exclude (e.g. already handed out in the same
+    request) are never returned.
+    """
+    codes = []
+    seen = set(exclude)
+    while len(codes) < count:
+        # Over-draw so a batch normally covers collisions without another round trip
+        needed = count - len(codes)
+        candidates = set()
+        while len(candidates) < needed * 2 + 8:
+            code = f'{random.randrange(1000000):06d}'
+            if code not in seen:
+                candidates.add(code)
+        taken = set(Judge.objects.filter(code__in=candidates).values_list('code', flat=True))
+        for code in candidates - taken:
+            if len(codes) == count:
+                break
+            codes.append(code)
+            seen.add(code)
+        seen.update(taken)
+    return codes
+
 def generate_judge_code():
     """Generate a unique 6-digit numeric code for judge login"""
-    while True:
-        code = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-        if not Judge.objects.filter(code=code).exists():
-            return code
+    return allocate_judge_codes(1)[0]
 
 class Judge(models.Model):
     TYPE_CHOICES = [
@@ -142,6 +227,9 @@ class Judge(models.Model):
     
     class Meta:
         ordering = ['type', 'order', 'id']
+        indexes = [
+            models.Index(fields=['sub_event', 'type', 'order', 'id'], name='api_judge_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.code}) - {self.sub_event.title}"
@@ -162,6 +250,9 @@ class Criteria(models.Model):
     class Meta:
         ordering = ['order', 'id']
         verbose_name_plural = 'Criteria'
+        indexes = [
+            models.Index(fields=['sub_event', 'order', 'id'], name='api_criteria_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.points}%) - {self.sub_event.title}"
@@ -177,9 +268,94 @@ class Score(models.Model):
     
     class Meta:
         unique_together = ['judge', 'contestant', 'criterion']  # One score per judge per contestant per criterion
+        # Joins both parents; hot paths call .order_by() or order by the unique index columns instead
         ordering = ['contestant__order', 'criterion__order']
+        indexes = [
+            # Covers the per-criterion averages of the scoreboard and exports
+            models.Index(fields=['criterion', 'contestant', 'score'], name='api_score_criterion_idx'),
+        ]
     
     def __str__(self):
         score_display = self.score if self.score is not None else 'Not scored'
         return f"{self.judge.name} - {self.contestant.name} - {self.criterion.name}: {score_display}%"
 
+class JudgeTally(models.Model):
+    """Running totals of one judge's scores for one contestant, kept in sync with Score writes"""
+    judge = models.ForeignKey(Judge, on_delete=models.CASCADE, related_name='tallies')
+    contestant = models.ForeignKey(Contestant, on_delete=models.CASCADE, related_name='judge_tallies')
+    score_sum = models.IntegerField(default=0)  # Sum of raw scores
+    score_count = models.IntegerField(default=0)  # Number of scored criteria
+    weighted_total = models.DecimalField(max_digits=12, decimal_places=4, default=0)  # Sum of score * points / 100
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['judge', 'contestant']
+        ordering = ['-weighted_total', 'contestant_id']
+        indexes = [
+            models.Index(fields=['judge', '-weighted_total'], name='api_judgetally_rank_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.judge.name} - {self.contestant.name}: {self.weighted_total}"
+
+class CriterionTally(models.Model):
+    """Running totals of all judges' scores for one contestant and criterion, kept in sync with Score writes"""
+    contestant = models.ForeignKey(Contestant, on_delete=models.CASCADE, related_name='criterion_tallies')
+    criterion = models.ForeignKey(Criteria, on_delete=models.CASCADE, related_name='tallies')
+    score_sum = models.IntegerField(default=0)  # Sum of raw scores across judges
+    score_count = models.IntegerField(default=0)  # Judges who scored this cell
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['contestant', 'criterion']
+        verbose_name_plural = 'Criterion tallies'
+    
+    def __str__(self):
+        return f"{self.contestant.name} - {self.criterion.name}: {self.score_sum}/{self.score_count}"
+
+class ContestantTally(models.Model):
+    """Running totals of all judges' scores for a contestant, kept in sync with Score writes"""
+    sub_event = models.ForeignKey(SubEvent, on_delete=models.CASCADE, related_name='tallies')
+    contestant = models.OneToOneField(Contestant, on_delete=models.CASCADE, related_name='tally')
+    score_sum = models.IntegerField(default=0)  # Sum of raw scores across judges
+    score_count = models.IntegerField(default=0)  # Number of scored cells across judges
+    judge_count = models.IntegerField(default=0)  # Judges with at least one score for this contestant
+    # Criterion averages weighted by points, as on the score sheet (tallies.contestant_total)
+    weighted_total = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-weighted_total', 'contestant_id']
+        verbose_name_plural = 'Contestant tallies'
+        indexes = [
+            models.Index(fields=['sub_event', '-weighted_total'], name='api_tally_rank_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.contestant.name}: {self.weighted_total}"
+
+class SearchPosting(models.Model):
+    """
+    One term of the case search inverted index, used when the database has no
+    FULLTEXT support. Rows are written by backend.api.search on save.
+    """
+    SOURCE_CHOICES = [
+        ('case', 'Case'),
+        ('note', 'Note'),
+        ('file', 'File'),
+    ]
+    
+    term = models.CharField(max_length=64)
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name='search_postings')
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    object_id = models.BigIntegerField()  # Id of the case, note or file the term came from
+    weight = models.IntegerField(default=1)  # Term frequency times the field weight
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'case'], name='api_searchposting_term_idx'),
+            models.Index(fields=['source', 'object_id'], name='api_searchposting_source_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} -> case {self.case_id} ({self.source} {self.object_id})"
@@ -0,0 +1,38 @@
+"""
+Cursor (keyset) pagination for the router viewsets.
+
+The ordering comes from the view's `ordering` attribute or, by default, the
+model's Meta.ordering, with the primary key appended so rows come back in a
+total order. DRF's cursor only records the value of the *first* ordering field
+of the last row (plus how many rows sharing that value were already returned),
+so a page is `WHERE first_field < / > value ORDER BY <ordering> LIMIT n`,
+skipping the rows of the boundary value already seen.
+
+That is one index range scan when:
+- an index covers the view's filter columns followed by the ordering columns
+  in the same directions (the composite *_order_idx / *_created_idx indexes on
+  the models), so the database can stop after n rows instead of sorting; and
+- the first ordering field is close to unique (created_at, username). When
+  many rows share it (Event.year, SubEvent.date), paging within those rows
+  falls back to skipping over them like an OFFSET.
+
+Ordering by a field without such an index sorts the whole filtered set on
+every page.
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None) or queryset.model._meta.ordering or ['-pk']
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        ordering = list(ordering)
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            # Break ties in the same direction as the leading field
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
@@ -0,0 +1,183 @@
+"""
+Read-replica routing with read-your-writes.
+
+ReplicaRouter sends reads to the DATABASE_REPLICA_ALIAS database (default
+'replica') only while a read-only view marked with read_from_replica or
+ReplicaReadMixin is running; everything else, and every write, goes to
+'default'. Without that alias in DATABASES the router does nothing.
+
+A replica lags behind the primary, so whoever just wrote keeps reading from
+the primary for DATABASE_REPLICA_PIN_SECONDS (default 10):
+
+  * bumping a cache version (backend.api.caching) pins that sub-event, judge
+    or event, so a judge sees their own save and cached payloads are never
+    rebuilt from rows the replica does not have yet
+  * ReadYourWritesMiddleware pins a user after any successful write request
+
+Pins live in the default cache, which must be shared by the workers: a pin
+set by the worker that took the write has to be seen by the one serving the
+next read. With a replica configured, the router and the middleware raise
+ImproperlyConfigured on a process-local cache (LocMemCache, DummyCache).
+"""
+import contextvars
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from .checks import cache_is_shared
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica_reads = contextvars.ContextVar('cjms_replica_reads', default=False)
+
+
+def replica_alias():
+    """The replica database alias, or None when no replica is configured"""
+    alias = getattr(settings, 'DATABASE_REPLICA_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def require_shared_cache():
+    """Raise ImproperlyConfigured when a replica is configured but the pins would be local to each process"""
+    if replica_alias() is not None and not cache_is_shared():
+        raise ImproperlyConfigured(
+            f'DATABASES has a {replica_alias()!r} replica but the default cache is local to each process. '
+            'Read-your-writes pins must be seen by every worker: set REDIS_URL or MEMCACHED_LOCATION.'
+        )
+
+
+def _pin_key(scope, object_id):
+    return f'cjms:primary-pin:{scope}:{object_id}'
+
+
+def pin_primary(*scoped_ids):
+    """Keep reads for these (scope, id) pairs on the primary while the replica catches up"""
+    if replica_alias() is None or not scoped_ids:
+        return
+    timeout = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 10)
+    cache.set_many({_pin_key(scope, object_id): True for scope, object_id in scoped_ids}, timeout=timeout)
+
+
+def is_pinned(scoped_ids):
+    return bool(scoped_ids) and bool(cache.get_many([_pin_key(scope, object_id) for scope, object_id in scoped_ids]))
+
+
+def start_replica_reads(scoped_ids):
+    """Route reads to the replica unless one of scoped_ids is pinned; returns a token for stop_replica_reads"""
+    if replica_alias() is None or is_pinned(scoped_ids):
+        return None
+    return _replica_reads.set(True)
+
+
+def stop_replica_reads(token):
+    if token is not None:
+        _replica_reads.reset(token)
+
+
+def _user_scope(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return [('user', user.id)]
+    return []
+
+
+def read_from_replica(scopes=None):
+    """
+    Serve a function view's GET requests from the replica. scopes receives the
+    URL kwargs and returns the (scope, id) pairs whose pins keep the request on
+    the primary; the authenticated user is always checked. Apply it below
+    @api_view so request.user is the DRF-authenticated user.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return view(request, *args, **kwargs)
+            scoped_ids = _user_scope(request) + list(scopes(**kwargs) if scopes else [])
+            token = start_replica_reads(scoped_ids)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                stop_replica_reads(token)
+        return wrapper
+    return decorator
+
+
+class ReplicaReadMixin:
+    """ViewSet mixin serving the replica_actions from the replica"""
+    replica_actions = ('list',)
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions:
+            self._replica_token = start_replica_reads(_user_scope(request))
+
+    def dispatch(self, request, *args, **kwargs):
+        # DRF skips finalize_response when a view raises, so reset here or the
+        # flag would stay on for every later read in this thread
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            stop_replica_reads(self._replica_token)
+            self._replica_token = None
+
+
+class ReplicaRouter:
+    """Reads inside replica-read views go to the replica; writes and everything else to the primary"""
+
+    def __init__(self):
+        require_shared_cache()
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Never follow an instance read from the replica back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives the schema through replication
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Pins the authenticated user to the primary after a successful write request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        require_shared_cache()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self._pin_writer(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self._pin_writer(request, response)
+        return response
+
+    def _pin_writer(self, request, response):
+        # DRF copies the token-authenticated user onto the Django request
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_primary(*_user_scope(request))
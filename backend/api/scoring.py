@@ -0,0 +1,397 @@
+"""
+Score aggregation and bulk save helpers used by the tabulation endpoints
+"""
+from datetime import timezone as dt_timezone
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Contestant, ContestantTally, Criteria, Judge, Score, SubEvent
+from .tallies import apply_score_deltas, contestant_total, criterion_average
+
+TWO_PLACES = Decimal('0.01')
+
+
+def round_score(value):
+    """Round a score to two decimal places (half up), matching the score sheet display"""
+    if value is None:
+        return None
+    return float(Decimal(str(value)).quantize(TWO_PLACES, rounding=ROUND_HALF_UP))
+
+
+def rank_totals(totals):
+    """
+    Assign competition ranks (1, 1, 3, ...) to a {contestant_id: total} mapping.
+    Higher totals rank first; equal totals share a rank.
+    """
+    rankings = {}
+    previous_total = None
+    current_rank = 0
+    ordered = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    for index, (contestant_id, total) in enumerate(ordered):
+        if previous_total is None or total != previous_total:
+            current_rank = index + 1
+        rankings[contestant_id] = current_rank
+        previous_total = total
+    return rankings
+
+
+def scoreboard_totals(contestants, criteria):
+    """
+    Per-criterion averages ({contestant_id: {criterion_id: Decimal or None}})
+    and overall weighted totals ({contestant_id: float}) of a sub-event's
+    contestants, in one aggregate query over Score. build_scoreboard and the
+    exports rank these totals with rank_totals.
+    """
+    criteria_ids = [criterion.id for criterion in criteria]
+    weights = {criterion.id: Decimal(criterion.points) for criterion in criteria}
+
+    # Average score per contestant and criterion across all judges
+    averages = {contestant.id: {criterion_id: None for criterion_id in criteria_ids} for contestant in contestants}
+    for row in (
+        Score.objects.filter(criterion_id__in=criteria_ids, score__isnull=False)
+        .order_by()
+        .values('contestant_id', 'criterion_id')
+        .annotate(score_sum=Sum('score'), score_count=Count('score'))
+    ):
+        if row['contestant_id'] in averages:
+            averages[row['contestant_id']][row['criterion_id']] = criterion_average(row['score_sum'], row['score_count'])
+
+    # Overall weighted total from the rounded averages, like the printed sheet;
+    # ContestantTally.weighted_total is maintained with the same formula
+    totals = {
+        contestant_id: round_score(contestant_total(contestant_averages, weights))
+        for contestant_id, contestant_averages in averages.items()
+    }
+    return averages, totals
+
+
+def build_scoreboard(contestants, judges, criteria):
+    """
+    Compute per-criterion averages, weighted totals and rankings for a sub-event.
+
+    Takes the already-loaded contestants, judges and criteria of the sub-event and
+    runs three queries over Score: per-cell averages (scoreboard_totals), per-judge
+    weighted sums and the raw cells needed to render each judge's sheet.
+    """
+    criteria_ids = [criterion.id for criterion in criteria]
+    scores = Score.objects.filter(criterion_id__in=criteria_ids).order_by()
+    averages, totals = scoreboard_totals(contestants, criteria)
+
+    # Weighted total per judge and contestant; dividing by 100 in Python keeps
+    # integer arithmetic exact on backends that store decimals as integers
+    judge_totals = {judge.id: {contestant.id: 0.0 for contestant in contestants} for judge in judges}
+    for row in (
+        scores.filter(score__isnull=False)
+        .values('judge_id', 'contestant_id')
+        .annotate(weighted=Sum(F('score') * F('criterion__points')))
+    ):
+        if row['judge_id'] in judge_totals and row['contestant_id'] in judge_totals[row['judge_id']]:
+            judge_totals[row['judge_id']][row['contestant_id']] = round_score(Decimal(str(row['weighted'])) / 100)
+
+    # Raw cells and comments grouped the same way as judge_scores_view
+    cells = {judge.id: {'scores': {}, 'comments': {}} for judge in judges}
+    for judge_id, contestant_id, criterion_id, score, comments in scores.values_list(
+        'judge_id', 'contestant_id', 'criterion_id', 'score', 'comments'
+    ):
+        if judge_id not in cells:
+            continue
+        sheet = cells[judge_id]
+        if contestant_id not in sheet['scores']:
+            sheet['scores'][contestant_id] = {}
+            sheet['comments'][contestant_id] = comments or ''
+        sheet['scores'][contestant_id][criterion_id] = score
+
+    return {
+        'scores': cells,
+        'averages': {
+            contestant_id: {criterion_id: round_score(average) for criterion_id, average in contestant_averages.items()}
+            for contestant_id, contestant_averages in averages.items()
+        },
+        'totals': totals,
+        'rankings': rank_totals(totals),
+        'judge_totals': judge_totals,
+        'judge_rankings': {
+            judge_id: rank_totals(contestant_totals)
+            for judge_id, contestant_totals in judge_totals.items()
+        },
+    }
+
+
+def build_event_leaderboard(event_id):
+    """
+    Overall standings of an event: each contestant's weighted totals summed over
+    the sub-events, with contestants matched across sub-events by Contestant.key.
+    The sums run in the database over the maintained ContestantTally rows, whose
+    weighted_total is the sub-event's score sheet total (scoreboard_totals)
+    already rounded to two places, so the sums add up exactly what the sheets show.
+    """
+    sub_events = list(SubEvent.objects.filter(event_id=event_id).values('id', 'title', 'date'))
+    tallies = ContestantTally.objects.filter(sub_event__event_id=event_id, score_count__gt=0).order_by()
+
+    per_sub_event = {}
+    for key, sub_event_id, weighted_total in tallies.values_list('contestant__key', 'sub_event_id', 'weighted_total'):
+        per_sub_event.setdefault(key, {})[sub_event_id] = round_score(weighted_total)
+
+    standings = []
+    for row in (
+        tallies.values('contestant__key')
+        .annotate(
+            name=Min('contestant__name'),
+            total=Sum('weighted_total'),
+            sub_event_count=Count('sub_event_id', distinct=True),
+        )
+        .order_by('-total', 'contestant__key')
+    ):
+        standings.append({
+            'key': row['contestant__key'],
+            'name': row['name'],
+            'total': round_score(row['total']),
+            'average': round_score(row['total'] / row['sub_event_count']),
+            'sub_event_count': row['sub_event_count'],
+            'sub_event_totals': per_sub_event.get(row['contestant__key'], {}),
+        })
+
+    rankings = rank_totals({index: row['total'] for index, row in enumerate(standings)})
+    for index, row in enumerate(standings):
+        row['rank'] = rankings[index]
+
+    return {
+        'event': event_id,
+        'sub_events': sub_events,
+        'leaderboard': standings,
+    }
+
+
+def parse_score_value(value):
+    """
+    Normalize a submitted cell value to an int (or None for an empty cell).
+    Raises ValueError when the score is outside 0-100.
+    """
+    if isinstance(value, dict):
+        value = value.get('score')
+    if value is None or value == '':
+        return None
+    try:
+        score = int(value)
+    except (ValueError, TypeError):
+        # Non-numeric input clears the cell
+        return None
+    if score < 0 or score > 100:
+        raise ValueError(score)
+    return score
+
+
+def parse_version(value):
+    """Parse a client-supplied Score.updated_at stamp; None means the cell is expected not to exist"""
+    if value is None or value == '':
+        return None
+    version = parse_datetime(str(value))
+    if version is None:
+        raise ValueError(value)
+    if timezone.is_naive(version):
+        version = timezone.make_aware(version, dt_timezone.utc)
+    return version
+
+
+def changes_from_sheet(scores_data):
+    """
+    Convert the legacy sheet payload
+    {contestant_id: {criterion_id: {"score": value}, "comments": "..."}}
+    into the list of changes accepted by save_score_changes
+    """
+    changes = []
+    for contestant_key, data in scores_data.items():
+        for key, value in data.items():
+            if key == 'comments':
+                changes.append({'contestant': contestant_key, 'comments': value})
+            else:
+                changes.append({'contestant': contestant_key, 'criterion': key, 'score': value})
+    return changes
+
+
+def _score_state(judge, contestant_id, criterion_id, score=None):
+    """Server-side state of a cell, reported back to the client on a version conflict"""
+    return {
+        'judge': judge.id,
+        'contestant': contestant_id,
+        'criterion': criterion_id,
+        'score': score.score if score else None,
+        'comments': score.comments if score else '',
+        'updated_at': score.updated_at if score else None,
+    }
+
+
+def save_score_changes(judge, changes):
+    """
+    Apply a list of cell-level changes to a judge's score sheet.
+
+    Each change is either a score cell
+        {"contestant": id, "criterion": id, "score": value, "updated_at": stamp}
+    or a comment for a contestant
+        {"contestant": id, "comments": "text"}.
+    When a cell carries "updated_at" (the Score.updated_at the client last saw, or
+    null for a cell it has never seen saved) it is only written if the stored row
+    still has that stamp; otherwise the current server state is reported as a conflict.
+    Cells without "updated_at" are written unconditionally.
+
+    Contestants and criteria are resolved with one query each, the changes are
+    diffed against the existing rows and only real differences are written with
+    bulk_update/bulk_create inside one transaction, together with the matching
+    JudgeTally/ContestantTally updates. The transaction locks the judge row, so
+    concurrent saves for the same judge are applied one after the other.
+
+    A comment for a contestant with no saved cell yet is stored on unscored
+    (null) cells for every criterion.
+
+    Returns (touched, conflicts, errors): the Score rows that were written, the
+    server state of every conflicting cell and a list of error messages.
+    """
+    contestants = set(
+        Contestant.objects.filter(sub_event_id=judge.sub_event_id).order_by().values_list('id', flat=True)
+    )
+    criteria = dict(
+        Criteria.objects.filter(sub_event_id=judge.sub_event_id).order_by().values_list('id', 'points')
+    )
+    
+    errors = []
+    cells = {}
+    comments_by_contestant = {}
+    
+    def add_error(message):
+        if message not in errors:
+            errors.append(message)
+    
+    for change in changes:
+        if not isinstance(change, dict):
+            add_error(f'Invalid change {change!r}')
+            continue
+        
+        contestant_key = change.get('contestant')
+        try:
+            contestant_id = int(contestant_key)
+        except (ValueError, TypeError):
+            contestant_id = None
+        if contestant_id not in contestants:
+            add_error(f'Contestant {contestant_key} not found')
+            continue
+        
+        if 'criterion' not in change:
+            comments = change.get('comments')
+            comments_by_contestant[contestant_id] = comments or ''
+            continue
+        
+        criterion_key = change.get('criterion')
+        try:
+            criterion_id = int(criterion_key)
+        except (ValueError, TypeError):
+            criterion_id = None
+        if criterion_id not in criteria:
+            add_error(f'Criterion {criterion_key} not found')
+            continue
+        
+        try:
+            score_value = parse_score_value(change.get('score'))
+        except ValueError as e:
+            add_error(f'Score {e.args[0]} for criterion {criterion_key} is out of range (0-100)')
+            continue
+        
+        check_version = 'updated_at' in change
+        try:
+            version = parse_version(change.get('updated_at'))
+        except ValueError:
+            add_error(f'Invalid version {change.get("updated_at")} for criterion {criterion_key}')
+            continue
+        
+        cells[(contestant_id, criterion_id)] = (score_value, check_version, version)
+    
+    if not cells and not comments_by_contestant:
+        return [], [], errors
+    
+    contestant_ids = {key[0] for key in cells} | set(comments_by_contestant)
+    now = timezone.now()
+    conflicts = []
+    
+    with transaction.atomic():
+        # Saves of one judge run one at a time: no other request can insert one of
+        # this judge's cells between the read below and the commit, so a cell
+        # missing here is really new and its version check and tally delta hold
+        list(Judge.objects.select_for_update().filter(id=judge.id).order_by().values_list('id', flat=True))
+        existing = {
+            (score.contestant_id, score.criterion_id): score
+            for score in Score.objects.select_for_update().filter(
+                judge=judge, contestant_id__in=contestant_ids
+            ).order_by()
+        }
+        
+        # Comments are stored on every score of a contestant; new cells inherit
+        # the submitted comment or the one already on the contestant's other cells
+        current_comments = {}
+        for (contestant_id, criterion_id), score in existing.items():
+            current_comments.setdefault(contestant_id, score.comments)
+        
+        to_create = []
+        to_update = {}
+        deltas = []
+        for key, (score_value, check_version, version) in cells.items():
+            contestant_id, criterion_id = key
+            score = existing.get(key)
+            if check_version and (score.updated_at if score else None) != version:
+                conflicts.append(_score_state(judge, contestant_id, criterion_id, score))
+                continue
+            
+            comments = comments_by_contestant.get(contestant_id, current_comments.get(contestant_id, ''))
+            if score is None:
+                to_create.append(Score(
+                    judge=judge,
+                    contestant_id=contestant_id,
+                    criterion_id=criterion_id,
+                    score=score_value,
+                    comments=comments,
+                ))
+                deltas.append((contestant_id, criterion_id, None, score_value))
+            elif score.score != score_value:
+                deltas.append((contestant_id, criterion_id, score.score, score_value))
+                score.score = score_value
+                score.updated_at = now
+                to_update[key] = score
+        
+        # A comment for a contestant without any saved cell is kept on unscored ones
+        created_for = {score.contestant_id for score in to_create}
+        for contestant_id, comments in comments_by_contestant.items():
+            if not comments or contestant_id in current_comments or contestant_id in created_for:
+                continue
+            to_create.extend(
+                Score(judge=judge, contestant_id=contestant_id, criterion_id=criterion_id, score=None, comments=comments)
+                for criterion_id in criteria
+                if (contestant_id, criterion_id) not in cells
+            )
+        
+        for key, score in existing.items():
+            comments = comments_by_contestant.get(key[0])
+            if comments is not None and score.comments != comments:
+                score.comments = comments
+                score.updated_at = now
+                to_update[key] = score
+        
+        if to_update:
+            Score.objects.bulk_update(to_update.values(), ['score', 'comments', 'updated_at'])
+        if to_create:
+            Score.objects.bulk_create(to_create)
+        
+        apply_score_deltas(judge, deltas, criteria)
+        
+        # Re-read the written rows: MariaDB cannot return ids from bulk inserts
+        touched_keys = set(to_update) | {(score.contestant_id, score.criterion_id) for score in to_create}
+        touched = []
+        if touched_keys:
+            touched = [
+                score for score in Score.objects.filter(
+                    judge=judge, contestant_id__in={key[0] for key in touched_keys}
+                ).order_by('contestant_id', 'criterion_id')
+                if (score.contestant_id, score.criterion_id) in touched_keys
+            ]
+    
+    return touched, conflicts, errors
+
@@ -0,0 +1,182 @@
+"""
+Ranked search over cases, their notes and file metadata.
+
+On MySQL/MariaDB the FULLTEXT indexes created by migration 0010 answer the
+query with MATCH ... AGAINST. Other databases use an inverted index kept in
+SearchPosting: every save of a case, note or file replaces that object's
+postings, so a search is a single indexed lookup on the query terms ranked by
+term weight and inverse document frequency. Set CASE_SEARCH_BACKEND to
+'fulltext' or 'python' to override the choice made from the database vendor;
+run the rebuild_search_index command after switching to 'python' or after
+bulk imports, which bypass the save signals.
+
+Queries without whitespace also match case numbers by prefix, and those
+matches rank first.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import connection, models
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Case, CaseNote, CaseFile, SearchPosting
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+MAX_QUERY_TERMS = 10
+# Ranks case number prefix matches above any text match
+CASE_NUMBER_BOOST = 1000.0
+
+# (model, field weights) per SearchPosting.source
+SOURCES = {
+    'case': (Case, [('title', 3), ('description', 1)]),
+    'note': (CaseNote, [('content', 1)]),
+    'file': (CaseFile, [('filename', 2), ('description', 1)]),
+}
+
+# Columns of the FULLTEXT indexes and the weight of their relevance
+FULLTEXT_SOURCES = [
+    (Case, 'id', ['title', 'description'], 2.0),
+    (CaseNote, 'case_id', ['content'], 1.0),
+    (CaseFile, 'case_id', ['filename', 'description'], 1.0),
+]
+
+
+def tokenize(text):
+    """Lower-cased words of at least two characters, cut to the SearchPosting.term length"""
+    return [token[:64] for token in TOKEN_RE.findall((text or '').lower()) if len(token) > 1]
+
+
+def uses_fulltext():
+    backend = getattr(settings, 'CASE_SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return connection.vendor == 'mysql'
+    return backend == 'fulltext'
+
+
+def _case_id(source, obj):
+    return obj.id if source == 'case' else obj.case_id
+
+
+def index_objects(source, objects):
+    """Replace the postings of these cases, notes or files (a SearchPosting.source)"""
+    objects = list(objects)
+    if not objects:
+        return
+    model, fields = SOURCES[source]
+    postings = []
+    for obj in objects:
+        weights = Counter()
+        for name, field_weight in fields:
+            for term in tokenize(getattr(obj, name)):
+                weights[term] += field_weight
+        postings.extend(
+            SearchPosting(term=term, case_id=_case_id(source, obj), source=source, object_id=obj.id, weight=weight)
+            for term, weight in weights.items()
+        )
+    SearchPosting.objects.filter(source=source, object_id__in=[obj.id for obj in objects]).delete()
+    SearchPosting.objects.bulk_create(postings, batch_size=1000)
+
+
+def rebuild_search_index(batch_size=1000):
+    """Re-index every case, note and file. Returns the number of postings written."""
+    SearchPosting.objects.all().delete()
+    for source, (model, fields) in SOURCES.items():
+        columns = ['id'] + [name for name, _ in fields] + ([] if source == 'case' else ['case_id'])
+        batch = []
+        for obj in model.objects.order_by().only(*columns).iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                index_objects(source, batch)
+                batch = []
+        index_objects(source, batch)
+    return SearchPosting.objects.count()
+
+
+def _source_for(sender):
+    for source, (model, _) in SOURCES.items():
+        if sender is model:
+            return source
+    return None
+
+
+@receiver(post_save, sender=Case)
+@receiver(post_save, sender=CaseNote)
+@receiver(post_save, sender=CaseFile)
+def _index_on_save(sender, instance, raw=False, **kwargs):
+    if raw or uses_fulltext():
+        return
+    index_objects(_source_for(sender), [instance])
+
+
+@receiver(post_delete, sender=CaseNote)
+@receiver(post_delete, sender=CaseFile)
+def _unindex_on_delete(sender, instance, **kwargs):
+    # Postings of a deleted case go with it through the foreign key
+    if uses_fulltext():
+        return
+    SearchPosting.objects.filter(source=_source_for(sender), object_id=instance.id).delete()
+
+
+def _case_number_scores(query, limit, scores):
+    if not query or any(char.isspace() for char in query):
+        return
+    # istartswith is a plain LIKE 'x%' on MySQL, so it can use the unique index
+    for case_id, case_number in (
+        Case.objects.filter(case_number__istartswith=query).order_by('case_number')
+        .values_list('id', 'case_number')[:limit]
+    ):
+        scores[case_id] += CASE_NUMBER_BOOST * (2 if case_number.lower() == query.lower() else 1)
+
+
+def _fulltext_scores(query, limit, scores):
+    for model, case_column, columns, weight in FULLTEXT_SOURCES:
+        table = connection.ops.quote_name(model._meta.db_table)
+        match_columns = ', '.join(f'{table}.{connection.ops.quote_name(column)}' for column in columns)
+        match = RawSQL(f'MATCH ({match_columns}) AGAINST (%s IN NATURAL LANGUAGE MODE)', (query,), output_field=FloatField())
+        rows = (
+            model.objects.alias(match=match).filter(match__gt=0).order_by()
+            .values(case_column).annotate(relevance=Sum(match)).order_by('-relevance')
+            .values_list(case_column, 'relevance')[:limit]
+        )
+        for case_id, relevance in rows:
+            scores[case_id] += float(relevance) * weight
+
+
+def _index_scores(query, limit, scores):
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return
+    postings = SearchPosting.objects.filter(term__in=terms).order_by()
+    doc_freq = dict(postings.values('term').annotate(cases=Count('case_id', distinct=True)).values_list('term', 'cases'))
+    if not doc_freq:
+        return
+    total = Case.objects.count()
+    relevance = Sum(models.Case(
+        *[
+            models.When(term=term, then=F('weight') * Value(math.log(1 + total / cases)))
+            for term, cases in doc_freq.items()
+        ],
+        output_field=FloatField(),
+    ))
+    # Cases matching more of the terms rank first, then by tf-idf
+    rows = (
+        postings.values('case_id').annotate(matched=Count('term', distinct=True), relevance=relevance)
+        .order_by('-matched', '-relevance').values_list('case_id', 'matched', 'relevance')[:limit]
+    )
+    for case_id, matched, relevance in rows:
+        scores[case_id] += matched + float(relevance)
+
+
+def search_cases(query, limit=20):
+    """Ids of the best matching cases with their relevance, best first: [(case_id, relevance)]"""
+    query = ' '.join(query.split())
+    scores = defaultdict(float)
+    _case_number_scores(query, limit, scores)
+    if uses_fulltext():
+        _fulltext_scores(query, limit, scores)
+    else:
+        _index_scores(query, limit, scores)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
@@ -0,0 +1,91 @@
+"""
+Bulk seeding of events, sub-events and score sheets for benchmarks and load tests
+"""
+import datetime
+import random
+from django.contrib.auth.models import User
+from .models import Event, SubEvent, Contestant, Judge, Criteria, Score, allocate_judge_codes, contestant_key
+from .tallies import rebuild_tallies
+
+
+def seed_user(username=None, password=None):
+    """Create an organizer account; the username is randomized when not given"""
+    username = username or f'seed-{random.randrange(10 ** 9)}'
+    if password:
+        return User.objects.create_user(username=username, password=password)
+    return User.objects.create(username=username)
+
+
+def seed_sub_event(event, contestants=20, judges=5, criteria=5, fill_scores=True, title=None, rng=None):
+    """
+    Create a sub-event with its contestants, judges and criteria using bulk_create,
+    optionally with a complete score matrix and its tallies. Returns the SubEvent.
+    """
+    rng = rng or random.Random()
+    sub_event = SubEvent.objects.create(
+        event=event,
+        title=title or f'Sub-event {rng.randrange(10 ** 6)}',
+        date=event.start_date,
+        time=datetime.time(18, 0),
+        location=event.location,
+        status='activated',
+    )
+
+    Contestant.objects.bulk_create([
+        Contestant(sub_event=sub_event, name=name, key=contestant_key(name), order=index)
+        for index, name in enumerate(f'Contestant {index + 1}' for index in range(contestants))
+    ])
+    Judge.objects.bulk_create([
+        Judge(sub_event=sub_event, name=f'Judge {index + 1}', code=code, order=index)
+        for index, code in enumerate(allocate_judge_codes(judges))
+    ])
+    # Spread 100 points over the criteria
+    weights = [100 // criteria] * criteria if criteria else []
+    if weights:
+        weights[0] += 100 - sum(weights)
+    Criteria.objects.bulk_create([
+        Criteria(sub_event=sub_event, name=f'Criterion {index + 1}', points=weight, order=index)
+        for index, weight in enumerate(weights)
+    ])
+
+    if fill_scores:
+        # Bulk inserts do not return ids on MariaDB, so read them back
+        contestant_ids = list(Contestant.objects.filter(sub_event=sub_event).values_list('id', flat=True))
+        judge_ids = list(Judge.objects.filter(sub_event=sub_event).values_list('id', flat=True))
+        criterion_ids = list(Criteria.objects.filter(sub_event=sub_event).values_list('id', flat=True))
+        Score.objects.bulk_create(
+            (
+                Score(
+                    judge_id=judge_id,
+                    contestant_id=contestant_id,
+                    criterion_id=criterion_id,
+                    score=rng.randint(70, 100),
+                )
+                for judge_id in judge_ids
+                for contestant_id in contestant_ids
+                for criterion_id in criterion_ids
+            ),
+            batch_size=1000,
+        )
+        # bulk_create bypasses save_score_changes, which keeps the tallies in step
+        rebuild_tallies([sub_event.id])
+
+    return sub_event
+
+
+def seed_event(user, sub_events=3, title=None, rng=None, **sub_event_options):
+    """Create an event owned by user with sub_events seeded sub-events"""
+    rng = rng or random.Random()
+    today = datetime.date.today()
+    event = Event.objects.create(
+        title=title or f'Event {rng.randrange(10 ** 6)}',
+        year=today.year,
+        start_date=today,
+        end_date=today + datetime.timedelta(days=max(sub_events - 1, 0)),
+        location='Main Hall',
+        status='activated',
+        created_by=user,
+    )
+    for index in range(sub_events):
+        seed_sub_event(event, title=f'Round {index + 1}', rng=rng, **sub_event_options)
+    return event
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Case, CaseNote, CaseFile, Event, SubEvent, Contestant, Judge, Criteria, Score
+from .models import Case, CaseNote, CaseFile, UploadSession, Event, SubEvent, Contestant, Judge, Criteria, Score, ContestantTally
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,8 +13,27 @@ class CaseFileSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = CaseFile
-        fields = ['id', 'file', 'filename', 'description', 'uploaded_by', 'uploaded_at']
-        read_only_fields = ['id', 'uploaded_by', 'uploaded_at']
+        fields = ['id', 'file', 'filename', 'description', 'size', 'sha256', 'uploaded_by', 'uploaded_at']
+        read_only_fields = ['id', 'size', 'sha256', 'uploaded_by', 'uploaded_at']
+    
+    def create(self, validated_data):
+        validated_data.setdefault('size', validated_data['file'].size)
+        return super().create(validated_data)
+    
+    def update(self, instance, validated_data):
+        if 'file' in validated_data:
+            # New content: the old size and digest no longer apply
+            validated_data['size'] = validated_data['file'].size
+            validated_data['sha256'] = ''
+        return super().update(instance, validated_data)
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Chunked upload session; "received" is the offset the next chunk must start at"""
+    
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'case', 'filename', 'description', 'size', 'received', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'received', 'created_at', 'updated_at']
 
 class CaseNoteSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
@@ -39,6 +58,22 @@ class CaseSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
 
+class CaseListSerializer(serializers.ModelSerializer):
+    """Case list entry: counts of notes and files instead of the nested arrays"""
+    assigned_to = UserSerializer(read_only=True)
+    created_by = UserSerializer(read_only=True)
+    note_count = serializers.IntegerField(read_only=True)
+    file_count = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Case
+        fields = [
+            'id', 'case_number', 'title', 'description', 'status', 'priority',
+            'assigned_to', 'created_by', 'created_at', 'updated_at', 'due_date',
+            'note_count', 'file_count'
+        ]
+        read_only_fields = fields
+
 class CaseCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Case
@@ -92,12 +127,41 @@ class CriteriaSerializer(serializers.ModelSerializer):
         fields = ['id', 'sub_event', 'name', 'points', 'order', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class SubEventWithJudgesSerializer(SubEventSerializer):
+    """Sub-event with its judge roster and setting counts, for ?expand=judges listings"""
+    judges = JudgeSerializer(many=True, read_only=True)
+    contestant_count = serializers.IntegerField(read_only=True)
+    criteria_count = serializers.IntegerField(read_only=True)
+    
+    class Meta(SubEventSerializer.Meta):
+        fields = SubEventSerializer.Meta.fields + ['judges', 'contestant_count', 'criteria_count']
+
 class ScoreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Score
         fields = ['id', 'judge', 'contestant', 'criterion', 'score', 'comments', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class ScoreConflictSerializer(serializers.Serializer):
+    """Current server state of a score cell that was changed by someone else"""
+    judge = serializers.IntegerField()
+    contestant = serializers.IntegerField()
+    criterion = serializers.IntegerField()
+    score = serializers.IntegerField(allow_null=True)
+    comments = serializers.CharField(allow_blank=True)
+    updated_at = serializers.DateTimeField(allow_null=True)
+
+class ContestantTallySerializer(serializers.ModelSerializer):
+    contestant_name = serializers.CharField(source='contestant.name', read_only=True)
+    
+    class Meta:
+        model = ContestantTally
+        fields = [
+            'contestant', 'contestant_name', 'score_sum', 'score_count',
+            'judge_count', 'weighted_total', 'updated_at'
+        ]
+        read_only_fields = fields
+
 class SubEventSettingsSerializer(serializers.Serializer):
     """Serializer for saving sub-event settings (contestants, judges, criteria)"""
     contestants = ContestantSerializer(many=True, required=False)
@@ -0,0 +1,91 @@
+"""
+Content-addressed file storage for case files.
+
+Files are stored once per SHA-256 digest under case_files/blobs/ab/<digest>,
+whatever name they were uploaded under; the original name is kept on the
+CaseFile. Saving content that is already stored only hashes it and returns
+the existing name. Which CaseFiles use a blob is counted in FileBlob rows by
+backend.api.blobs, which deletes the blob with its last reference. Files are
+written under the lock of that row (blobs.claim_blob), and rewritten when the
+row is new or unreferenced, so a pending delete cannot remove content that is
+being stored again.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+BLOB_PREFIX = 'case_files/blobs'
+BLOB_NAME_RE = re.compile(r'^case_files/blobs/[0-9a-f]{2}/([0-9a-f]{64})$')
+BUFFER_SIZE = 64 * 1024
+
+
+def blob_name(digest):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest}'
+
+
+def blob_digest(name):
+    """The digest a storage name refers to, or None for files stored before deduplication"""
+    match = BLOB_NAME_RE.match(name or '')
+    return match.group(1) if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by the SHA-256 of their content"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save; equal content must map to the same file
+        return name
+
+    def _save(self, name, content):
+        # Already hashed (a finalized chunked upload carries its digest)
+        digest = getattr(content, 'sha256', None)
+        if hasattr(content, 'temporary_file_path'):
+            source = content.temporary_file_path()
+            digest = digest or self._hash_path(source)
+            self._store(digest, os.path.getsize(source), lambda final: file_move_safe(source, final, allow_overwrite=True))
+            return blob_name(digest)
+
+        # Hash while copying into a temporary file next to the blobs, then
+        # rename it into place unless that content is already stored
+        directory = self.path(BLOB_PREFIX)
+        os.makedirs(directory, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as staged:
+                for chunk in content.chunks(BUFFER_SIZE):
+                    hasher.update(chunk)
+                    staged.write(chunk)
+            digest = hasher.hexdigest()
+            self._store(digest, os.path.getsize(temporary), lambda final: os.replace(temporary, final))
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return blob_name(digest)
+
+    def _store(self, digest, size, put):
+        """Put the content into place with put(final_path) unless the blob is already stored and referenced"""
+        from .blobs import claim_blob
+
+        name = blob_name(digest)
+        final = self.path(name)
+        with transaction.atomic():
+            if claim_blob(digest, name, size) or not os.path.exists(final):
+                os.makedirs(os.path.dirname(final), exist_ok=True)
+                put(final)
+                self._set_permissions(final)
+
+    def _hash_path(self, path):
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for block in iter(lambda: source.read(BUFFER_SIZE), b''):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def _set_permissions(self, path):
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
@@ -0,0 +1,161 @@
+"""
+Diff-based saving of a sub-event's contestants, judges and criteria.
+
+Incoming rows are matched to the stored ones by id: matched rows are updated
+only when something changed, unmatched rows are inserted and stored rows that
+are missing from the payload are deleted. Scores of rows that survive the edit
+are left untouched.
+"""
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.utils import timezone
+from .models import Contestant, Judge, Criteria, allocate_judge_codes, contestant_key
+from .tallies import rebuild_tallies
+
+
+class SettingsError(ValueError):
+    """Raised for payload problems that should be reported as a 400"""
+
+
+def _row_id(item):
+    try:
+        return int(item.get('id'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_points(value):
+    try:
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError, TypeError):
+        return Decimal('0')
+
+
+def _diff_rows(model, sub_event, items, build_fields, now):
+    """
+    Match items to the sub-event's stored rows of model.
+    Returns (to_update, changed_fields, to_create, removed_ids) where to_create
+    holds (row, item) pairs.
+    """
+    existing = {row.id: row for row in model.objects.filter(sub_event=sub_event).order_by()}
+    kept = set()
+    to_update = []
+    changed_fields = set()
+    to_create = []
+
+    for idx, item in enumerate(items or []):
+        if not item or not item.get('name'):  # Skip rows without a name
+            continue
+        fields = build_fields(item, idx)
+        row = existing.get(_row_id(item))
+        if row is not None and row.id not in kept:
+            kept.add(row.id)
+            changed = [name for name, value in fields.items() if getattr(row, name) != value]
+            if changed:
+                for name in changed:
+                    setattr(row, name, fields[name])
+                row.updated_at = now
+                to_update.append(row)
+                changed_fields.update(changed)
+        else:
+            to_create.append((model(sub_event=sub_event, **fields), item))
+
+    removed_ids = set(existing) - kept
+    return to_update, changed_fields, to_create, removed_ids
+
+
+def _contestant_fields(item, idx):
+    name = str(item['name'])
+    if len(name) > 200:
+        raise SettingsError('Error creating contestant: name is longer than 200 characters')
+    return {'name': name, 'key': contestant_key(name), 'order': idx}
+
+
+def _judge_fields(item, idx):
+    name = str(item['name'])
+    if len(name) > 200:
+        raise SettingsError('Error creating judge: name is longer than 200 characters')
+    judge_type = item.get('type') or 'judge'
+    if judge_type not in dict(Judge.TYPE_CHOICES):
+        raise SettingsError(f'Error creating judge: invalid type {judge_type}')
+    return {'name': name, 'type': judge_type, 'order': idx}
+
+
+def _criteria_fields(item, idx):
+    name = str(item['name'])
+    if len(name) > 200:
+        raise SettingsError('Error creating criteria: name is longer than 200 characters')
+    return {'name': name, 'points': _parse_points(item.get('points', 0)), 'order': idx}
+
+
+def save_subevent_settings(sub_event, data):
+    """
+    Apply a settings payload ({"contestants": [...], "judges": [...], "criteria": [...]},
+    rows optionally carrying their "id") to sub_event in one transaction.
+    Returns the resulting (contestants, judges, criteria) querysets.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        contestants_update, _, contestants_create, contestants_removed = _diff_rows(
+            Contestant, sub_event, data.get('contestants', []), _contestant_fields, now
+        )
+        judges_update, _, judges_create, judges_removed = _diff_rows(
+            Judge, sub_event, data.get('judges', []), _judge_fields, now
+        )
+        criteria_update, criteria_changed, criteria_create, criteria_removed = _diff_rows(
+            Criteria, sub_event, data.get('criteria', []), _criteria_fields, now
+        )
+
+        # Removing rows cascades to their scores; everything else keeps its scores
+        if contestants_removed:
+            Contestant.objects.filter(id__in=contestants_removed).delete()
+        if judges_removed:
+            Judge.objects.filter(id__in=judges_removed).delete()
+        if criteria_removed:
+            Criteria.objects.filter(id__in=criteria_removed).delete()
+
+        # New judges keep a supplied code when it is valid and free; the rest
+        # get codes from one batch allocation
+        if judges_create:
+            requested_codes = {}
+            for judge, item in judges_create:
+                code = str(item.get('code') or '')
+                if len(code) == 6 and code.isdigit():
+                    requested_codes.setdefault(code, judge)
+            taken = set(
+                Judge.objects.filter(code__in=requested_codes.keys()).values_list('code', flat=True)
+            )
+            needs_code = []
+            for judge, item in judges_create:
+                code = str(item.get('code') or '')
+                if requested_codes.get(code) is judge and code not in taken:
+                    judge.code = code
+                else:
+                    needs_code.append(judge)
+            for judge, code in zip(needs_code, allocate_judge_codes(len(needs_code), exclude=requested_codes.keys())):
+                judge.code = code
+
+        if contestants_update:
+            Contestant.objects.bulk_update(contestants_update, ['name', 'key', 'order', 'updated_at'])
+        if judges_update:
+            Judge.objects.bulk_update(judges_update, ['name', 'type', 'order', 'updated_at'])
+        if criteria_update:
+            Criteria.objects.bulk_update(criteria_update, ['name', 'points', 'order', 'updated_at'])
+        if contestants_create:
+            Contestant.objects.bulk_create([row for row, item in contestants_create])
+        if judges_create:
+            Judge.objects.bulk_create([row for row, item in judges_create])
+        if criteria_create:
+            Criteria.objects.bulk_create([row for row, item in criteria_create])
+
+        # Tallies count each judge's cells and weight the criterion averages by
+        # points, so they must be recomputed when a judge disappears or a weight changes
+        if judges_removed or criteria_removed or 'points' in criteria_changed:
+            rebuild_tallies([sub_event.id])
+
+    return (
+        Contestant.objects.filter(sub_event=sub_event),
+        Judge.objects.filter(sub_event=sub_event),
+        Criteria.objects.filter(sub_event=sub_event),
+    )
@@ -0,0 +1,221 @@
+"""
+Maintenance of the denormalized JudgeTally / CriterionTally / ContestantTally rows.
+
+Score writes feed their per-cell deltas to apply_score_deltas inside the same
+transaction, so reading a sub-event's rankings is a single indexed query on
+ContestantTally. A contestant's weighted_total comes from its CriterionTally
+rows through contestant_total, the formula build_scoreboard uses, so rankings,
+exports and leaderboards agree with the score sheet. rebuild_tallies
+recomputes everything from Score and is used by the rebuild_tallies management
+command and after judges, criteria or criteria weights change.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from .models import ContestantTally, CriterionTally, JudgeTally
+
+TWO_PLACES = Decimal('0.01')
+FOUR_PLACES = Decimal('0.0001')
+
+
+def criterion_average(score_sum, score_count):
+    """Average of a cell across judges, rounded half up to two places like the score sheet; None when unscored"""
+    if not score_count:
+        return None
+    return (Decimal(score_sum) / score_count).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def contestant_total(averages, weights):
+    """
+    Weighted total of a contestant from its {criterion_id: average} (as returned
+    by criterion_average) and the {criterion_id: points} weights, rounded to two places
+    """
+    total = Decimal('0')
+    for criterion_id, average in averages.items():
+        if average is not None:
+            total += average * Decimal(weights[criterion_id]) / 100
+    return total.quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def apply_score_deltas(judge, deltas, weights):
+    """
+    Update the judge's and contestants' tallies for a batch of changed cells.
+
+    deltas is an iterable of (contestant_id, criterion_id, old_score, new_score)
+    where a score of None means the cell is empty; weights maps every criterion
+    id of the judge's sub-event to Criteria.points. Must run inside the
+    transaction that writes the scores.
+    """
+    per_contestant = defaultdict(lambda: [0, 0, Decimal('0')])
+    per_cell = defaultdict(lambda: [0, 0])
+    for contestant_id, criterion_id, old_score, new_score in deltas:
+        if old_score == new_score:
+            continue
+        score_delta = (new_score or 0) - (old_score or 0)
+        count_delta = (new_score is not None) - (old_score is not None)
+        totals = per_contestant[contestant_id]
+        totals[0] += score_delta
+        totals[1] += count_delta
+        totals[2] += Decimal(score_delta) * Decimal(weights[criterion_id]) / 100
+        cell = per_cell[(contestant_id, criterion_id)]
+        cell[0] += score_delta
+        cell[1] += count_delta
+
+    if not per_contestant:
+        return
+
+    contestant_ids = sorted(per_contestant)
+    now = timezone.now()
+
+    # Make sure the rows exist, then lock them in a stable order before applying the deltas
+    JudgeTally.objects.bulk_create(
+        [JudgeTally(judge=judge, contestant_id=contestant_id) for contestant_id in contestant_ids],
+        ignore_conflicts=True,
+    )
+    CriterionTally.objects.bulk_create(
+        [
+            CriterionTally(contestant_id=contestant_id, criterion_id=criterion_id)
+            for contestant_id, criterion_id in sorted(per_cell)
+        ],
+        ignore_conflicts=True,
+    )
+    ContestantTally.objects.bulk_create(
+        [ContestantTally(sub_event_id=judge.sub_event_id, contestant_id=contestant_id) for contestant_id in contestant_ids],
+        ignore_conflicts=True,
+    )
+
+    judges_added = {}
+    judge_tallies = list(
+        JudgeTally.objects.select_for_update()
+        .filter(judge=judge, contestant_id__in=contestant_ids)
+        .order_by('contestant_id')
+    )
+    for tally in judge_tallies:
+        score_sum, score_count, weighted = per_contestant[tally.contestant_id]
+        was_scored = tally.score_count > 0
+        tally.score_sum += score_sum
+        tally.score_count += score_count
+        tally.weighted_total += weighted
+        tally.updated_at = now
+        # +1 when this judge scores the contestant for the first time, -1 when all scores are cleared
+        judges_added[tally.contestant_id] = int(tally.score_count > 0) - int(was_scored)
+    JudgeTally.objects.bulk_update(judge_tallies, ['score_sum', 'score_count', 'weighted_total', 'updated_at'])
+
+    # Every criterion of the contestants is read, as their totals are recomputed from all of them
+    averages = defaultdict(dict)
+    changed_cells = []
+    for tally in (
+        CriterionTally.objects.select_for_update()
+        .filter(contestant_id__in=contestant_ids)
+        .order_by('contestant_id', 'criterion_id')
+    ):
+        cell = per_cell.get((tally.contestant_id, tally.criterion_id))
+        if cell is not None:
+            tally.score_sum += cell[0]
+            tally.score_count += cell[1]
+            tally.updated_at = now
+            changed_cells.append(tally)
+        averages[tally.contestant_id][tally.criterion_id] = criterion_average(tally.score_sum, tally.score_count)
+    CriterionTally.objects.bulk_update(changed_cells, ['score_sum', 'score_count', 'updated_at'])
+
+    contestant_tallies = list(
+        ContestantTally.objects.select_for_update()
+        .filter(contestant_id__in=contestant_ids)
+        .order_by('contestant_id')
+    )
+    for tally in contestant_tallies:
+        score_sum, score_count, _ = per_contestant[tally.contestant_id]
+        tally.score_sum += score_sum
+        tally.score_count += score_count
+        tally.judge_count += judges_added.get(tally.contestant_id, 0)
+        tally.weighted_total = contestant_total(averages[tally.contestant_id], weights)
+        tally.updated_at = now
+    ContestantTally.objects.bulk_update(
+        contestant_tallies,
+        ['score_sum', 'score_count', 'judge_count', 'weighted_total', 'updated_at'],
+    )
+
+
+def rebuild_tallies(sub_event_ids=None, apps=global_apps):
+    """
+    Recompute all tallies from Score for the given sub-events (all when None).
+    Returns the number of contestant tallies written. Migrations pass their
+    historical apps registry.
+    """
+    Contestant = apps.get_model('api', 'Contestant')
+    Criteria = apps.get_model('api', 'Criteria')
+    Score = apps.get_model('api', 'Score')
+    JudgeTallyModel = apps.get_model('api', 'JudgeTally')
+    CriterionTallyModel = apps.get_model('api', 'CriterionTally')
+    ContestantTallyModel = apps.get_model('api', 'ContestantTally')
+
+    contestants = Contestant.objects.order_by()
+    criteria = Criteria.objects.order_by()
+    judge_tallies = JudgeTallyModel.objects.all()
+    criterion_tallies = CriterionTallyModel.objects.all()
+    contestant_tallies = ContestantTallyModel.objects.all()
+    scores = Score.objects.filter(score__isnull=False).order_by()
+    if sub_event_ids is not None:
+        contestants = contestants.filter(sub_event_id__in=sub_event_ids)
+        criteria = criteria.filter(sub_event_id__in=sub_event_ids)
+        judge_tallies = judge_tallies.filter(judge__sub_event_id__in=sub_event_ids)
+        criterion_tallies = criterion_tallies.filter(contestant__sub_event_id__in=sub_event_ids)
+        contestant_tallies = contestant_tallies.filter(sub_event_id__in=sub_event_ids)
+        scores = scores.filter(contestant__sub_event_id__in=sub_event_ids)
+
+    with transaction.atomic():
+        judge_tallies.delete()
+        criterion_tallies.delete()
+        contestant_tallies.delete()
+
+        weights = dict(criteria.values_list('id', 'points'))
+        totals = {
+            contestant_id: ContestantTallyModel(sub_event_id=sub_event_id, contestant_id=contestant_id)
+            for contestant_id, sub_event_id in contestants.values_list('id', 'sub_event_id')
+        }
+
+        new_judge_tallies = []
+        for row in (
+            scores.values('judge_id', 'contestant_id')
+            .annotate(score_sum=Sum('score'), score_count=Count('score'), weighted=Sum(F('score') * F('criterion__points')))
+        ):
+            new_judge_tallies.append(JudgeTallyModel(
+                judge_id=row['judge_id'],
+                contestant_id=row['contestant_id'],
+                score_sum=row['score_sum'],
+                score_count=row['score_count'],
+                weighted_total=(Decimal(str(row['weighted'])) / 100).quantize(FOUR_PLACES),
+            ))
+            tally = totals.get(row['contestant_id'])
+            if tally is not None:
+                tally.judge_count += 1
+
+        new_criterion_tallies = []
+        averages = defaultdict(dict)
+        for row in (
+            scores.values('contestant_id', 'criterion_id')
+            .annotate(score_sum=Sum('score'), score_count=Count('score'))
+        ):
+            new_criterion_tallies.append(CriterionTallyModel(
+                contestant_id=row['contestant_id'],
+                criterion_id=row['criterion_id'],
+                score_sum=row['score_sum'],
+                score_count=row['score_count'],
+            ))
+            averages[row['contestant_id']][row['criterion_id']] = criterion_average(row['score_sum'], row['score_count'])
+            tally = totals.get(row['contestant_id'])
+            if tally is not None:
+                tally.score_sum += row['score_sum']
+                tally.score_count += row['score_count']
+
+        for contestant_id, tally in totals.items():
+            tally.weighted_total = contestant_total(averages[contestant_id], weights)
+
+        JudgeTallyModel.objects.bulk_create(new_judge_tallies, batch_size=1000)
+        CriterionTallyModel.objects.bulk_create(new_criterion_tallies, batch_size=1000)
+        ContestantTallyModel.objects.bulk_create(totals.values(), batch_size=1000)
+
+    return len(totals)
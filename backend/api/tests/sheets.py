@@ -0,0 +1,34 @@
+"""Score sheets seeded for the scoring, tally, leaderboard and export tests"""
+from backend.api.models import Contestant, Criteria, Judge
+from backend.api.scoring import build_scoreboard, save_score_changes
+from backend.api.seeding import seed_event, seed_user
+
+
+def unscored_event(**sizes):
+    """An event of seeded sub-events whose score sheets are still empty"""
+    return seed_event(seed_user(), fill_scores=False, **sizes)
+
+
+def sheet(sub_event):
+    """(contestants, judges, criteria) of a sub-event"""
+    return (
+        list(Contestant.objects.filter(sub_event=sub_event)),
+        list(Judge.objects.filter(sub_event=sub_event)),
+        list(Criteria.objects.filter(sub_event=sub_event)),
+    )
+
+
+def fill_sheet(sub_event, rng, unscored=0):
+    """
+    Save random scores through save_score_changes for every judge, leaving some
+    cells and the last `unscored` contestants empty, so averages differ from
+    per-judge sums. Returns (contestants, scoreboard).
+    """
+    contestants, judges, criteria = sheet(sub_event)
+    for judge in judges:
+        save_score_changes(judge, [
+            {'contestant': contestant.id, 'criterion': criterion.id, 'score': rng.choice([None, rng.randint(50, 100)])}
+            for contestant in contestants[:len(contestants) - unscored]
+            for criterion in criteria
+        ])
+    return contestants, build_scoreboard(contestants, judges, criteria)
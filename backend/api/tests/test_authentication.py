@@ -0,0 +1,58 @@
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from backend.api.authentication import get_cached_token, local_tokens
+from backend.api.seeding import seed_user
+
+
+class TokenCacheTest(TestCase):
+    """Revoked tokens must stop working in every worker, not only the one that revoked them"""
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(local_tokens.clear)
+        self.token = Token.objects.create(user=seed_user())
+
+    def test_shared_cache_by_default(self):
+        key = self.token.key
+        self.assertEqual(get_cached_token(key).user_id, self.token.user_id)
+        self.assertIsNone(local_tokens.get(key))
+
+        # Deleting the token evicts the shared entry that other workers read
+        self.token.delete()
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_cached_token(key))
+
+    @override_settings(TOKEN_AUTH_CACHE='local')
+    def test_local_entries_expire_within_seconds(self):
+        key = self.token.key
+        get_cached_token(key)
+        with self.assertNumQueries(0):
+            get_cached_token(key)
+
+        # Revoked by another worker: this process's LRU is not evicted
+        with mock.patch.object(local_tokens, 'delete'):
+            self.token.delete()
+        self.assertIsNotNone(get_cached_token(key))
+
+        later = time.monotonic() + 6
+        with mock.patch('backend.api.authentication.time.monotonic', return_value=later):
+            self.assertIsNone(get_cached_token(key))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_expires_within_seconds(self):
+        key = self.token.key
+        get_cached_token(key)
+
+        # Revoked by another worker, whose LocMemCache is not this one
+        with mock.patch('backend.api.authentication.cache.delete'):
+            self.token.delete()
+        self.assertIsNotNone(get_cached_token(key))
+
+        later = time.time() + 6
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertIsNone(get_cached_token(key))
@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from backend.api.models import Case, CaseFile, FileBlob
+
+
+class BlobLifecycleTest(TestCase):
+    """The stored file of a blob goes away with its last reference, but not while the same content is stored again"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('clerk', password='pw')
+        self.case = Case.objects.create(
+            case_number='B-1', title='Blob case', description='', created_by=self.user,
+        )
+        self.storage = CaseFile.file.field.storage
+
+    def add_file(self, content):
+        return CaseFile.objects.create(
+            case=self.case,
+            uploaded_by=self.user,
+            file=ContentFile(content, name='evidence.txt'),
+            filename='evidence.txt',
+            size=len(content),
+        )
+
+    def test_last_reference_deletes_file(self):
+        first = self.add_file(b'same content')
+        second = self.add_file(b'same content')
+        name = first.file.name
+        self.assertEqual(second.file.name, name)
+        self.assertEqual(FileBlob.objects.get().ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(self.storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(FileBlob.objects.exists())
+
+    def test_upload_while_delete_is_pending(self):
+        case_file = self.add_file(b'uploaded twice')
+        name = case_file.file.name
+
+        with self.captureOnCommitCallbacks() as pending_deletes:
+            case_file.delete()
+
+        # The same content is stored again before the delete runs, and its
+        # CaseFile row is saved only after the delete has finished
+        stored_name = self.storage.save('case_files/evidence.txt', ContentFile(b'uploaded twice'))
+        self.assertEqual(stored_name, name)
+        for callback in pending_deletes:
+            callback()
+        self.assertTrue(self.storage.exists(name))
+
+        again = CaseFile.objects.create(
+            case=self.case, uploaded_by=self.user, file=stored_name, filename='evidence.txt', size=14,
+        )
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+        with self.storage.open(again.file.name) as stored:
+            self.assertEqual(stored.read(), b'uploaded twice')
+
+    def test_delete_after_upload_was_lost(self):
+        case_file = self.add_file(b'deleted first')
+        name = case_file.file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            case_file.delete()
+        self.assertFalse(self.storage.exists(name))
+
+        # A new upload of the content writes the file again
+        again = self.add_file(b'deleted first')
+        self.assertTrue(self.storage.exists(again.file.name))
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+
+    def test_reconcile_leaves_recent_claims(self):
+        # Stored, but the CaseFile row was never written
+        claimed = self.storage.save('case_files/claimed.txt', ContentFile(b'claimed'))
+        abandoned = self.storage.save('case_files/abandoned.txt', ContentFile(b'abandoned'))
+        FileBlob.objects.filter(name=abandoned).update(created_at=timezone.now() - timedelta(hours=2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_file_blobs', stdout=StringIO())
+        self.assertTrue(self.storage.exists(claimed))
+        self.assertFalse(self.storage.exists(abandoned))
+        self.assertEqual(list(FileBlob.objects.values_list('name', flat=True)), [claimed])
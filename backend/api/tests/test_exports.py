@@ -0,0 +1,24 @@
+import random
+from django.test import TestCase
+from backend.api.exports import score_sheet_sections
+from .sheets import fill_sheet, unscored_event
+
+
+class RankingExportTest(TestCase):
+    """The Rankings section of an export shows the score sheet's totals and ranks"""
+
+    def test_rankings_match_scoreboard(self):
+        sub_events = list(unscored_event(sub_events=2, contestants=5, judges=3, criteria=3).sub_events.order_by('date', 'time', 'id'))
+        rng = random.Random(18)
+        expected = []
+        for sub_event in sub_events:
+            # The last contestant stays unscored and is still listed
+            contestants, scoreboard = fill_sheet(sub_event, rng, unscored=1)
+            expected.extend(sorted(
+                (sub_event.title, scoreboard['rankings'][contestant.id], contestant.name, scoreboard['totals'][contestant.id])
+                for contestant in contestants
+            ))
+
+        sections = {title: rows for title, header, rows in score_sheet_sections(sub_events)}
+        exported = [(title, rank, name, total) for title, rank, name, judges, total in sections['Rankings']]
+        self.assertEqual(exported, expected)
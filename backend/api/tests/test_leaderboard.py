@@ -0,0 +1,25 @@
+import random
+from django.test import TestCase
+from backend.api.scoring import build_event_leaderboard, rank_totals, round_score
+from .sheets import fill_sheet, unscored_event
+
+
+class EventLeaderboardTest(TestCase):
+    """Leaderboard totals are the sums of the score sheet totals over the sub-events"""
+
+    def test_totals_match_scoreboards(self):
+        event = unscored_event(sub_events=3, contestants=4, judges=3, criteria=3)
+        rng = random.Random(19)
+        expected = {}
+        for sub_event in event.sub_events.all():
+            contestants, scoreboard = fill_sheet(sub_event, rng)
+            for contestant in contestants:
+                if any(average is not None for average in scoreboard['averages'][contestant.id].values()):
+                    expected.setdefault(contestant.key, []).append(scoreboard['totals'][contestant.id])
+
+        leaderboard = build_event_leaderboard(event.id)['leaderboard']
+        totals = {row['key']: row['total'] for row in leaderboard}
+        self.assertEqual(totals, {key: round_score(sum(values)) for key, values in expected.items()})
+        self.assertEqual({row['key']: row['rank'] for row in leaderboard}, rank_totals(totals))
+        for row in leaderboard:
+            self.assertEqual(row['sub_event_count'], len(expected[row['key']]))
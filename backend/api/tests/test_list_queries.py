@@ -0,0 +1,69 @@
+import itertools
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from backend.api.instrumentation import record_queries
+from backend.api.models import Case, CaseFile, CaseNote
+from backend.api.seeding import seed_event, seed_user
+
+
+# The seeded rows are uncommitted inside the test transaction, where a replica
+# connection cannot see them; the counts are the same on either database
+@override_settings(DATABASE_REPLICA_ALIAS=None)
+class QueryCountTestCase(TestCase):
+    def setUp(self):
+        self.user = seed_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, path, params=None):
+        with record_queries() as recorder:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return recorder.count
+
+
+class CaseQueryCountTest(QueryCountTestCase):
+    """The case list and detail run the same queries however many cases, notes and files there are"""
+
+    _numbers = itertools.count(1)
+
+    def add_case(self, notes, files):
+        case = Case.objects.create(
+            case_number=f'CASE-{next(self._numbers):05d}', title='Case', description='',
+            assigned_to=self.user, created_by=self.user,
+        )
+        self.add_attachments(case, notes, files)
+        return case
+
+    def add_attachments(self, case, notes, files):
+        CaseNote.objects.bulk_create([CaseNote(case=case, author=self.user, content='Note') for _ in range(notes)])
+        CaseFile.objects.bulk_create([
+            CaseFile(case=case, uploaded_by=self.user, file=f'case_files/{case.id}-{index}.pdf', filename=f'{index}.pdf', size=1)
+            for index in range(files)
+        ])
+
+    def test_list(self):
+        self.add_case(notes=1, files=1)
+        baseline = self.count_queries(reverse('case-list'))
+        for _ in range(30):
+            self.add_case(notes=5, files=3)
+        self.assertEqual(self.count_queries(reverse('case-list')), baseline)
+
+    def test_detail(self):
+        case = self.add_case(notes=1, files=1)
+        baseline = self.count_queries(reverse('case-detail', args=[case.id]))
+        self.add_attachments(case, notes=40, files=20)
+        self.assertEqual(self.count_queries(reverse('case-detail', args=[case.id])), baseline)
+
+
+class SubEventQueryCountTest(QueryCountTestCase):
+    """The sub-event list runs the same queries however many sub-events and judges there are"""
+
+    def test_list_with_judges(self):
+        event = seed_event(self.user, sub_events=1, contestants=2, judges=1, criteria=1, fill_scores=False)
+        params = {'event': event.id, 'expand': 'judges'}
+        baseline = self.count_queries(reverse('subevent-list'), params)
+        event = seed_event(self.user, sub_events=10, contestants=5, judges=8, criteria=3, fill_scores=False)
+        params = {'event': event.id, 'expand': 'judges'}
+        self.assertEqual(self.count_queries(reverse('subevent-list'), params), baseline)
@@ -0,0 +1,91 @@
+import asyncio
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from backend.api import live
+from backend.api.live import InProcessBroadcaster, publish_score_changes, sub_event_channel
+from .sheets import sheet, unscored_event
+
+
+class LiveScoresTest(TestCase):
+    """Saved scores reach the live subscribers of their sub-event once the save commits"""
+
+    def setUp(self):
+        self.sub_event = unscored_event(sub_events=1, contestants=2, judges=1, criteria=2).sub_events.get()
+        self.channel = sub_event_channel(self.sub_event.id)
+        self.broadcaster = InProcessBroadcaster()
+        patcher = mock.patch.object(live, '_broadcaster', self.broadcaster)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def subscribe(self):
+        async def subscribe():
+            return self.broadcaster.subscribe(self.channel)
+        return self.loop.run_until_complete(subscribe())
+
+    def received(self, subscription):
+        # Deliveries are scheduled on the subscriber's loop: let it run them
+        self.loop.run_until_complete(asyncio.sleep(0))
+        messages = []
+        while not subscription.queue.empty():
+            messages.append(subscription.queue.get_nowait())
+        return messages
+
+    def test_delivered_after_commit(self):
+        subscription = self.subscribe()
+        (contestant, _), (judge,), (criterion, _) = sheet(self.sub_event)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = APIClient().post(reverse('save_judge_scores', args=[judge.id]), {
+                'changes': [{'contestant': contestant.id, 'criterion': criterion.id, 'score': 88}],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.received(subscription), [])
+
+        for callback in callbacks:
+            callback()
+        message, = self.received(subscription)
+        self.assertEqual(message['type'], 'scores')
+        self.assertEqual(
+            [(score['contestant'], score['criterion'], score['score']) for score in message['scores']],
+            [(contestant.id, criterion.id, 88)],
+        )
+
+    def test_not_delivered_on_rollback(self):
+        subscription = self.subscribe()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                publish_score_changes(self.sub_event.id, [{'contestant': 1, 'criterion': 1, 'score': 50}])
+                raise RuntimeError('save failed')
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.received(subscription), [])
+
+    def test_unsubscribe(self):
+        subscription = self.subscribe()
+        self.assertEqual(self.broadcaster.subscriber_count(self.channel), 1)
+        subscription.close()
+        self.assertEqual(self.broadcaster.subscriber_count(self.channel), 0)
+
+        self.broadcaster.publish(self.channel, {'type': 'scores', 'scores': []})
+        self.assertEqual(self.received(subscription), [])
+
+    def test_stream(self):
+        token = Token.objects.create(user=self.sub_event.event.created_by)
+        path = reverse('subevent_live_scores', args=[self.sub_event.id])
+
+        async def open_stream():
+            response = await AsyncClient().get(path, {'token': token.key})
+            first_frame = await response.streaming_content.__aiter__().__anext__()
+            return response, first_frame
+
+        response, first_frame = async_to_sync(open_stream)()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(first_frame, b'retry: 3000\n\n')
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+@override_settings(PERFORMANCE_METRICS_TOKEN='scrape-me')
+class MetricsAccessTest(TestCase):
+    """/metrics/ is served to staff users and to scrapers holding the metrics token"""
+
+    def test_anonymous_is_refused(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    def test_token(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE', response.content)
+        self.assertEqual(
+            self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403,
+        )
+
+    @override_settings(PERFORMANCE_METRICS_TOKEN='')
+    def test_empty_token_setting_is_not_a_password(self):
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+    def test_staff_session(self):
+        self.client.force_login(User.objects.create(username='organizer'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(User.objects.create(username='ops', is_staff=True))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
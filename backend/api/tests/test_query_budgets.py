@@ -0,0 +1,270 @@
+import hashlib
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import time
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import URLPattern, URLResolver, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from backend.api import urls as api_urls
+from backend.api.authentication import local_tokens
+from backend.api.instrumentation import record_queries
+from backend.api.models import Case, CaseFile, CaseNote, Contestant, Criteria, Judge, UploadSession
+from backend.api.search import rebuild_search_index
+from backend.api.seeding import seed_event, seed_user
+from backend.api.uploads import staged_path, staging_dir
+
+PASSWORD = 'budget-check-password'
+
+
+def _first_score_cells(test, count):
+    cells = itertools.product(test.contestant_ids, test.criterion_ids)
+    return [
+        {'contestant': contestant_id, 'criterion': criterion_id, 'score': random.randint(70, 100)}
+        for contestant_id, criterion_id in itertools.islice(cells, count)
+    ]
+
+
+def _settings_payload(test):
+    payload = test.organizer.get(reverse('subevent_settings', args=[test.sub_event.id])).json()
+    payload['contestants'][0]['name'] = f'Renamed {test.unique()}'
+    return payload
+
+
+def _disposable_case(test):
+    return Case.objects.create(
+        case_number=f'DEL-{test.unique()}', title='Disposable', description='', created_by=test.user
+    )
+
+
+def _upload_session(test, received=0):
+    session = UploadSession.objects.create(
+        case=test.case, created_by=test.user, filename='chunk.bin', size=4, received=received
+    )
+    os.makedirs(staging_dir(), exist_ok=True)
+    with open(staged_path(session), 'wb') as staged:
+        staged.write(b'data'[:received])
+    return session
+
+
+# (URL name, method, query budget, seconds, request builder)
+# A builder gets the test case and returns (path, request kwargs). It runs
+# before the queries are counted and the request is timed, so it may create the
+# rows the request consumes. Budgets are for a cold cache: the caches are
+# cleared right before each measured request. The seeded data has dozens of
+# rows of every kind, so a query per row (an N+1) goes well over the budget.
+# Inside the test transaction a view's atomic block counts a SAVEPOINT and a
+# RELEASE where production runs BEGIN. The time ceilings are generous, several
+# times the usual local timing, so they catch a request gone quadratic rather
+# than ordinary machine noise.
+CHECKS = [
+    ('api-root', 'get', 1, 1.0, lambda t: (reverse('api-root'), {})),
+    ('api_login', 'post', 3, 2.0, lambda t: (reverse('api_login'), {
+        'data': {'username': t.user.username, 'password': PASSWORD}, 'client': APIClient(),
+    })),
+    ('api_register', 'post', 3, 2.0, lambda t: (reverse('api_register'), {
+        'data': {'username': f'new-{t.unique()}', 'password': PASSWORD}, 'client': APIClient(),
+    })),
+    ('verify_password', 'post', 2, 2.0, lambda t: (reverse('verify_password'), {'data': {'password': PASSWORD}})),
+    ('judge_login', 'post', 5, 2.0, lambda t: (reverse('judge_login'), {
+        'data': {'code': t.judge.code}, 'client': APIClient(),
+    })),
+    ('judge_bootstrap', 'post', 6, 2.0, lambda t: (reverse('judge_bootstrap'), {
+        'data': {'code': t.judge.code}, 'client': APIClient(),
+    })),
+    ('user-list', 'get', 2, 1.0, lambda t: (reverse('user-list'), {})),
+    ('user-detail', 'get', 2, 1.0, lambda t: (reverse('user-detail', args=[t.user.id]), {})),
+    ('case-list', 'get', 2, 1.0, lambda t: (reverse('case-list'), {})),
+    ('case-detail', 'get', 4, 1.0, lambda t: (reverse('case-detail', args=[t.case.id]), {})),
+    ('case-detail', 'delete', 8, 1.0, lambda t: (reverse('case-detail', args=[_disposable_case(t).id]), {})),
+    ('case-search', 'get', 5, 2.0, lambda t: (reverse('case-search'), {'data': {'q': 'evidence witness'}})),
+    ('case-add-note', 'post', 7, 1.0, lambda t: (reverse('case-add-note', args=[t.case.id]), {
+        'data': {'content': 'Another witness statement'},
+    })),
+    ('case-upload-file', 'post', 16, 2.0, lambda t: (reverse('case-upload-file', args=[t.case.id]), {
+        'data': {'file': ContentFile(f'upload {t.unique()}'.encode(), name='upload.txt'), 'filename': 'upload.txt'},
+        'format': 'multipart',
+    })),
+    ('casenote-list', 'get', 2, 1.0, lambda t: (reverse('casenote-list'), {})),
+    ('casenote-detail', 'get', 2, 1.0, lambda t: (reverse('casenote-detail', args=[t.note.id]), {})),
+    ('casefile-list', 'get', 2, 1.0, lambda t: (reverse('casefile-list'), {})),
+    ('casefile-detail', 'get', 2, 1.0, lambda t: (reverse('casefile-detail', args=[t.stored_file.id]), {})),
+    ('casefile-download', 'get', 2, 1.0, lambda t: (reverse('casefile-download', args=[t.stored_file.id]), {})),
+    ('upload_sessions', 'post', 3, 1.0, lambda t: (reverse('upload_sessions'), {
+        'data': {'case': t.case.id, 'filename': 'video.mp4', 'size': 4},
+    })),
+    ('upload_session', 'put', 5, 1.0, lambda t: (reverse('upload_session', args=[_upload_session(t).id]), {
+        'data': b'data', 'content_type': 'application/octet-stream', 'HTTP_UPLOAD_OFFSET': '0',
+    })),
+    ('finalize_upload', 'post', 18, 2.0, lambda t: (reverse('finalize_upload', args=[_upload_session(t, received=4).id]), {})),
+    ('event-list', 'get', 2, 1.0, lambda t: (reverse('event-list'), {})),
+    ('event-detail', 'get', 2, 1.0, lambda t: (reverse('event-detail', args=[t.event.id]), {})),
+    ('subevent-list', 'get', 2, 1.0, lambda t: (reverse('subevent-list'), {'data': {'event': t.event.id}})),
+    ('subevent-list', 'get', 3, 1.0, lambda t: (reverse('subevent-list'), {
+        'data': {'event': t.event.id, 'expand': 'judges'},
+    })),
+    ('subevent-detail', 'get', 2, 1.0, lambda t: (reverse('subevent-detail', args=[t.sub_event.id]), {})),
+    ('subevent_settings', 'get', 5, 2.0, lambda t: (reverse('subevent_settings', args=[t.sub_event.id]), {
+        'client': APIClient(),
+    })),
+    ('subevent_settings', 'post', 12, 2.0, lambda t: (reverse('subevent_settings', args=[t.sub_event.id]), {
+        'data': _settings_payload(t),
+    })),
+    ('subevent_scoreboard', 'get', 8, 1.0, lambda t: (reverse('subevent_scoreboard', args=[t.sub_event.id]), {})),
+    ('subevent_rankings', 'get', 3, 1.0, lambda t: (reverse('subevent_rankings', args=[t.sub_event.id]), {})),
+    ('subevent_live_scores', 'get', 2, 1.0, lambda t: (reverse('subevent_live_scores', args=[t.sub_event.id]), {
+        'data': {'token': t.token.key}, 'asynchronous': True,
+    })),
+    ('subevent_export', 'get', 8, 2.0, lambda t: (reverse('subevent_export', args=[t.sub_event.id, 'csv']), {})),
+    ('event_leaderboard', 'get', 5, 2.0, lambda t: (reverse('event_leaderboard', args=[t.event.id]), {})),
+    ('event_export', 'get', 9, 2.0, lambda t: (reverse('event_export', args=[t.event.id, 'xlsx']), {})),
+    ('judge_scores', 'get', 3, 1.0, lambda t: (reverse('judge_scores', args=[t.judge.id]), {'client': APIClient()})),
+    ('save_judge_scores', 'post', 18, 2.0, lambda t: (reverse('save_judge_scores', args=[t.judge.id]), {
+        'data': {'changes': _first_score_cells(t, 30)}, 'client': APIClient(),
+    })),
+]
+
+
+def _url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+class QueryBudgetTest(TestCase):
+    """Every API endpoint stays within its query budget and time ceiling; one test per entry of CHECKS"""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp(prefix='cjms-budgets-')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        # Reads stay on the primary: a replica connection cannot see the rows
+        # seeded inside the test transaction, and the counts are the same on either
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, CASE_UPLOAD_STAGING_DIR=None, DATABASE_REPLICA_ALIAS=None,
+        )
+        settings_override.enable()
+        cls.addClassCleanup(settings_override.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        cls.user = seed_user(password=PASSWORD)
+        cls.token = Token.objects.create(user=cls.user)
+
+        cls.event = seed_event(cls.user, sub_events=3, contestants=30, judges=8, criteria=5, rng=rng)
+        # More events alongside, so per-event queries show up in the event list
+        for _ in range(3):
+            seed_event(cls.user, sub_events=2, contestants=10, judges=3, criteria=3, rng=rng)
+        cls.sub_event = cls.event.sub_events.order_by('id').first()
+        cls.judge = Judge.objects.filter(sub_event=cls.sub_event).order_by('id').first()
+        cls.contestant_ids = list(Contestant.objects.filter(sub_event=cls.sub_event).values_list('id', flat=True))
+        cls.criterion_ids = list(Criteria.objects.filter(sub_event=cls.sub_event).values_list('id', flat=True))
+
+        words = ['evidence', 'witness', 'statement', 'hearing', 'appeal', 'contract', 'invoice', 'incident']
+        Case.objects.bulk_create([
+            Case(
+                case_number=f'CASE-{index:05d}',
+                title=' '.join(rng.sample(words, 3)).title(),
+                description=' '.join(rng.choices(words, k=30)),
+                priority=rng.choice(['low', 'medium', 'high', 'urgent']),
+                assigned_to=cls.user,
+                created_by=cls.user,
+            )
+            for index in range(40)
+        ])
+        cases = list(Case.objects.order_by('id'))
+        CaseNote.objects.bulk_create([
+            CaseNote(case=case, author=cls.user, content=' '.join(rng.choices(words, k=20)))
+            for case in cases
+            for _ in range(5)
+        ])
+        # Rows only: files stored before deduplication, never opened by the requests
+        CaseFile.objects.bulk_create([
+            CaseFile(
+                case=case, uploaded_by=cls.user, file=f'case_files/legacy/{case.id}-{index}.pdf',
+                filename=f'{rng.choice(words)}-{index}.pdf', size=1024,
+            )
+            for case in cases
+            for index in range(3)
+        ])
+        rebuild_search_index()
+
+        cls.case = cases[0]
+        cls.note = CaseNote.objects.filter(case=cls.case).first()
+        content = b'stored case file\n' * 64
+        cls.stored_file = CaseFile.objects.create(
+            case=cls.case, uploaded_by=cls.user, file=ContentFile(content, name='report.txt'),
+            filename='report.txt', size=len(content), sha256=hashlib.sha256(content).hexdigest(),
+        )
+
+    def setUp(self):
+        self._counter = itertools.count(1)
+        self.organizer = APIClient()
+        self.organizer.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def unique(self):
+        return next(self._counter)
+
+    def test_every_endpoint_has_a_budget(self):
+        uncovered = set(_url_names(api_urls.urlpatterns)) - {name for name, *_ in CHECKS}
+        self.assertEqual(uncovered, set(), 'API URL names without a query budget in CHECKS')
+
+    def assertWithinBudget(self, method, budget, seconds, build):
+        path, kwargs = build(self)
+        cache.clear()
+        local_tokens.clear()
+        started = time.perf_counter()
+        with record_queries(keep_slowest=budget + 20) as recorder:
+            status_code = self._request(method, path, dict(kwargs))
+        elapsed = time.perf_counter() - started
+        self.assertLess(status_code, 400)
+        if recorder.count > budget:
+            statements = '\n'.join(f'    {statement["sql"]}' for statement in recorder.slowest())
+            self.fail(f'{method.upper()} {path}: {recorder.count} queries, budget {budget}\n{statements}')
+        if elapsed > seconds:
+            self.fail(f'{method.upper()} {path}: took {elapsed:.2f}s, ceiling {seconds}s')
+
+    def _request(self, method, path, kwargs):
+        client = kwargs.pop('client', self.organizer)
+        if kwargs.pop('asynchronous', False):
+            return async_to_sync(self._first_event)(path, kwargs.get('data', {}))
+        if method == 'put':
+            data = kwargs.pop('data')
+            response = getattr(client, method)(path, data, **kwargs)
+        else:
+            kwargs.setdefault('format', 'json')
+            response = getattr(client, method)(path, **kwargs)
+        if response.streaming:
+            # Exports stream their rows; their queries run while the body is read
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    async def _first_event(self, path, data):
+        # The stream never ends: read the opening retry hint and let it go
+        response = await AsyncClient().get(path, data)
+        if response.streaming:
+            await response.streaming_content.__aiter__().__anext__()
+        return response.status_code
+
+
+def _budget_test(method, budget, seconds, build):
+    def test(self):
+        self.assertWithinBudget(method, budget, seconds, build)
+    return test
+
+
+for _name, _method, _budget, _seconds, _build in CHECKS:
+    _test_name = f'test_{_method}_{_name}'.replace('-', '_')
+    if hasattr(QueryBudgetTest, _test_name):
+        _test_name += f'_{sum(name.startswith(_test_name) for name in dir(QueryBudgetTest)) + 1}'
+    setattr(QueryBudgetTest, _test_name, _budget_test(_method, _budget, _seconds, _build))
@@ -0,0 +1,56 @@
+import tempfile
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from rest_framework import viewsets
+from rest_framework.test import APIRequestFactory
+from backend.api.models import Judge
+from backend.api.routers import ReadYourWritesMiddleware, ReplicaReadMixin, ReplicaRouter
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+FILE_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.gettempdir()}}
+
+
+class SharedCacheRequirementTest(SimpleTestCase):
+    """Read-your-writes pins only work when every worker sees them"""
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_replica_with_local_cache(self):
+        with mock.patch('backend.api.routers.replica_alias', return_value='replica'):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaRouter()
+            with self.assertRaises(ImproperlyConfigured):
+                ReadYourWritesMiddleware(lambda request: None)
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_no_replica(self):
+        with mock.patch('backend.api.routers.replica_alias', return_value=None):
+            ReplicaRouter()
+            ReadYourWritesMiddleware(lambda request: None)
+
+    @override_settings(CACHES=FILE_CACHE)
+    def test_replica_with_shared_cache(self):
+        with mock.patch('backend.api.routers.replica_alias', return_value='replica'):
+            ReplicaRouter()
+            ReadYourWritesMiddleware(lambda request: None)
+
+
+class RaisingViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    authentication_classes = []
+    permission_classes = []
+    routed_to = None
+
+    def list(self, request):
+        RaisingViewSet.routed_to = ReplicaRouter().db_for_read(Judge)
+        raise RuntimeError('view failed')
+
+
+@override_settings(CACHES=FILE_CACHE)
+class ReplicaReadMixinTest(SimpleTestCase):
+    def test_reads_return_to_primary_when_view_raises(self):
+        view = RaisingViewSet.as_view({'get': 'list'})
+        with mock.patch('backend.api.routers.replica_alias', return_value='replica'):
+            with self.assertRaises(RuntimeError):
+                view(APIRequestFactory().get('/'))
+            self.assertEqual(RaisingViewSet.routed_to, 'replica')
+            self.assertIsNone(ReplicaRouter().db_for_read(Judge))
@@ -0,0 +1,38 @@
+from django.test import TestCase
+from backend.api.models import ContestantTally, Score
+from backend.api.scoring import changes_from_sheet, save_score_changes
+from .sheets import sheet, unscored_event
+
+
+class SaveCommentsTest(TestCase):
+    """Comments are saved even before the judge has scored the contestant"""
+
+    def setUp(self):
+        contestants, (self.judge,), self.criteria = sheet(
+            unscored_event(sub_events=1, contestants=2, judges=1, criteria=3).sub_events.get()
+        )
+        self.contestant = contestants[0]
+
+    def test_comment_without_scores(self):
+        touched, conflicts, errors = save_score_changes(
+            self.judge, [{'contestant': self.contestant.id, 'comments': 'Strong stage presence'}]
+        )
+        self.assertEqual((conflicts, errors), ([], []))
+        self.assertEqual(len(touched), len(self.criteria))
+        scores = Score.objects.filter(judge=self.judge, contestant=self.contestant)
+        self.assertEqual({(score.score, score.comments) for score in scores}, {(None, 'Strong stage presence')})
+        self.assertFalse(ContestantTally.objects.filter(contestant=self.contestant, score_count__gt=0).exists())
+
+        # A later score fills one of the unscored cells and keeps the comment
+        save_score_changes(self.judge, [{'contestant': self.contestant.id, 'criterion': self.criteria[0].id, 'score': 90}])
+        self.assertEqual(
+            Score.objects.get(judge=self.judge, contestant=self.contestant, criterion=self.criteria[0]).comments,
+            'Strong stage presence',
+        )
+
+    def test_comment_from_legacy_sheet(self):
+        save_score_changes(self.judge, changes_from_sheet({str(self.contestant.id): {'comments': 'Needs work'}}))
+        self.assertEqual(
+            set(Score.objects.filter(judge=self.judge, contestant=self.contestant).values_list('comments', flat=True)),
+            {'Needs work'},
+        )
@@ -0,0 +1,83 @@
+import random
+from django.test import TestCase
+from backend.api.models import ContestantTally
+from backend.api.scoring import build_scoreboard, rank_totals, round_score, save_score_changes
+from backend.api.seeding import seed_event, seed_user
+from backend.api.tallies import rebuild_tallies
+from .sheets import sheet, unscored_event
+
+
+class TallyTotalsTest(TestCase):
+    """ContestantTally totals and rankings must equal the scoreboard's"""
+
+    def setUp(self):
+        self.sub_event = unscored_event(sub_events=1, contestants=4, judges=3, criteria=2).sub_events.get()
+        self.contestants, self.judges, self.criteria = sheet(self.sub_event)
+
+    def save(self, judge, contestant, criterion, score):
+        touched, conflicts, errors = save_score_changes(
+            judge, [{'contestant': contestant.id, 'criterion': criterion.id, 'score': score}]
+        )
+        self.assertEqual((conflicts, errors), ([], []))
+
+    def assertTalliesMatchScoreboard(self):
+        scoreboard = build_scoreboard(self.contestants, self.judges, self.criteria)
+        tallies = {
+            tally.contestant_id: round_score(tally.weighted_total)
+            for tally in ContestantTally.objects.filter(sub_event=self.sub_event, score_count__gt=0)
+        }
+        scored = {
+            contestant_id for contestant_id, averages in scoreboard['averages'].items()
+            if any(average is not None for average in averages.values())
+        }
+        self.assertEqual(tallies, {contestant_id: scoreboard['totals'][contestant_id] for contestant_id in scored})
+        self.assertEqual(
+            rank_totals(tallies),
+            rank_totals({contestant_id: scoreboard['totals'][contestant_id] for contestant_id in scored}),
+        )
+
+    def test_seeded_scores(self):
+        sub_event = seed_event(seed_user(), sub_events=1, contestants=5, judges=3, criteria=3).sub_events.get()
+        scoreboard = build_scoreboard(*sheet(sub_event))
+        self.assertEqual(
+            {tally.contestant_id: round_score(tally.weighted_total) for tally in ContestantTally.objects.filter(sub_event=sub_event)},
+            scoreboard['totals'],
+        )
+
+    def test_partly_filled_sheet(self):
+        # Two criteria worth 50 points each; judge 1 leaves A's second criterion empty
+        judge_1, judge_2 = self.judges[:2]
+        a, b = self.contestants[:2]
+        k1, k2 = self.criteria
+
+        self.save(judge_1, a, k1, 100)
+        for criterion in (k1, k2):
+            self.save(judge_2, a, criterion, 100)
+            self.save(judge_1, b, criterion, 90)
+            self.save(judge_2, b, criterion, 90)
+
+        self.assertEqual(ContestantTally.objects.get(contestant=a).weighted_total, 100)
+        self.assertEqual(ContestantTally.objects.get(contestant=b).weighted_total, 90)
+        self.assertTalliesMatchScoreboard()
+
+    def test_random_saves_and_rebuild(self):
+        rng = random.Random(5)
+        for _ in range(200):
+            score = rng.choice([None, rng.randint(0, 100)])
+            self.save(rng.choice(self.judges), rng.choice(self.contestants), rng.choice(self.criteria), score)
+        self.assertTalliesMatchScoreboard()
+
+        incremental = {
+            tally.contestant_id: (tally.score_sum, tally.score_count, tally.judge_count, tally.weighted_total)
+            for tally in ContestantTally.objects.filter(sub_event=self.sub_event)
+        }
+        rebuild_tallies([self.sub_event.id])
+        rebuilt = {
+            tally.contestant_id: (tally.score_sum, tally.score_count, tally.judge_count, tally.weighted_total)
+            for tally in ContestantTally.objects.filter(sub_event=self.sub_event)
+        }
+        self.assertEqual(
+            {key: value for key, value in incremental.items() if value[1]},
+            {key: value for key, value in rebuilt.items() if value[1]},
+        )
+        self.assertTalliesMatchScoreboard()
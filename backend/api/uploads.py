@@ -0,0 +1,157 @@
+"""
+Chunked, resumable case file uploads.
+
+An upload session announces the file's name and size. The client then sends
+the bytes as a series of PUTs, each starting at the session's current offset,
+and finalizes the session to create the CaseFile. Chunks are streamed from the
+request to a staging file with a fixed-size buffer and hashed on the way, so
+memory per upload stays constant. A dropped connection loses at most the chunk
+in flight: the client reads the offset back and resumes from there.
+
+Staged files live in CASE_UPLOAD_STAGING_DIR (by default upload_sessions/
+under MEDIA_ROOT). Put it on the same filesystem as the media storage so
+finalizing is a rename rather than a copy.
+"""
+import hashlib
+import hmac
+import os
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from .models import CaseFile, UploadSession
+
+# Bytes read from the request or a staged file at a time
+BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(ValueError):
+    """Raised for upload requests that should be reported as a 400"""
+
+
+class OffsetMismatch(UploadError):
+    """A chunk did not start at the session's current offset (reported as a 409)"""
+
+    def __init__(self, offset):
+        super().__init__(f'Chunk must start at offset {offset}')
+        self.offset = offset
+
+
+class StagedFile(File):
+    """A staged upload; exposing its path lets FileSystemStorage move it instead of copying"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def staging_dir():
+    path = getattr(settings, 'CASE_UPLOAD_STAGING_DIR', None)
+    return path or os.path.join(settings.MEDIA_ROOT or settings.BASE_DIR, 'upload_sessions')
+
+
+def staged_path(session):
+    return os.path.join(staging_dir(), f'{session.id.hex}.part')
+
+
+def max_upload_size():
+    return getattr(settings, 'CASE_UPLOAD_MAX_SIZE', 10 * 1024 ** 3)
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file, read with a fixed-size buffer"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as staged:
+        for block in iter(lambda: staged.read(BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def start_upload(case, user, filename, size, description=''):
+    """Create an upload session and its empty staging file"""
+    if size < 0 or size > max_upload_size():
+        raise UploadError(f'File size must be between 0 and {max_upload_size()} bytes')
+    session = UploadSession.objects.create(
+        case=case, created_by=user, filename=filename, size=size, description=description
+    )
+    os.makedirs(staging_dir(), exist_ok=True)
+    open(staged_path(session), 'wb').close()
+    return session
+
+
+def append_chunk(session_id, user, offset, stream, chunk_sha256=None):
+    """
+    Stream a chunk from stream (anything with read(n)) into the session at offset.
+    The optional chunk_sha256 is checked against the bytes received; a failed
+    chunk is discarded. Returns the updated session.
+    """
+    with transaction.atomic():
+        # The row lock serialises chunks of one session
+        session = UploadSession.objects.select_for_update().get(id=session_id, created_by=user)
+        if offset != session.received:
+            raise OffsetMismatch(session.received)
+
+        digest = hashlib.sha256()
+        written = 0
+        with open(staged_path(session), 'r+b') as staged:
+            staged.seek(offset)
+            try:
+                for block in iter(lambda: stream.read(BUFFER_SIZE), b''):
+                    written += len(block)
+                    if offset + written > session.size:
+                        raise UploadError(f'Chunk runs past the announced size of {session.size} bytes')
+                    digest.update(block)
+                    staged.write(block)
+                if chunk_sha256 and not hmac.compare_digest(digest.hexdigest(), chunk_sha256.lower()):
+                    raise UploadError('Chunk checksum does not match the bytes received')
+            except BaseException:
+                # Drop the partial chunk so the client can resend it from the same offset
+                staged.truncate(offset)
+                raise
+            staged.truncate()
+
+        session.received = offset + written
+        session.save(update_fields=['received', 'updated_at'])
+    return session
+
+
+def finalize_upload(session_id, user, sha256=None):
+    """
+    Turn a completely received session into a CaseFile, checking the whole-file
+    sha256 when given. Returns the CaseFile.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(id=session_id, created_by=user)
+        if session.received != session.size:
+            raise UploadError(f'Upload is incomplete: {session.received} of {session.size} bytes received')
+
+        path = staged_path(session)
+        digest = file_sha256(path)
+        if sha256 and not hmac.compare_digest(digest, sha256.lower()):
+            raise UploadError('File checksum does not match the bytes received')
+
+        case_file = CaseFile(
+            case_id=session.case_id,
+            uploaded_by=user,
+            filename=session.filename,
+            description=session.description,
+            size=session.size,
+            sha256=digest,
+        )
+        with open(path, 'rb') as staged:
+            staged_file = StagedFile(staged)
+            staged_file.sha256 = digest  # Spares the content-addressed storage a second pass
+            case_file.file.save(session.filename, staged_file, save=False)
+        case_file.save()
+        session.delete()
+
+    # Left behind when the storage copied the staging file or already had its content
+    if os.path.exists(path):
+        os.remove(path)
+    return case_file
+
+
+def abort_upload(session):
+    """Delete a session and its staged bytes"""
+    path = staged_path(session)
+    session.delete()
+    if os.path.exists(path):
+        os.remove(path)
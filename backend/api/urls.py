@@ -1,6 +1,5 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework.authtoken.views import obtain_auth_token
 from . import views
 
 router = DefaultRouter()
@@ -15,8 +14,18 @@ urlpatterns = [
     path('auth/login/', views.login_view, name='api_login'),
     path('auth/register/', views.register_view, name='api_register'),
     path('auth/judge-login/', views.judge_login_view, name='judge_login'),
+    path('auth/judge-bootstrap/', views.judge_bootstrap_view, name='judge_bootstrap'),
     path('auth/verify-password/', views.verify_password_view, name='verify_password'),
     path('subevents/<int:subevent_id>/settings/', views.subevent_settings_view, name='subevent_settings'),
+    path('subevents/<int:subevent_id>/scoreboard/', views.subevent_scoreboard_view, name='subevent_scoreboard'),
+    path('subevents/<int:subevent_id>/rankings/', views.subevent_rankings_view, name='subevent_rankings'),
+    path('subevents/<int:subevent_id>/live/', views.subevent_live_scores_view, name='subevent_live_scores'),
+    path('uploads/', views.upload_sessions_view, name='upload_sessions'),
+    path('uploads/<uuid:upload_id>/', views.upload_session_view, name='upload_session'),
+    path('uploads/<uuid:upload_id>/finalize/', views.finalize_upload_view, name='finalize_upload'),
+    path('subevents/<int:subevent_id>/export/<str:file_format>/', views.subevent_export_view, name='subevent_export'),
+    path('events/<int:event_id>/leaderboard/', views.event_leaderboard_view, name='event_leaderboard'),
+    path('events/<int:event_id>/export/<str:file_format>/', views.event_export_view, name='event_export'),
     path('judges/<int:judge_id>/scores/', views.judge_scores_view, name='judge_scores'),
     path('judges/<int:judge_id>/scores/save/', views.save_judge_scores_view, name='save_judge_scores'),
     path('', include(router.urls)),
@@ -1,17 +1,48 @@
+import asyncio
+import io
+import logging
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import ValidationError
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header
+from django.utils.text import slugify
+from django.views.decorators.http import condition
 from rest_framework.authtoken.models import Token
-from .models import Case, CaseNote, CaseFile, Event, SubEvent, Contestant, Judge, Criteria, Score
+from .models import Case, CaseNote, CaseFile, UploadSession, Event, SubEvent, Contestant, Judge, Criteria, ContestantTally
 from .serializers import (
-    UserSerializer, CaseSerializer, CaseCreateSerializer,
+    UserSerializer, CaseSerializer, CaseListSerializer, CaseCreateSerializer,
     CaseNoteSerializer, CaseFileSerializer, EventSerializer, EventCreateSerializer,
-    SubEventSerializer, ContestantSerializer, JudgeSerializer, CriteriaSerializer, ScoreSerializer
+    SubEventSerializer, ContestantSerializer, JudgeSerializer, CriteriaSerializer, ScoreSerializer,
+    ScoreConflictSerializer, ContestantTallySerializer, SubEventWithJudgesSerializer, UploadSessionSerializer
 )
-from .models import generate_judge_code
+from .scoring import build_scoreboard, changes_from_sheet, rank_totals, round_score, save_score_changes
+from .subevent_settings import SettingsError, save_subevent_settings
+from .authentication import get_cached_token
+from .caching import (
+    bump_event_version, bump_judge_version, bump_sub_event_versions, event_leaderboard_payload, get_versions,
+    judge_bootstrap_payload, judge_scores_etag, judge_scores_payload, judge_sub_event_id, sub_event_payload,
+    sub_event_settings_etag
+)
+from .routers import ReplicaReadMixin, read_from_replica
+from .live import format_sse, get_broadcaster, publish_score_changes, sub_event_channel
+from .downloads import file_download_response
+from .exports import EXPORT_FORMATS, score_sheet_sections
+from .search import search_cases
+from .uploads import OffsetMismatch, UploadError, abort_upload, append_chunk, finalize_upload, start_upload
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on idle live score streams
+LIVE_KEEPALIVE_SECONDS = 15
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -22,10 +53,9 @@ def login_view(request):
     username = request.data.get('username')
     password = request.data.get('password')
     
-    print(f"Login attempt - Username: {username}")  # Debug log
+    logger.debug('Login attempt for %s', username)
     
     if not username or not password:
-        print("Missing username or password")
         return Response(
             {'error': 'Username and password are required'},
             status=status.HTTP_400_BAD_REQUEST
@@ -34,9 +64,8 @@ def login_view(request):
     # Check if user exists
     try:
         user = User.objects.get(username=username)
-        print(f"User found: {user.username}")
     except User.DoesNotExist:
-        print(f"User not found: {username}")
+        logger.info('Login failed for %s: unknown user', username)
         return Response(
             {'error': 'Invalid username or password'},
             status=status.HTTP_401_UNAUTHORIZED
@@ -44,12 +73,10 @@ def login_view(request):
     
     # Authenticate user
     user = authenticate(username=username, password=password)
-    print(f"Authentication result: {user is not None}")
     
     if user is not None:
         # Get or create token for the user
         token, created = Token.objects.get_or_create(user=user)
-        print(f"Token created/retrieved: {token.key[:10]}...")
         
         # Return user data and token
         return Response({
@@ -63,7 +90,7 @@ def login_view(request):
             }
         })
     else:
-        print("Authentication failed - invalid password")
+        logger.info('Login failed for %s: invalid password', username)
         return Response(
             {'error': 'Invalid username or password'},
             status=status.HTTP_401_UNAUTHORIZED
@@ -81,7 +108,7 @@ def register_view(request):
     first_name = request.data.get('first_name', '')
     last_name = request.data.get('last_name', '')
     
-    print(f"Registration attempt - Username: {username}")  # Debug log
+    logger.debug('Registration attempt for %s', username)
     
     # Validate required fields
     if not username or not password:
@@ -120,11 +147,10 @@ def register_view(request):
             first_name=first_name,
             last_name=last_name
         )
-        print(f"User created: {user.username}")
+        logger.info('User %s registered', user.username)
         
         # Create token for the new user
         token = Token.objects.create(user=user)
-        print(f"Token created: {token.key[:10]}...")
         
         # Return user data and token
         return Response({
@@ -138,30 +164,77 @@ def register_view(request):
             },
             'message': 'Registration successful'
         }, status=status.HTTP_201_CREATED)
-    except Exception as e:
-        print(f"Error creating user: {str(e)}")
+    except Exception:
+        logger.exception('Failed to create user %s', username)
         return Response(
             {'error': 'Failed to create user. Please try again.'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # auth_user has no default ordering; page along its unique username index
+    ordering = ['username']
+
+def _case_related_count(model):
+    """Correlated COUNT(*) of a case's notes or files, without joining both into the case rows"""
+    counts = model.objects.filter(case=OuterRef('pk')).order_by().values('case').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
 
-class CaseViewSet(viewsets.ModelViewSet):
+class CaseViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Case.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('list', 'search')
+    
+    def get_queryset(self):
+        queryset = Case.objects.select_related('assigned_to', 'created_by')
+        if self.action in ('list', 'search'):
+            return queryset.annotate(
+                note_count=_case_related_count(CaseNote),
+                file_count=_case_related_count(CaseFile),
+            )
+        if self.action in ('retrieve', 'update', 'partial_update'):
+            return queryset.prefetch_related(
+                Prefetch('notes', queryset=CaseNote.objects.select_related('author')),
+                Prefetch('files', queryset=CaseFile.objects.select_related('uploaded_by')),
+            )
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'create':
             return CaseCreateSerializer
+        if self.action in ('list', 'search'):
+            return CaseListSerializer
         return CaseSerializer
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
     
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked search over case titles and descriptions, note contents, file
+        names and case number prefixes: ?q=<text>&limit=<1-100, default 20>
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Search query (q) is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ranked = search_cases(query, limit)
+        cases = {case.id: case for case in self.get_queryset().filter(id__in=[case_id for case_id, _ in ranked])}
+        results = []
+        for case_id, relevance in ranked:
+            case = cases.get(case_id)
+            if case is not None:
+                results.append({**self.get_serializer(case).data, 'relevance': round(relevance, 4)})
+        return Response({'query': query, 'results': results})
+    
     @action(detail=True, methods=['post'])
     def add_note(self, request, pk=None):
         case = self.get_object()
@@ -180,23 +253,106 @@ class CaseViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class CaseNoteViewSet(viewsets.ModelViewSet):
-    queryset = CaseNote.objects.all()
+class CaseNoteViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = CaseNote.objects.select_related('author')
     serializer_class = CaseNoteSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-class CaseFileViewSet(viewsets.ModelViewSet):
-    queryset = CaseFile.objects.all()
+class CaseFileViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = CaseFile.objects.select_related('uploaded_by')
     serializer_class = CaseFileSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Stream the file; supports Range/If-Range, ETag revalidation and web server handoff"""
+        return file_download_response(request, self.get_object())
 
-class EventViewSet(viewsets.ModelViewSet):
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_sessions_view(request):
+    """
+    Start a chunked case file upload
+    Expected payload: {"case": case_id, "filename": "evidence.mp4", "size": total_bytes, "description": "..."}
+    """
+    serializer = UploadSessionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        session = start_upload(
+            serializer.validated_data['case'],
+            request.user,
+            serializer.validated_data['filename'],
+            serializer.validated_data['size'],
+            serializer.validated_data.get('description', ''),
+        )
+    except UploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_view(request, upload_id):
+    """
+    GET: Upload progress; "received" is the offset to resume from
+    PUT: Append the raw request body at the offset in the Upload-Offset header,
+         optionally checked against an X-Chunk-SHA256 header. A wrong offset
+         is answered with 409 and the current offset
+    DELETE: Abort the upload
+    """
+    if request.method == 'PUT':
+        try:
+            offset = int(request.headers.get('Upload-Offset', request.query_params.get('offset', '')))
+        except ValueError:
+            return Response({'error': 'Upload-Offset header is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            # Read the body straight from the request stream; request.data would buffer it
+            session = append_chunk(
+                upload_id, request.user, offset, request.stream or io.BytesIO(), request.headers.get('X-Chunk-SHA256')
+            )
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        except OffsetMismatch as e:
+            return Response({'error': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(UploadSessionSerializer(session).data)
+    
+    try:
+        session = UploadSession.objects.get(id=upload_id, created_by=request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if request.method == 'GET':
+        return Response(UploadSessionSerializer(session).data)
+    
+    abort_upload(session)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def finalize_upload_view(request, upload_id):
+    """
+    Finish a chunked upload and create its case file
+    Optional payload: {"sha256": "hex digest of the whole file"}
+    """
+    try:
+        case_file = finalize_upload(upload_id, request.user, request.data.get('sha256'))
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    except UploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(CaseFileSerializer(case_file).data, status=status.HTTP_201_CREATED)
+
+class EventViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Event.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     
@@ -204,7 +360,7 @@ class EventViewSet(viewsets.ModelViewSet):
         """
         Filter events to only show those created by the authenticated user
         """
-        return Event.objects.filter(created_by=self.request.user)
+        return Event.objects.filter(created_by=self.request.user).select_related('created_by')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -213,6 +369,15 @@ class EventViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        # The event title and year are part of the cached judge payloads
+        bump_sub_event_versions(serializer.instance.sub_events.values_list('id', flat=True))
+    
+    def perform_destroy(self, instance):
+        bump_sub_event_versions(instance.sub_events.values_list('id', flat=True))
+        instance.delete()
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -239,19 +404,57 @@ def verify_password_view(request):
             status=status.HTTP_401_UNAUTHORIZED
         )
 
-class SubEventViewSet(viewsets.ModelViewSet):
+class SubEventViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = SubEvent.objects.all()
     serializer_class = SubEventSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         """
-        Filter sub-events to only show those belonging to events created by the authenticated user
+        Filter sub-events to only show those belonging to events created by the authenticated user.
+        ?event=<id> limits the list to one event; ?expand=judges embeds each sub-event's
+        judges plus contestant and criteria counts
         """
-        return SubEvent.objects.filter(event__created_by=self.request.user)
+        queryset = SubEvent.objects.filter(event__created_by=self.request.user)
+        
+        event_id = self.request.query_params.get('event')
+        if event_id:
+            try:
+                queryset = queryset.filter(event_id=int(event_id))
+            except ValueError:
+                raise ValidationError({'event': 'Must be an integer id'})
+        
+        if self._expand_judges():
+            queryset = queryset.prefetch_related('judges').annotate(
+                contestant_count=Count('contestants', distinct=True),
+                criteria_count=Count('criteria', distinct=True),
+            )
+        return queryset
+    
+    def _expand_judges(self):
+        return 'judges' in self.request.query_params.get('expand', '').split(',')
+    
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve') and self._expand_judges():
+            return SubEventWithJudgesSerializer
+        return SubEventSerializer
     
     def perform_create(self, serializer):
         serializer.save()
+        bump_event_version(serializer.instance.event_id)
+    
+    def perform_update(self, serializer):
+        previous_event_id = serializer.instance.event_id
+        serializer.save()
+        bump_sub_event_versions([serializer.instance.id])
+        bump_event_version(previous_event_id)
+        if serializer.instance.event_id != previous_event_id:
+            bump_event_version(serializer.instance.event_id)
+    
+    def perform_destroy(self, instance):
+        bump_sub_event_versions([instance.id])
+        bump_event_version(instance.event_id)
+        instance.delete()
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -267,42 +470,53 @@ def judge_login_view(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    try:
-        judge = Judge.objects.select_related('sub_event', 'sub_event__event').get(code=code)
-        
-        # Return judge data with sub-event and event details
-        return Response({
-            'judge': {
-                'id': judge.id,
-                'name': judge.name,
-                'code': judge.code,
-                'type': judge.type,
-                'sub_event': {
-                    'id': judge.sub_event.id,
-                    'title': judge.sub_event.title,
-                    'date': judge.sub_event.date,
-                    'time': judge.sub_event.time,
-                    'location': judge.sub_event.location,
-                    'event': {
-                        'id': judge.sub_event.event.id,
-                        'title': judge.sub_event.event.title,
-                        'year': judge.sub_event.event.year,
-                    }
-                }
-            }
-        })
-    except Judge.DoesNotExist:
+    # Served from the versioned cache so a burst of judge logins does not hit the database
+    payload = judge_bootstrap_payload(code, include_scores=False)
+    if payload is None:
         return Response(
             {'error': 'Invalid judge code'},
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    # Return judge data with sub-event and event details
+    return Response(payload)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def judge_bootstrap_view(request):
+    """
+    Judge sheet bootstrap using judge code: the judge with sub-event and event details,
+    the contestants and criteria to score and the judge's existing scores, comments
+    and per-cell versions in one response (cached until settings or scores change)
+    """
+    code = request.data.get('code')
+    
+    if not code:
+        return Response(
+            {'error': 'Judge code is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    payload = judge_bootstrap_payload(code)
+    if payload is None:
+        return Response(
+            {'error': 'Invalid judge code'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response(payload)
+
+@condition(etag_func=sub_event_settings_etag)
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])  # Allow judges (who don't have tokens) to access GET
+@read_from_replica(lambda subevent_id: [('subevent', subevent_id)])
 def subevent_settings_view(request, subevent_id):
     """
-    GET: Retrieve all settings (contestants, judges, criteria) for a sub-event
-    POST: Save settings for a sub-event (replaces all existing settings)
+    GET: Retrieve all settings (contestants, judges, criteria) for a sub-event.
+    Responses carry an ETag (with a shared cache); a matching If-None-Match is answered with 304
+    POST: Save settings for a sub-event. Rows are matched by "id": matching rows are
+    updated, rows without a match are created and stored rows missing from the
+    payload are deleted
     """
     try:
         sub_event = SubEvent.objects.get(id=subevent_id)
@@ -315,15 +529,16 @@ def subevent_settings_view(request, subevent_id):
     if request.method == 'GET':
         # Get all contestants, judges, and criteria for this sub-event
         # Allow public access for judges to view settings
-        contestants = Contestant.objects.filter(sub_event=sub_event)
-        judges = Judge.objects.filter(sub_event=sub_event)
-        criteria = Criteria.objects.filter(sub_event=sub_event)
+        payload = sub_event_payload(sub_event.id)
         
-        return Response({
-            'contestants': ContestantSerializer(contestants, many=True).data,
-            'judges': JudgeSerializer(judges, many=True).data,
-            'criteria': CriteriaSerializer(criteria, many=True).data,
+        response = Response({
+            'contestants': payload['contestants'],
+            'judges': payload['judges'],
+            'criteria': payload['criteria'],
         })
+        # Let browsers keep the copy but revalidate it with the ETag every time
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
     
     elif request.method == 'POST':
         # Only authenticated users can save settings
@@ -334,143 +549,214 @@ def subevent_settings_view(request, subevent_id):
             )
         
         # Verify that the sub-event belongs to an event created by the authenticated user
-        if not sub_event.event.created_by or sub_event.event.created_by != request.user:
+        if not sub_event.event.created_by_id or sub_event.event.created_by_id != request.user.id:
             return Response(
                 {'error': 'You do not have permission to modify this sub-event'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
         try:
-            # Delete existing settings
-            Contestant.objects.filter(sub_event=sub_event).delete()
-            Judge.objects.filter(sub_event=sub_event).delete()
-            Criteria.objects.filter(sub_event=sub_event).delete()
-            
-            # Create new contestants
-            contestants_data = request.data.get('contestants', [])
-            contestants = []
-            for idx, contestant_data in enumerate(contestants_data):
-                if contestant_data and contestant_data.get('name'):  # Only create if name is not empty
-                    try:
-                        contestant = Contestant.objects.create(
-                            sub_event=sub_event,
-                            name=contestant_data['name'],
-                            order=idx
-                        )
-                        contestants.append(ContestantSerializer(contestant).data)
-                    except Exception as e:
-                        return Response(
-                            {'error': f'Error creating contestant: {str(e)}'},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-            
-            # Create new judges
-            judges_data = request.data.get('judges', [])
-            judges = []
-            for idx, judge_data in enumerate(judges_data):
-                if judge_data and judge_data.get('name'):  # Only create if name is not empty
-                    try:
-                        # Use existing code if provided and valid, otherwise generate new one
-                        code = judge_data.get('code')
-                        if code and len(code) == 6 and code.isdigit():
-                            # Verify code is unique (check all other judges since we deleted this sub_event's judges)
-                            if Judge.objects.filter(code=code).exists():
-                                code = generate_judge_code()  # Generate new if code already exists for another judge
-                        else:
-                            code = generate_judge_code()  # Generate unique 6-digit code
-                        
-                        judge = Judge.objects.create(
-                            sub_event=sub_event,
-                            name=judge_data['name'],
-                            code=code,
-                            type=judge_data.get('type', 'judge'),
-                            order=idx
-                        )
-                        judges.append(JudgeSerializer(judge).data)
-                    except Exception as e:
-                        return Response(
-                            {'error': f'Error creating judge: {str(e)}'},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-            
-            # Create new criteria
-            criteria_data = request.data.get('criteria', [])
-            criteria = []
-            for idx, criterion_data in enumerate(criteria_data):
-                if criterion_data and criterion_data.get('name'):  # Only create if name is not empty
-                    try:
-                        try:
-                            points = float(criterion_data.get('points', 0))
-                        except (ValueError, TypeError):
-                            points = 0
-                        
-                        criterion = Criteria.objects.create(
-                            sub_event=sub_event,
-                            name=criterion_data['name'],
-                            points=points,
-                            order=idx
-                        )
-                        criteria.append(CriteriaSerializer(criterion).data)
-                    except Exception as e:
-                        return Response(
-                            {'error': f'Error creating criteria: {str(e)}'},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
+            # Diff against the stored rows so unchanged contestants, judges and
+            # criteria (and their scores) survive the save
+            contestants, judges, criteria = save_subevent_settings(sub_event, request.data)
+            bump_sub_event_versions([sub_event.id])
+            bump_event_version(sub_event.event_id)
             
             return Response({
-                'contestants': contestants,
-                'judges': judges,
-                'criteria': criteria,
+                'contestants': ContestantSerializer(contestants, many=True).data,
+                'judges': JudgeSerializer(judges, many=True).data,
+                'criteria': CriteriaSerializer(criteria, many=True).data,
                 'message': 'Settings saved successfully'
             }, status=status.HTTP_201_CREATED)
+        except SettingsError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
-            import traceback
-            print(f"Error saving settings: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception('Failed to save settings of sub-event %s', subevent_id)
             return Response(
                 {'error': f'Failed to save settings: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 @api_view(['GET'])
-@permission_classes([AllowAny])
-def judge_scores_view(request, judge_id):
+@permission_classes([permissions.IsAuthenticated])
+@read_from_replica()
+def subevent_scoreboard_view(request, subevent_id):
     """
-    GET: Retrieve all scores for a specific judge
+    GET: Aggregated scoreboard for a sub-event in a single request.
+    Returns the sub-event settings, every judge's score cells, per-criterion averages,
+    weighted totals and tie-aware rankings (overall and per judge)
     """
     try:
-        judge = Judge.objects.select_related('sub_event').get(id=judge_id)
-    except Judge.DoesNotExist:
+        sub_event = SubEvent.objects.select_related('event').get(id=subevent_id)
+    except SubEvent.DoesNotExist:
         return Response(
-            {'error': 'Judge not found'},
+            {'error': 'Sub-event not found'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    scores = Score.objects.filter(judge=judge).select_related('contestant', 'criterion')
+    if sub_event.event.created_by_id != request.user.id:
+        return Response(
+            {'error': 'You do not have permission to view this sub-event'},
+            status=status.HTTP_403_FORBIDDEN
+        )
     
-    # Organize scores by contestant
-    scores_by_contestant = {}
-    comments_by_contestant = {}
+    contestants = list(Contestant.objects.filter(sub_event=sub_event))
+    judges = list(Judge.objects.filter(sub_event=sub_event))
+    criteria = list(Criteria.objects.filter(sub_event=sub_event))
     
-    for score in scores:
-        contestant_id = score.contestant.id
-        if contestant_id not in scores_by_contestant:
-            scores_by_contestant[contestant_id] = {}
-            comments_by_contestant[contestant_id] = score.comments or ''
-        
-        scores_by_contestant[contestant_id][score.criterion.id] = score.score
+    scoreboard = build_scoreboard(contestants, judges, criteria)
     
     return Response({
-        'scores': scores_by_contestant,
-        'comments': comments_by_contestant
+        'contestants': ContestantSerializer(contestants, many=True).data,
+        'judges': JudgeSerializer(judges, many=True).data,
+        'criteria': CriteriaSerializer(criteria, many=True).data,
+        **scoreboard,
     })
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@read_from_replica()
+def subevent_rankings_view(request, subevent_id):
+    """
+    GET: Overall rankings for a sub-event read from the maintained contestant tallies.
+    weighted_total weights the criterion averages by points, the same total as the
+    scoreboard; contestants without any score yet are not listed
+    """
+    try:
+        sub_event = SubEvent.objects.select_related('event').get(id=subevent_id)
+    except SubEvent.DoesNotExist:
+        return Response(
+            {'error': 'Sub-event not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if sub_event.event.created_by_id != request.user.id:
+        return Response(
+            {'error': 'You do not have permission to view this sub-event'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    tallies = list(
+        ContestantTally.objects.filter(sub_event=sub_event, score_count__gt=0).select_related('contestant')
+    )
+    rankings = rank_totals({tally.contestant_id: round_score(tally.weighted_total) for tally in tallies})
+    
+    data = ContestantTallySerializer(tallies, many=True).data
+    for row in data:
+        row['rank'] = rankings[row['contestant']]
+    
+    return Response({'rankings': data})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def event_leaderboard_view(request, event_id):
+    """
+    GET: Overall standings of an event, summing each contestant's weighted
+    totals over the sub-events. Contestants are matched across sub-events by
+    name (ignoring case and spacing); cached until a score or setting in the event changes
+    """
+    if not Event.objects.filter(id=event_id, created_by=request.user).exists():
+        return Response(
+            {'error': 'Event not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response(event_leaderboard_payload(event_id))
+
+def _export_response(sub_events, file_format, basename):
+    stream, content_type = EXPORT_FORMATS[file_format]
+    response = StreamingHttpResponse(stream(score_sheet_sections(sub_events)), content_type=content_type)
+    response['Content-Disposition'] = content_disposition_header(True, f'{slugify(basename) or "scores"}-scores.{file_format}')
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def subevent_export_view(request, subevent_id, file_format):
+    """
+    GET: Stream a sub-event's score cells, per-judge totals and rankings as csv or xlsx
+    """
+    if file_format not in EXPORT_FORMATS:
+        return Response({'error': 'Export format must be csv or xlsx'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        sub_event = SubEvent.objects.select_related('event').get(id=subevent_id)
+    except SubEvent.DoesNotExist:
+        return Response(
+            {'error': 'Sub-event not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if sub_event.event.created_by_id != request.user.id:
+        return Response(
+            {'error': 'You do not have permission to export this sub-event'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    return _export_response([sub_event], file_format, f'{sub_event.event.title} {sub_event.title}')
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def event_export_view(request, event_id, file_format):
+    """
+    GET: Stream the score cells, per-judge totals and rankings of every sub-event of an event as csv or xlsx
+    """
+    if file_format not in EXPORT_FORMATS:
+        return Response({'error': 'Export format must be csv or xlsx'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        event = Event.objects.get(id=event_id, created_by=request.user)
+    except Event.DoesNotExist:
+        return Response(
+            {'error': 'Event not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return _export_response(list(event.sub_events.all()), file_format, event.title)
+
+@condition(etag_func=judge_scores_etag)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@read_from_replica(lambda judge_id: [('judge', judge_id), ('subevent', judge_sub_event_id(judge_id))])
+def judge_scores_view(request, judge_id):
+    """
+    GET: Retrieve all scores for a specific judge.
+    Responses carry an ETag (with a shared cache); a matching If-None-Match is answered with 304
+    """
+    try:
+        judge = Judge.objects.get(id=judge_id)
+    except Judge.DoesNotExist:
+        return Response(
+            {'error': 'Judge not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Scores, comments and per-cell versions (sent back with delta saves), grouped by contestant
+    sub_event_version, judge_version = get_versions(('subevent', judge.sub_event_id), ('judge', judge.id))
+    response = Response(judge_scores_payload(judge.id, sub_event_version, judge_version))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def save_judge_scores_view(request, judge_id):
     """
     POST: Save/update scores for a judge
-    Expected payload:
+    Expected payload (only the cells that changed):
+    {
+        "changes": [
+            {"contestant": id, "criterion": id, "score": score_value, "updated_at": last_seen_updated_at},
+            {"contestant": id, "comments": "comment text"}
+        ]
+    }
+    "updated_at" is optional; when given, the cell is only written if it has not been
+    changed since (null means the client has never seen it saved). Conflicting cells
+    are returned with their current server state.
+    
+    The full-sheet payload is still accepted:
     {
         "scores": {
             "contestant_id": {
@@ -479,89 +765,39 @@ def save_judge_scores_view(request, judge_id):
             }
         }
     }
+    Only the rows that were actually written are returned in "saved".
     """
     try:
-        judge = Judge.objects.get(id=judge_id)
+        judge = Judge.objects.select_related('sub_event').get(id=judge_id)
     except Judge.DoesNotExist:
         return Response(
             {'error': 'Judge not found'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    saved_scores = []
-    errors = []
+    if 'changes' in request.data:
+        changes = request.data.get('changes') or []
+    else:
+        scores_data = request.data.get('scores', request.data)  # Support both formats
+        changes = changes_from_sheet(scores_data)
     
-    scores_data = request.data.get('scores', request.data)  # Support both formats
+    if not isinstance(changes, list):
+        return Response(
+            {'error': 'changes must be a list'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    for contestant_id, data in scores_data.items():
-        try:
-            contestant = Contestant.objects.get(id=contestant_id, sub_event=judge.sub_event)
-        except (Contestant.DoesNotExist, ValueError):
-            try:
-                contestant_id_int = int(contestant_id)
-                contestant = Contestant.objects.get(id=contestant_id_int, sub_event=judge.sub_event)
-            except (Contestant.DoesNotExist, ValueError):
-                errors.append(f'Contestant {contestant_id} not found')
-                continue
-        
-        comments = data.get('comments', '')
-        
-        # Save/update scores for each criterion
-        for criterion_id, criterion_data in data.items():
-            if criterion_id == 'comments':
-                continue
-            
-            try:
-                criterion = Criteria.objects.get(id=criterion_id, sub_event=judge.sub_event)
-            except (Criteria.DoesNotExist, ValueError):
-                try:
-                    criterion_id_int = int(criterion_id)
-                    criterion = Criteria.objects.get(id=criterion_id_int, sub_event=judge.sub_event)
-                except (Criteria.DoesNotExist, ValueError):
-                    errors.append(f'Criterion {criterion_id} not found')
-                    continue
-            
-            # Handle both {score: value} format and direct value format
-            if isinstance(criterion_data, dict):
-                score_value = criterion_data.get('score')
-            else:
-                score_value = criterion_data
-            
-            # Validate score value
-            score_int = None
-            if score_value is not None and score_value != '':
-                try:
-                    score_int = int(score_value)
-                    if score_int < 0 or score_int > 100:
-                        errors.append(f'Score {score_int} for criterion {criterion_id} is out of range (0-100)')
-                        continue
-                except (ValueError, TypeError):
-                    # Allow null/empty scores
-                    pass
-            
-            # Get or create the score
-            score_obj, created = Score.objects.update_or_create(
-                judge=judge,
-                contestant=contestant,
-                criterion=criterion,
-                defaults={
-                    'score': score_int,
-                    'comments': comments  # Store comments with each score (they're the same per contestant)
-                }
-            )
-            
-            # If comments were updated, update all other scores for this contestant to keep them in sync
-            if comments:
-                Score.objects.filter(
-                    judge=judge,
-                    contestant=contestant
-                ).exclude(id=score_obj.id).update(comments=comments)
-            
-            saved_scores.append(ScoreSerializer(score_obj).data)
+    touched, conflicts, errors = save_score_changes(judge, changes)
+    saved_scores = ScoreSerializer(touched, many=True).data
+    publish_score_changes(judge.sub_event_id, saved_scores)
+    if touched:
+        bump_judge_version(judge.id)
+        bump_event_version(judge.sub_event.event_id)
     
-    if errors:
+    if errors or conflicts:
         return Response({
             'saved': saved_scores,
+            'conflicts': ScoreConflictSerializer(conflicts, many=True).data,
             'errors': errors
         }, status=status.HTTP_207_MULTI_STATUS)
     
@@ -570,3 +806,63 @@ def save_judge_scores_view(request, judge_id):
         'message': 'Scores saved successfully'
     }, status=status.HTTP_200_OK)
 
+def _live_scores_owner(subevent_id, token_key, user):
+    """
+    Resolve the organizer for a live score stream. EventSource cannot send
+    headers, so the DRF token may be passed as ?token=.
+    Returns (sub_event, error_response).
+    """
+    if token_key:
+        token = get_cached_token(token_key)
+        user = token.user if token else None
+    if not user or not user.is_authenticated or not user.is_active:
+        return None, JsonResponse({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    try:
+        sub_event = SubEvent.objects.select_related('event').get(id=subevent_id)
+    except SubEvent.DoesNotExist:
+        return None, JsonResponse({'error': 'Sub-event not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if sub_event.event.created_by_id != user.id:
+        return None, JsonResponse(
+            {'error': 'You do not have permission to view this sub-event'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return sub_event, None
+
+async def subevent_live_scores_view(request, subevent_id):
+    """
+    GET: Server-sent event stream of score changes for a sub-event.
+    Each "scores" event carries the Score rows written by one save; a "resync"
+    event means the client fell behind and should reload the scoreboard.
+    Serve through the ASGI application so streams do not hold a worker thread.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    
+    user = await request.auser()
+    sub_event, error = await sync_to_async(_live_scores_owner)(
+        subevent_id, request.GET.get('token'), user
+    )
+    if error is not None:
+        return error
+    
+    subscription = get_broadcaster().subscribe(sub_event_channel(sub_event.id))
+    
+    async def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(message)
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
@@ -3,6 +3,10 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it under an ASGI server (e.g. ``uvicorn backend.asgi:application``) so the
+live score streams (``subevents/<id>/live/``) are served without tying up a
+worker thread per connected dashboard.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
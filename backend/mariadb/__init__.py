@@ -0,0 +1,15 @@
+"""
+MySQL database backend that also accepts MariaDB 10.4.
+
+Django 5.2 requires MariaDB 10.5 and emits INSERT ... RETURNING on every
+MariaDB, but RETURNING only exists from 10.5. This backend is the stock MySQL
+backend with two feature flags changed:
+
+  * minimum_database_version is 10.4 on MariaDB, so the version check made
+    when the first connection opens passes
+  * RETURNING is used only when the connected server supports it; on 10.4
+    inserted ids come from the cursor's lastrowid like on MySQL
+
+Both are decided once per connection from the server version, so no SQL is
+inspected or rewritten. Use it with ENGINE = 'backend.mariadb'.
+"""
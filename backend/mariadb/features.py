@@ -0,0 +1,18 @@
+from django.db.backends.mysql.features import DatabaseFeatures as MySQLDatabaseFeatures
+from django.utils.functional import cached_property
+
+# First MariaDB release with INSERT ... RETURNING
+MARIADB_RETURNING_VERSION = (10, 5)
+
+
+class DatabaseFeatures(MySQLDatabaseFeatures):
+    @cached_property
+    def minimum_database_version(self):
+        if self.connection.mysql_is_mariadb:
+            return (10, 4)
+        return super().minimum_database_version
+
+    @cached_property
+    def can_return_columns_from_insert(self):
+        # Also decides can_return_rows_from_bulk_insert
+        return self.connection.mysql_is_mariadb and self.connection.mysql_version >= MARIADB_RETURNING_VERSION
@@ -10,49 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
-import warnings
-
-# Monkey-patch to bypass MariaDB version check
-# This is a workaround for MariaDB 10.4 compatibility with Django 5.2
-try:
-    import django.db.backends.mysql.base
-    _original_check_database_version_supported = django.db.backends.mysql.base.DatabaseWrapper.check_database_version_supported
-
-    def _patched_check_database_version_supported(self):
-        try:
-            _original_check_database_version_supported(self)
-        except Exception as e:
-            # Only bypass if it's a version check error for MariaDB 10.4
-            if 'MariaDB 10.5' in str(e) or 'MariaDB 10.4' in str(e):
-                warnings.warn(f"Bypassing MariaDB version check: {e}", UserWarning)
-                return
-            raise
-
-    django.db.backends.mysql.base.DatabaseWrapper.check_database_version_supported = _patched_check_database_version_supported
-    
-    # Disable RETURNING clause for MariaDB 10.4 compatibility
-    # RETURNING is only supported in MariaDB 10.5+, but Django 5.2 uses it by default
-    import django.db.backends.mysql.features
-    django.db.backends.mysql.features.DatabaseFeatures.supports_returning = False
-    
-    # Patch the MySQL cursor execute method to strip RETURNING clauses
-    # This is needed because MariaDB 10.4 doesn't support RETURNING
-    import django.db.backends.mysql.base
-    _original_cursor_execute = django.db.backends.mysql.base.CursorWrapper.execute
-    
-    def _patched_cursor_wrapper_execute(self, sql, params=None):
-        # Remove RETURNING clause from SQL if present
-        if isinstance(sql, str) and ' RETURNING ' in sql.upper():
-            # Strip RETURNING clause and everything after it
-            sql_parts = sql.split(' RETURNING ', 1)
-            sql = sql_parts[0]
-        return _original_cursor_execute(self, sql, params)
-    
-    django.db.backends.mysql.base.CursorWrapper.execute = _patched_cursor_wrapper_execute
-except ImportError:
-    # If MySQL backend is not available, skip patching
-    pass
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -86,6 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Timing, SQL accounting and metrics for every request; see backend/api/instrumentation.py
+    'backend.api.instrumentation.PerformanceMiddleware',
+    # Sends a user's reads to the primary right after they write
+    'backend.api.routers.ReadYourWritesMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -121,22 +84,94 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # The MySQL backend with MariaDB 10.4 support; see backend/mariadb/__init__.py
+        'ENGINE': 'backend.mariadb',
         'NAME': 'cjms_dbs',
         'USER':'root',
         'PASSWORD':'',
         'HOST':'localhost',
         'PORT':'3306',
         'OPTIONS': {
-            # Workaround for MariaDB 10.4 compatibility
-            # Django 5.2 requires MariaDB 10.5+, but we'll allow 10.4 for now
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
             'charset': 'utf8mb4',
+        },
+        # Keep connections open between requests instead of reconnecting every time,
+        # and check them before reuse so a server-side timeout does not fail a request.
+        # Keep it below the server's wait_timeout; 0 closes after each request
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Optional read replica for the read-only endpoints (see backend/api/routers.py):
+    # 'replica': {
+    #     **same keys as 'default', pointing at the replica server,
+    #     'TEST': {'MIRROR': 'default'},
+    # },
+}
+
+DATABASE_ROUTERS = ['backend.api.routers.ReplicaRouter']
+
+# Alias of the read replica in DATABASES; the router is inactive while it is absent
+DATABASE_REPLICA_ALIAS = 'replica'
+
+# Seconds a writer keeps reading from the primary; cover the replica's usual lag
+DATABASE_REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# The judge payloads, their version counters (and the ETags built from them) and
+# the replica pins must be shared by every worker process: set REDIS_URL (needs the
+# redis package) or MEMCACHED_LOCATION (needs pymemcache). The local-memory fallback
+# is only correct when a single process serves requests.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+elif os.environ.get('MEMCACHED_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.environ['MEMCACHED_LOCATION'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         }
     }
-}
 
 
+# Logging
+# Request performance lines (one JSON object per request) go to "cjms.performance"
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'backend.api': {'handlers': ['console'], 'level': 'INFO'},
+        'cjms.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Slowest SQL statements included in each request's performance log line
+PERFORMANCE_SLOW_QUERIES = 5
+# Bearer token a Prometheus scraper sends to read /metrics/; without it only
+# signed-in staff users can read them
+PERFORMANCE_METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
 
 
 # Password validation
@@ -191,10 +226,17 @@ CORS_ALLOW_CREDENTIALS = True
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication with the token lookup cached; see backend/api/authentication.py
+        'backend.api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-}
\ No newline at end of file
+    # List endpoints return {"next", "previous", "results"}; clients may ask
+    # for up to API_MAX_PAGE_SIZE rows per page with ?page_size=
+    'DEFAULT_PAGINATION_CLASS': 'backend.api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 100,
+}
+
+API_MAX_PAGE_SIZE = 500
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+backend.sqlite_settings plus a second SQLite file standing in for the read
+replica, to try the routing in backend/api/routers.py without MariaDB.
+
+Nothing replicates into the stand-in: copy the primary over it to "catch
+up", and anything written since is the replica lag, e.g.:
+
+    python manage.py migrate --settings=backend.sqlite_replica_settings
+    cp db.sqlite3 db.replica.sqlite3
+"""
+from .sqlite_settings import *  # noqa: F401,F403
+from .sqlite_settings import BASE_DIR, DATABASES
+
+DATABASES = {
+    **DATABASES,
+    'replica': {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        # Tests read and write one database, as they would through real replication
+        'TEST': {'MIRROR': 'default'},
+    },
+}
@@ -0,0 +1,40 @@
+"""
+Settings for running the tests and benchmarks without MariaDB.
+
+Same as backend.settings but on a local SQLite file, with a fast password
+hasher and a file-based cache that every local process shares, so no Redis or
+Memcached is needed either. The per-request INFO log lines are turned off so
+they do not drown the test output. Use it with --settings, e.g.:
+
+    python manage.py test backend.api.tests --settings=backend.sqlite_settings
+"""
+import copy
+import tempfile
+from pathlib import Path
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, LOGGING
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        # Concurrent writers (load_test) wait for the lock instead of failing
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Hashing passwords at full strength would dominate the login timings
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'cjms-cache',
+    }
+}
+
+LOGGING = copy.deepcopy(LOGGING)
+for _logger in ('backend.api', 'cjms.performance'):
+    LOGGING['loggers'][_logger]['level'] = 'WARNING'
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import './JudgePage.css';
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faSignOutAlt, faUser, faStar, faSave } from '@fortawesome/free-solid-svg-icons';
-import { subEventService, scoreService } from './services/api';
+import { scoreService } from './services/api';
 
 const JudgePage = ({ judgeData, onLogout }) => {
   const [contestants, setContestants] = useState([]);
@@ -13,6 +13,12 @@ const JudgePage = ({ judgeData, onLogout }) => {
   const [saving, setSaving] = useState(false);
   const [saveMessage, setSaveMessage] = useState('');
   const saveTimeoutRef = React.useRef(null);
+  // Last seen Score.updated_at per "contestantId:criterionId" cell
+  const versionsRef = React.useRef({});
+  // Changed cells and comments waiting to be saved, keyed like versionsRef
+  const pendingChangesRef = React.useRef({});
+  // The save in flight; the next one waits for it so it sends the versions it returned
+  const saveQueueRef = React.useRef(Promise.resolve());
 
   // Fetch contestants and criteria when judge data is loaded
   useEffect(() => {
@@ -20,16 +26,11 @@ const JudgePage = ({ judgeData, onLogout }) => {
       if (judgeData && judgeData.sub_event) {
         try {
           setLoading(true);
-          const subEventId = judgeData.sub_event.id;
-          console.log('Fetching settings for sub-event:', subEventId);
-          const settings = await subEventService.getSubEventSettings(subEventId);
+          // Contestants, criteria and this judge's saved scores in one (cached) request
+          const bootstrap = await scoreService.getJudgeBootstrap(judgeData.code);
           
-          console.log('Settings received:', settings);
-          console.log('Contestants:', settings.contestants);
-          console.log('Criteria:', settings.criteria);
-          
-          const contestantsList = settings.contestants || [];
-          const criteriaList = settings.criteria || [];
+          const contestantsList = bootstrap.contestants || [];
+          const criteriaList = bootstrap.criteria || [];
           
           setContestants(contestantsList);
           setCriteria(criteriaList);
@@ -45,33 +46,29 @@ const JudgePage = ({ judgeData, onLogout }) => {
             });
           });
           
-          // Load existing scores from database
-          try {
-            const judgeId = judgeData.id;
-            const existingScores = await scoreService.getJudgeScores(judgeId);
-            
-            if (existingScores.scores) {
-              // Merge existing scores with initial scores
-              Object.keys(existingScores.scores).forEach(contestantId => {
-                if (initialScores[contestantId]) {
-                  // Update comments
-                  if (existingScores.comments && existingScores.comments[contestantId]) {
-                    initialScores[contestantId].comments = existingScores.comments[contestantId];
-                  }
-                  
-                  // Update criterion scores
-                  Object.keys(existingScores.scores[contestantId]).forEach(criterionId => {
-                    if (initialScores[contestantId][criterionId]) {
-                      initialScores[contestantId][criterionId].score = existingScores.scores[contestantId][criterionId];
-                    }
-                  });
+          versionsRef.current = {};
+          Object.keys(bootstrap.versions || {}).forEach(contestantId => {
+            Object.keys(bootstrap.versions[contestantId]).forEach(criterionId => {
+              versionsRef.current[`${contestantId}:${criterionId}`] = bootstrap.versions[contestantId][criterionId];
+            });
+          });
+          
+          // Merge existing scores with initial scores
+          Object.keys(bootstrap.scores || {}).forEach(contestantId => {
+            if (initialScores[contestantId]) {
+              // Update comments
+              if (bootstrap.comments && bootstrap.comments[contestantId]) {
+                initialScores[contestantId].comments = bootstrap.comments[contestantId];
+              }
+              
+              // Update criterion scores
+              Object.keys(bootstrap.scores[contestantId]).forEach(criterionId => {
+                if (initialScores[contestantId][criterionId]) {
+                  initialScores[contestantId][criterionId].score = bootstrap.scores[contestantId][criterionId];
                 }
               });
             }
-          } catch (error) {
-            console.error('Error loading existing scores:', error);
-            // Continue with initial scores if loading fails
-          }
+          });
           
           setScores(initialScores);
           
@@ -94,42 +91,78 @@ const JudgePage = ({ judgeData, onLogout }) => {
     fetchJudgeData();
   }, [judgeData]);
 
-  const saveScoresToDatabase = async (scoresToSave, contestantId = null, showMessage = false) => {
+  const saveScoresToDatabase = (showMessage = false) => {
+    // Saves run one after the other: a payload built while another save is in
+    // flight would carry stale versions and conflict with the judge's own write
+    const save = saveQueueRef.current.then(() => saveChanges(showMessage));
+    saveQueueRef.current = save.catch(() => {});
+    return save;
+  };
+
+  const saveChanges = async (showMessage) => {
     if (!judgeData || !judgeData.id) return;
     
+    // Only the cells that changed since the last save are sent
+    const pending = pendingChangesRef.current;
+    pendingChangesRef.current = {};
+    const changes = Object.keys(pending).map(key => (
+      pending[key].criterion !== undefined
+        ? { ...pending[key], updated_at: versionsRef.current[key] ?? null }
+        : pending[key]
+    ));
+    
+    if (changes.length === 0) {
+      if (showMessage) {
+        setSaveMessage('Scores saved successfully!');
+        setTimeout(() => setSaveMessage(''), 3000);
+      }
+      return;
+    }
+    
     try {
       setSaving(true);
       setSaveMessage('');
       const judgeId = judgeData.id;
       
-      // Prepare scores data for the API
-      const formattedScores = {};
-      const contestantIds = contestantId ? [contestantId] : Object.keys(scoresToSave);
+      const result = await scoreService.saveScoreChanges(judgeId, changes);
       
-      contestantIds.forEach(cId => {
-        if (scoresToSave[cId]) {
-          formattedScores[cId] = {
-            comments: scoresToSave[cId].comments || ''
-          };
-          
-          // Add all criterion scores
-          Object.keys(scoresToSave[cId]).forEach(key => {
-            if (key !== 'comments' && scoresToSave[cId][key]) {
-              formattedScores[cId][key] = scoresToSave[cId][key];
-            }
-          });
-        }
+      (result.saved || []).forEach(score => {
+        versionsRef.current[`${score.contestant}:${score.criterion}`] = score.updated_at;
       });
       
-      await scoreService.saveJudgeScores(judgeId, formattedScores);
-      console.log('Scores saved successfully');
-      
-      if (showMessage) {
-        setSaveMessage('Scores saved successfully!');
+      // Another session changed these cells first: show the stored values
+      const conflicts = result.conflicts || [];
+      if (conflicts.length > 0) {
+        conflicts.forEach(conflict => {
+          versionsRef.current[`${conflict.contestant}:${conflict.criterion}`] = conflict.updated_at;
+        });
+        setScores(prevScores => {
+          const updatedScores = { ...prevScores };
+          conflicts.forEach(conflict => {
+            // A cell edited again since this save was sent keeps the newer input
+            const edited = pendingChangesRef.current[`${conflict.contestant}:${conflict.criterion}`];
+            if (updatedScores[conflict.contestant] && !edited) {
+              updatedScores[conflict.contestant] = {
+                ...updatedScores[conflict.contestant],
+                [conflict.criterion]: { score: conflict.score ?? undefined }
+              };
+            }
+          });
+          return updatedScores;
+        });
+        setSaveMessage('Some scores were changed elsewhere and have been reloaded.');
         setTimeout(() => setSaveMessage(''), 3000);
+      } else {
+        console.log('Scores saved successfully');
+        if (showMessage) {
+          setSaveMessage('Scores saved successfully!');
+          setTimeout(() => setSaveMessage(''), 3000);
+        }
       }
     } catch (error) {
       console.error('Error saving scores:', error);
+      // Put the unsaved changes back unless they were edited again meanwhile
+      pendingChangesRef.current = { ...pending, ...pendingChangesRef.current };
       if (showMessage) {
         setSaveMessage('Error saving scores. Please try again.');
         setTimeout(() => setSaveMessage(''), 3000);
@@ -147,11 +180,10 @@ const JudgePage = ({ judgeData, onLogout }) => {
       clearTimeout(saveTimeoutRef.current);
     }
     
-    // Save only the active contestant's scores
-    saveScoresToDatabase(scores, activeTab, true);
+    saveScoresToDatabase(true);
   };
 
-  const debouncedSave = (updatedScores, contestantId = null) => {
+  const debouncedSave = () => {
     // Clear existing timeout
     if (saveTimeoutRef.current) {
       clearTimeout(saveTimeoutRef.current);
@@ -159,7 +191,7 @@ const JudgePage = ({ judgeData, onLogout }) => {
     
     // Set new timeout
     saveTimeoutRef.current = setTimeout(() => {
-      saveScoresToDatabase(updatedScores, contestantId);
+      saveScoresToDatabase();
     }, 1000);
   };
 
@@ -192,9 +224,14 @@ const JudgePage = ({ judgeData, onLogout }) => {
       }
       
       setScores(updatedScores);
+      pendingChangesRef.current[`${activeTab}:${criterionId}`] = {
+        contestant: activeTab,
+        criterion: criterionId,
+        score: updatedScores[activeTab][criterionId].score ?? null
+      };
       
       // Save to database after a short delay (debounce)
-      debouncedSave(updatedScores, activeTab);
+      debouncedSave();
     }
   };
 
@@ -209,9 +246,13 @@ const JudgePage = ({ judgeData, onLogout }) => {
       };
       
       setScores(updatedScores);
+      pendingChangesRef.current[`${activeTab}:comments`] = {
+        contestant: activeTab,
+        comments: value
+      };
       
       // Save to database after a short delay (debounce)
-      debouncedSave(updatedScores, activeTab);
+      debouncedSave();
     }
   };
 
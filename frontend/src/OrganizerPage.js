@@ -7,6 +7,8 @@ import ScoreSheet from './ScoreSheet';
 
 const OrganizerPage = ({ onBack }) => {
   const [events, setEvents] = useState([]);
+  const [eventsNext, setEventsNext] = useState(null); // cursor link to the next page of events
+  const [isLoadingMoreEvents, setIsLoadingMoreEvents] = useState(false);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [isPasswordModalOpen, setIsPasswordModalOpen] = useState(false);
   const [isSubEventModalOpen, setIsSubEventModalOpen] = useState(false);
@@ -64,8 +66,10 @@ const OrganizerPage = ({ onBack }) => {
   const fetchEvents = async () => {
     try {
       setIsLoading(true);
-      const data = await eventService.getEvents();
-      setEvents(data);
+      // First page only; older events are fetched on demand with loadMoreEvents
+      const page = await eventService.getEvents();
+      setEvents(page.results);
+      setEventsNext(page.next);
     } catch (error) {
       console.error('Error fetching events:', error);
       alert('Failed to load events');
@@ -74,6 +78,33 @@ const OrganizerPage = ({ onBack }) => {
     }
   };
 
+  const loadMoreEvents = async () => {
+    if (!eventsNext) return;
+    try {
+      setIsLoadingMoreEvents(true);
+      const page = await eventService.getEvents(eventsNext);
+      setEvents(prev => [...prev, ...page.results]);
+      setEventsNext(page.next);
+    } catch (error) {
+      console.error('Error fetching events:', error);
+      alert('Failed to load more events');
+    } finally {
+      setIsLoadingMoreEvents(false);
+    }
+  };
+
+  const renderLoadMoreEvents = () => (
+    eventsNext && !isLoading && (
+      <button
+        className="load-more-button"
+        onClick={loadMoreEvents}
+        disabled={isLoadingMoreEvents}
+      >
+        {isLoadingMoreEvents ? 'Loading...' : 'Load older events'}
+      </button>
+    )
+  );
+
   // Group events by year
   const groupEventsByYear = () => {
     const grouped = {};
@@ -292,36 +323,27 @@ const OrganizerPage = ({ onBack }) => {
 
   const fetchSubEvents = async (eventId) => {
     try {
-      const allSubEvents = await subEventService.getSubEvents();
-      const eventSubEvents = allSubEvents.filter(subEvent => subEvent.event === eventId);
+      // One request: the event's sub-events with their judge rosters embedded
+      const eventSubEvents = await subEventService.getSubEvents({ event: eventId, expand: 'judges' });
       setSubEventsData(prev => ({
         ...prev,
         [eventId]: eventSubEvents
       }));
       
-      // Also fetch judges for each sub-event
-      for (const subEvent of eventSubEvents) {
-        await fetchJudgesForSubEvent(subEvent.id);
-      }
-    } catch (error) {
-      console.error('Error fetching sub-events:', error);
-    }
-  };
-
-  const fetchJudgesForSubEvent = async (subEventId) => {
-    try {
-      const settings = await subEventService.getSubEventSettings(subEventId);
-      const judges = (settings.judges || []).sort((a, b) => {
-        if (a.type === 'chairman' && b.type !== 'chairman') return -1;
-        if (a.type !== 'chairman' && b.type === 'chairman') return 1;
-        return a.order - b.order;
+      const judgesBySubEvent = {};
+      eventSubEvents.forEach(subEvent => {
+        judgesBySubEvent[subEvent.id] = (subEvent.judges || []).sort((a, b) => {
+          if (a.type === 'chairman' && b.type !== 'chairman') return -1;
+          if (a.type !== 'chairman' && b.type === 'chairman') return 1;
+          return a.order - b.order;
+        });
       });
       setJudgesData(prev => ({
         ...prev,
-        [subEventId]: judges
+        ...judgesBySubEvent
       }));
     } catch (error) {
-      console.error(`Error fetching judges for sub-event ${subEventId}:`, error);
+      console.error('Error fetching sub-events:', error);
     }
   };
 
@@ -794,6 +816,7 @@ const OrganizerPage = ({ onBack }) => {
                 </div>
               ))
             )}
+            {renderLoadMoreEvents()}
           </div>
         </div>
           </>
@@ -910,6 +933,7 @@ const OrganizerPage = ({ onBack }) => {
                     </div>
                   ))
                 )}
+                {renderLoadMoreEvents()}
               </div>
             </div>
           </>
@@ -1281,20 +1305,23 @@ const OrganizerPage = ({ onBack }) => {
                   try {
                     setIsLoading(true);
                     // Prepare settings data - filter out empty entries
+                    // Ids let the server update existing rows in place (and keep their scores);
+                    // ids of rows added in this form match nothing and are created
                     const settingsData = {
                       contestants: contestants
                         .filter(c => c.name && c.name.trim())
-                        .map(c => ({ name: c.name.trim() })),
+                        .map(c => ({ id: c.id, name: c.name.trim() })),
                       judges: judges
                         .filter(j => j.name && j.name.trim())
                         .map(j => ({ 
+                          id: j.id,
                           name: j.name.trim(), 
                           type: j.type || 'judge',
                           code: j.code || ''  // Preserve existing code if available
                         })),
                       criteria: criteria
                         .filter(c => c.name && c.name.trim())
-                        .map(c => ({ name: c.name.trim(), points: c.points || '0' }))
+                        .map(c => ({ id: c.id, name: c.name.trim(), points: c.points || '0' }))
                     };
                     
                     // Save to database
@@ -1304,9 +1331,15 @@ const OrganizerPage = ({ onBack }) => {
                     );
                     
                     // Update local state with returned data (including generated codes)
+                    if (result.contestants) {
+                      setContestants(result.contestants.map(c => ({ id: c.id, name: c.name })));
+                    }
                     if (result.judges) {
                       setJudges(result.judges.map(j => ({ id: j.id, name: j.name, code: j.code, type: j.type })));
                     }
+                    if (result.criteria) {
+                      setCriteria(result.criteria.map(c => ({ id: c.id, name: c.name, points: c.points })));
+                    }
                     
                     alert('Settings saved successfully!');
                     handleCloseSettingsModal();
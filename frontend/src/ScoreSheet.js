@@ -2,8 +2,8 @@ import React, { useState, useEffect, useRef } from 'react';
 import { createPortal } from 'react-dom';
 import './ScoreSheet.css';
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
-import { faUser, faChartBar, faTimes, faPrint } from '@fortawesome/free-solid-svg-icons';
-import { subEventService, scoreService } from './services/api';
+import { faUser, faChartBar, faTimes, faPrint, faFileExcel, faFileCsv } from '@fortawesome/free-solid-svg-icons';
+import { scoreService } from './services/api';
 
 const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
   const [judges, setJudges] = useState([]);
@@ -11,33 +11,92 @@ const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
   const [criteria, setCriteria] = useState([]);
   const [selectedJudge, setSelectedJudge] = useState(initialJudge);
   const [scores, setScores] = useState({});
-  const [overallScores, setOverallScores] = useState({});
+  // Averages, totals and rankings exactly as the server computes them
+  const [aggregates, setAggregates] = useState({ averages: {}, totals: {}, rankings: {}, judgeTotals: {}, judgeRankings: {} });
   const [loading, setLoading] = useState(true);
   const [showOverall, setShowOverall] = useState(true); // Default to showing overall scores
   const printContentRef = useRef(null);
+  const refreshTimerRef = useRef(null);
 
   useEffect(() => {
     fetchSubEventData();
   }, [subEvent]);
 
+  useEffect(() => {
+    return () => clearTimeout(refreshTimerRef.current);
+  }, [subEvent]);
+
+  const applyAggregates = (scoreboard) => {
+    setAggregates({
+      averages: scoreboard.averages || {},
+      totals: scoreboard.totals || {},
+      rankings: scoreboard.rankings || {},
+      judgeTotals: scoreboard.judge_totals || {},
+      judgeRankings: scoreboard.judge_rankings || {}
+    });
+  };
+
+  // Live changes update the cells at once; the totals and rankings are re-read
+  // from the scoreboard once a burst of saves has settled
+  const scheduleAggregateRefresh = () => {
+    clearTimeout(refreshTimerRef.current);
+    refreshTimerRef.current = setTimeout(async () => {
+      try {
+        applyAggregates(await scoreService.getScoreboard(subEvent.id));
+      } catch (error) {
+        console.error('Error refreshing scoreboard totals:', error);
+      }
+    }, 1000);
+  };
+
+  // Apply score changes pushed by the server as judges save
+  useEffect(() => {
+    const unsubscribe = scoreService.subscribeToScores(subEvent.id, applyScoreChanges, fetchSubEventData);
+    return unsubscribe;
+  }, [subEvent]);
+
+  const applyScoreChanges = (changedScores) => {
+    setScores(prevScores => {
+      const updatedScores = { ...prevScores };
+      changedScores.forEach(score => {
+        const judgeSheet = updatedScores[score.judge] || { scores: {}, comments: {} };
+        updatedScores[score.judge] = {
+          scores: {
+            ...judgeSheet.scores,
+            [score.contestant]: {
+              ...(judgeSheet.scores[score.contestant] || {}),
+              [score.criterion]: score.score
+            }
+          },
+          comments: {
+            ...judgeSheet.comments,
+            [score.contestant]: score.comments || ''
+          }
+        };
+      });
+      return updatedScores;
+    });
+    scheduleAggregateRefresh();
+  };
+
   const fetchSubEventData = async () => {
     try {
       setLoading(true);
-      const settings = await subEventService.getSubEventSettings(subEvent.id);
+      // Settings, every judge's scores and the server-side totals and rankings in one request
+      const scoreboard = await scoreService.getScoreboard(subEvent.id);
       
-      setContestants(settings.contestants || []);
-      setCriteria(settings.criteria || []);
+      setContestants(scoreboard.contestants || []);
+      setCriteria(scoreboard.criteria || []);
       
       // Sort judges: chairman first, then regular judges
-      const judgesList = (settings.judges || []).sort((a, b) => {
+      const judgesList = (scoreboard.judges || []).sort((a, b) => {
         if (a.type === 'chairman' && b.type !== 'chairman') return -1;
         if (a.type !== 'chairman' && b.type === 'chairman') return 1;
         return a.order - b.order;
       });
       setJudges(judgesList);
-      
-      // Fetch scores for all judges to calculate overall scores
-      await fetchAllScores(judgesList, settings.contestants || [], settings.criteria || []);
+      setScores(scoreboard.scores || {});
+      applyAggregates(scoreboard);
       
       setLoading(false);
     } catch (error) {
@@ -46,75 +105,6 @@ const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
     }
   };
 
-  const fetchAllScores = async (judgesList, contestantsList, criteriaList) => {
-    const allScores = {};
-    
-    // Fetch scores for each judge
-    for (const judge of judgesList) {
-      try {
-        const judgeScores = await scoreService.getJudgeScores(judge.id);
-        allScores[judge.id] = judgeScores;
-      } catch (error) {
-        console.error(`Error fetching scores for judge ${judge.id}:`, error);
-        allScores[judge.id] = { scores: {}, comments: {} };
-      }
-    }
-    
-    setScores(allScores);
-    
-    // Calculate overall scores (average across all judges)
-    calculateOverallScores(allScores, judgesList, contestantsList, criteriaList);
-  };
-
-  const calculateOverallScores = (allScores, judgesList, contestantsList = null, criteriaList = null) => {
-    const overall = {};
-    
-    // Use provided lists or fall back to state
-    const currentContestants = contestantsList || contestants;
-    const currentCriteria = criteriaList || criteria;
-    
-    // If we don't have contestants/criteria yet, return early
-    if (!currentContestants || currentContestants.length === 0 || 
-        !currentCriteria || currentCriteria.length === 0) {
-      return;
-    }
-    
-    currentContestants.forEach(contestant => {
-      overall[contestant.id] = {};
-      currentCriteria.forEach(criterion => {
-        const scoresForCriterion = [];
-        
-        // Get scores from all judges for this contestant and criterion
-        judgesList.forEach(judge => {
-          const judgeScores = allScores[judge.id]?.scores || {};
-          const contestantScores = judgeScores[contestant.id] || {};
-          const score = contestantScores[criterion.id];
-          
-          if (score !== null && score !== undefined) {
-            scoresForCriterion.push(score);
-          }
-        });
-        
-        // Calculate average
-        if (scoresForCriterion.length > 0) {
-          const sum = scoresForCriterion.reduce((a, b) => a + b, 0);
-          overall[contestant.id][criterion.id] = Math.round((sum / scoresForCriterion.length) * 100) / 100;
-        } else {
-          overall[contestant.id][criterion.id] = null;
-        }
-      });
-    });
-    
-    setOverallScores(overall);
-  };
-  
-  // Recalculate overall scores when contestants or criteria change
-  useEffect(() => {
-    if (contestants.length > 0 && criteria.length > 0 && Object.keys(scores).length > 0 && judges.length > 0) {
-      calculateOverallScores(scores, judges);
-    }
-  }, [contestants, criteria, scores, judges]);
-
   const handleJudgeClick = (judge) => {
     setSelectedJudge(judge);
     setShowOverall(false);
@@ -138,7 +128,7 @@ const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
 
   const getDisplayScores = () => {
     if (showOverall) {
-      return overallScores;
+      return aggregates.averages;
     }
     
     if (selectedJudge) {
@@ -158,52 +148,33 @@ const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
     return judgeScores?.comments || {};
   };
 
-  const calculateTotalScore = (contestantId) => {
-    const contestantScores = getDisplayScores()[contestantId] || {};
-    let total = 0;
-    
-    criteria.forEach(criterion => {
-      const score = contestantScores[criterion.id];
-      if (score !== null && score !== undefined) {
-        // Apply criterion weight (points percentage)
-        const weight = parseFloat(criterion.points) || 0;
-        total += (score * weight) / 100;
-      }
-    });
-    
-    return Math.round(total * 100) / 100;
+  const getTotalScore = (contestantId) => {
+    if (showOverall) {
+      return aggregates.totals[contestantId] ?? 0;
+    }
+    if (selectedJudge) {
+      return aggregates.judgeTotals[selectedJudge.id]?.[contestantId] ?? 0;
+    }
+    return 0;
   };
 
-  // Calculate rankings based on total scores
   const getRankings = () => {
-    if (contestants.length === 0) return {};
-    
-    // Calculate total scores for all contestants
-    const contestantTotals = contestants.map(contestant => ({
-      id: contestant.id,
-      totalScore: calculateTotalScore(contestant.id)
-    }));
-    
-    // Sort by total score (descending)
-    contestantTotals.sort((a, b) => b.totalScore - a.totalScore);
-    
-    // Assign ranks
-    const rankings = {};
-    let currentRank = 1;
-    let previousScore = null;
-    
-    contestantTotals.forEach((contestant, index) => {
-      // If scores are equal, use the same rank
-      if (previousScore !== null && contestant.totalScore === previousScore) {
-        rankings[contestant.id] = currentRank;
-      } else {
-        currentRank = index + 1;
-        rankings[contestant.id] = currentRank;
-      }
-      previousScore = contestant.totalScore;
-    });
-    
-    return rankings;
+    if (showOverall) {
+      return aggregates.rankings;
+    }
+    if (selectedJudge) {
+      return aggregates.judgeRankings[selectedJudge.id] || {};
+    }
+    return {};
+  };
+
+  const handleExport = async (format) => {
+    try {
+      await scoreService.exportScores('subevents', subEvent.id, format);
+    } catch (error) {
+      console.error('Error exporting scores:', error);
+      alert('Failed to export scores. Please try again.');
+    }
   };
 
   const handlePrintAll = () => {
@@ -242,48 +213,8 @@ const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
             ? null 
             : regularJudges.indexOf(judge) + 1;
           
-          const calculateJudgeTotalScore = (contestantId) => {
-            const contestantScores = judgeScores[contestantId] || {};
-            let total = 0;
-            
-            criteria.forEach(criterion => {
-              const score = contestantScores[criterion.id];
-              if (score !== null && score !== undefined) {
-                const weight = parseFloat(criterion.points) || 0;
-                total += (score * weight) / 100;
-              }
-            });
-            
-            return Math.round(total * 100) / 100;
-          };
-
-          // Calculate rankings for this judge
-          const judgeRankings = (() => {
-            if (contestants.length === 0) return {};
-            
-            const contestantTotals = contestants.map(contestant => ({
-              id: contestant.id,
-              totalScore: calculateJudgeTotalScore(contestant.id)
-            }));
-            
-            contestantTotals.sort((a, b) => b.totalScore - a.totalScore);
-            
-            const rankings = {};
-            let currentRank = 1;
-            let previousScore = null;
-            
-            contestantTotals.forEach((contestant, index) => {
-              if (previousScore !== null && contestant.totalScore === previousScore) {
-                rankings[contestant.id] = currentRank;
-              } else {
-                currentRank = index + 1;
-                rankings[contestant.id] = currentRank;
-              }
-              previousScore = contestant.totalScore;
-            });
-            
-            return rankings;
-          })();
+          const judgeTotals = aggregates.judgeTotals[judge.id] || {};
+          const judgeRankings = aggregates.judgeRankings[judge.id] || {};
           
           const sortedContestants = [...contestants].sort((a, b) => {
             const rankA = judgeRankings[a.id] || 999;
@@ -318,7 +249,7 @@ const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
                   <tbody>
                     {sortedContestants.map(contestant => {
                       const contestantScores = judgeScores[contestant.id] || {};
-                      const totalScore = calculateJudgeTotalScore(contestant.id);
+                      const totalScore = judgeTotals[contestant.id] ?? 0;
                       const comments = judgeComments[contestant.id] || '';
                       const rank = judgeRankings[contestant.id] || '-';
                       
@@ -381,15 +312,15 @@ const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
               <tbody>
                 {(() => {
                   const sortedContestants = [...contestants].sort((a, b) => {
-                    const rankA = rankings[a.id] || 999;
-                    const rankB = rankings[b.id] || 999;
+                    const rankA = aggregates.rankings[a.id] || 999;
+                    const rankB = aggregates.rankings[b.id] || 999;
                     return rankA - rankB;
                   });
                   
                   return sortedContestants.map(contestant => {
-                    const contestantScores = overallScores[contestant.id] || {};
-                    const totalScore = calculateTotalScore(contestant.id);
-                    const rank = rankings[contestant.id] || '-';
+                    const contestantScores = aggregates.averages[contestant.id] || {};
+                    const totalScore = aggregates.totals[contestant.id] ?? 0;
+                    const rank = aggregates.rankings[contestant.id] || '-';
                     
                     return (
                       <tr key={contestant.id}>
@@ -447,6 +378,14 @@ const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
               </p>
             </div>
             <div className="score-sheet-header-actions">
+              <button className="score-sheet-print-btn" onClick={() => handleExport('xlsx')} title="Export Scores to Excel">
+                <FontAwesomeIcon icon={faFileExcel} />
+                <span>Excel</span>
+              </button>
+              <button className="score-sheet-print-btn" onClick={() => handleExport('csv')} title="Export Scores to CSV">
+                <FontAwesomeIcon icon={faFileCsv} />
+                <span>CSV</span>
+              </button>
               <button className="score-sheet-print-btn" onClick={handlePrintAll} title="Print All Score Sheets">
                 <FontAwesomeIcon icon={faPrint} />
                 <span>Print All</span>
@@ -517,7 +456,7 @@ const ScoreSheet = ({ subEvent, initialJudge = null, onClose }) => {
                         
                         return sortedContestants.map(contestant => {
                           const contestantScores = displayScores[contestant.id] || {};
-                          const totalScore = calculateTotalScore(contestant.id);
+                          const totalScore = getTotalScore(contestant.id);
                           const comments = displayComments[contestant.id] || '';
                           const rank = rankings[contestant.id] || '-';
                           
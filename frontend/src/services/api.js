@@ -46,6 +46,27 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints are cursor-paginated ({ next, previous, results }).
+// getPage fetches one page; pass the previous page's "next" link to continue
+const getPage = async (url, params = {}, next = null) => {
+  const response = next ? await api.get(next) : await api.get(url, { params });
+  return { results: response.data.results, next: response.data.next };
+};
+
+// Follows every "next" link and returns all rows as one array. Only for lists
+// bounded by a parent, such as one event's sub-events; open-ended lists page
+// with getPage instead
+const getAllPages = async (url, params = {}) => {
+  const rows = [];
+  let page = await getPage(url, params);
+  rows.push(...page.results);
+  while (page.next) {
+    page = await getPage(url, params, page.next);
+    rows.push(...page.results);
+  }
+  return rows;
+};
+
 // API service functions
 export const authService = {
   login: async (credentials) => {
@@ -81,9 +102,14 @@ export const authService = {
 
 export const dataService = {
   // Example API calls - customize based on your Django models
-  getCases: async () => {
-    const response = await api.get('/cases/');
-    return response.data;
+  // One page of cases: { results, next }; pass next to get the following page
+  getCases: async (next = null) => {
+    return getPage('/cases/', {}, next);
+  },
+  
+  searchCases: async (query, limit = 20) => {
+    const response = await api.get('/cases/search/', { params: { q: query, limit } });
+    return response.data.results;
   },
   
   getCase: async (id) => {
@@ -105,12 +131,48 @@ export const dataService = {
     const response = await api.delete(`/cases/${id}/`);
     return response.data;
   },
+  
+  // Upload a File/Blob in chunks; an interrupted chunk is retried from the
+  // offset the server reports. onProgress receives (bytesSent, totalBytes)
+  uploadCaseFile: async (caseId, file, { description = '', chunkSize = 4 * 1024 * 1024, onProgress, retries = 3 } = {}) => {
+    const { data: session } = await api.post('/uploads/', {
+      case: caseId,
+      filename: file.name,
+      size: file.size,
+      description,
+    });
+    let offset = session.received;
+    let failures = 0;
+    while (offset < file.size) {
+      try {
+        const { data } = await api.put(`/uploads/${session.id}/`, file.slice(offset, offset + chunkSize), {
+          headers: { 'Content-Type': 'application/octet-stream', 'Upload-Offset': offset },
+          timeout: 0,
+        });
+        offset = data.received;
+        failures = 0;
+        if (onProgress) onProgress(offset, file.size);
+      } catch (error) {
+        if (error.response?.status === 409) {
+          offset = error.response.data.offset;
+        } else if (!error.response && failures < retries) {
+          failures += 1;
+          const { data } = await api.get(`/uploads/${session.id}/`);
+          offset = data.received;
+        } else {
+          throw error;
+        }
+      }
+    }
+    const response = await api.post(`/uploads/${session.id}/finalize/`);
+    return response.data;
+  },
 };
 
 export const eventService = {
-  getEvents: async () => {
-    const response = await api.get('/events/');
-    return response.data;
+  // One page of events, newest first: { results, next }; pass next to get the following page
+  getEvents: async (next = null) => {
+    return getPage('/events/', {}, next);
   },
   
   getEvent: async (id) => {
@@ -118,6 +180,11 @@ export const eventService = {
     return response.data;
   },
   
+  getLeaderboard: async (eventId) => {
+    const response = await api.get(`/events/${eventId}/leaderboard/`);
+    return response.data;
+  },
+  
   createEvent: async (eventData) => {
     const response = await api.post('/events/', eventData);
     return response.data;
@@ -135,9 +202,9 @@ export const eventService = {
 };
 
 export const subEventService = {
-  getSubEvents: async () => {
-    const response = await api.get('/subevents/');
-    return response.data;
+  getSubEvents: async (params = {}) => {
+    // params: { event: eventId, expand: 'judges' }
+    return getAllPages('/subevents/', params);
   },
   
   getSubEvent: async (id) => {
@@ -172,6 +239,11 @@ export const subEventService = {
 };
 
 export const scoreService = {
+  getJudgeBootstrap: async (code) => {
+    const response = await api.post('/auth/judge-bootstrap/', { code });
+    return response.data;
+  },
+  
   getJudgeScores: async (judgeId) => {
     const response = await api.get(`/judges/${judgeId}/scores/`);
     return response.data;
@@ -182,27 +254,58 @@ export const scoreService = {
     return response.data;
   },
   
-  getSubEventScores: async (subEventId) => {
-    // Get all judges for the sub-event and their scores
-    const settings = await subEventService.getSubEventSettings(subEventId);
-    const judges = settings.judges || [];
-    const allScores = {};
+  saveScoreChanges: async (judgeId, changes) => {
+    // Multi-status (207) responses carry conflicts and errors alongside saved rows
+    const response = await api.post(`/judges/${judgeId}/scores/save/`, { changes });
+    return response.data;
+  },
+  
+  getScoreboard: async (subEventId) => {
+    const response = await api.get(`/subevents/${subEventId}/scoreboard/`);
+    return response.data;
+  },
+  
+  subscribeToScores: (subEventId, onScores, onResync) => {
+    // EventSource cannot send an Authorization header, so the token goes in the query string
+    const token = localStorage.getItem('authToken');
+    const url = `${api.defaults.baseURL}/subevents/${subEventId}/live/?token=${encodeURIComponent(token || '')}`;
+    const source = new EventSource(url);
     
-    for (const judge of judges) {
-      try {
-        const judgeScores = await api.get(`/judges/${judge.id}/scores/`);
-        allScores[judge.id] = judgeScores.data;
-      } catch (error) {
-        console.error(`Error fetching scores for judge ${judge.id}:`, error);
-        allScores[judge.id] = { scores: {}, comments: {} };
-      }
-    }
+    source.addEventListener('scores', (event) => {
+      onScores(JSON.parse(event.data).scores || []);
+    });
+    source.addEventListener('resync', () => {
+      if (onResync) onResync();
+    });
+    
+    // Call the returned function to close the stream
+    return () => source.close();
+  },
+  
+  // Download a score export; scope is 'subevents' or 'events', format 'csv' or 'xlsx'
+  exportScores: async (scope, id, format) => {
+    const response = await api.get(`/${scope}/${id}/export/${format}/`, { responseType: 'blob', timeout: 0 });
+    const disposition = response.headers['content-disposition'] || '';
+    const filename = (disposition.match(/filename="([^"]+)"/) || [])[1] || `scores.${format}`;
+    const url = URL.createObjectURL(response.data);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = filename;
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    URL.revokeObjectURL(url);
+  },
+  
+  getSubEventScores: async (subEventId) => {
+    // Settings, every judge's scores and the aggregates come back in one request
+    const scoreboard = await scoreService.getScoreboard(subEventId);
     
     return {
-      judges,
-      contestants: settings.contestants || [],
-      criteria: settings.criteria || [],
-      scores: allScores
+      judges: scoreboard.judges || [],
+      contestants: scoreboard.contestants || [],
+      criteria: scoreboard.criteria || [],
+      scores: scoreboard.scores || {}
     };
   },
 };